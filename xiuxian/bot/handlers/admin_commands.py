@@ -2,7 +2,14 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from database.database import GameDatabase
 from database.models import World, Equipment, Item, Sect
-from bot.utils.decorators import require_admin
+from bot.utils.decorators import require_admin, require_role
+from bot.utils.admins import admin_registry, ROLE_ADMIN, ROLE_OWNER, ROLE_NAMES
+from bot.utils.loot import loot_tables
+from bot.utils.matchmaking import matchmaking_index
+from bot.utils.item_effects import item_catalog, compile_effects
+from bot.utils.render import invalidate_equipment
+from bot.utils.memory import memory_tracker, memory_report
+from bot.utils.messages import reply_text
 import config
 import json
 
@@ -10,7 +17,8 @@ import json
 async def admin_create_world_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
     """管理员创建世界命令"""
     if len(context.args) < 3:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             "使用格式：/admin_world 世界名 世界等级 描述\n"
             "示例：/admin_world 仙界 2 仙人居住的神秘世界"
         )
@@ -20,13 +28,13 @@ async def admin_create_world_command(update: Update, context: ContextTypes.DEFAU
     try:
         world_level = int(context.args[1])
     except ValueError:
-        await update.message.reply_text("世界等级必须是数字！")
+        await reply_text(update.message, "世界等级必须是数字！")
         return
     
     description = " ".join(context.args[2:])
     
     if world_level not in config.WORLD_LEVELS:
-        await update.message.reply_text(f"世界等级必须在1-5之间！")
+        await reply_text(update.message, f"世界等级必须在1-5之间！")
         return
     
     world = World(
@@ -36,15 +44,16 @@ async def admin_create_world_command(update: Update, context: ContextTypes.DEFAU
     )
     
     if db.create_world(world):
-        await update.message.reply_text(f"✅ 成功创建世界：{world_name} (等级{world_level})")
+        await reply_text(update.message, f"✅ 成功创建世界：{world_name} (等级{world_level})")
     else:
-        await update.message.reply_text("❌ 创建世界失败！")
+        await reply_text(update.message, "❌ 创建世界失败！")
 
 @require_admin
 async def admin_create_equipment_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
     """管理员创建装备命令"""
     if len(context.args) < 6:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             "使用格式：/admin_equip 装备名 部位 品质 等级要求 世界等级要求 属性JSON [描述]\n"
             "部位：" + "，".join(config.ALL_SLOTS.keys()) + "\n"
             "品质：" + "，".join(config.EQUIPMENT_QUALITIES) + "\n"
@@ -61,15 +70,15 @@ async def admin_create_equipment_command(update: Update, context: ContextTypes.D
         world_level_req = int(context.args[4])
         attributes = json.loads(context.args[5])
     except (ValueError, json.JSONDecodeError) as e:
-        await update.message.reply_text(f"参数错误：{e}")
+        await reply_text(update.message, f"参数错误：{e}")
         return
     
     if slot not in config.ALL_SLOTS:
-        await update.message.reply_text(f"无效部位！可用部位：{', '.join(config.ALL_SLOTS.keys())}")
+        await reply_text(update.message, f"无效部位！可用部位：{', '.join(config.ALL_SLOTS.keys())}")
         return
     
     if quality not in config.EQUIPMENT_QUALITIES:
-        await update.message.reply_text(f"无效品质！可用品质：{', '.join(config.EQUIPMENT_QUALITIES)}")
+        await reply_text(update.message, f"无效品质！可用品质：{', '.join(config.EQUIPMENT_QUALITIES)}")
         return
     
     description = " ".join(context.args[6:]) if len(context.args) > 6 else ""
@@ -84,16 +93,23 @@ async def admin_create_equipment_command(update: Update, context: ContextTypes.D
         attributes=attributes
     )
     
+    # 同名装备会被覆盖：属性变化影响所有穿戴者的战斗力
+    replaced = bool(db.get_equipments([equip_name]))
     if db.create_equipment(equipment):
-        await update.message.reply_text(f"✅ 成功创建装备：{equip_name}")
+        loot_tables.rebuild(db)
+        invalidate_equipment(equip_name)
+        if replaced and matchmaking_index.loaded:
+            matchmaking_index.load(db)
+        await reply_text(update.message, f"✅ 成功创建装备：{equip_name}")
     else:
-        await update.message.reply_text("❌ 创建装备失败！")
+        await reply_text(update.message, "❌ 创建装备失败！")
 
 @require_admin
 async def admin_create_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
     """管理员创建物品命令"""
     if len(context.args) < 4:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             "使用格式：/admin_item 物品名 类型 效果JSON [描述]\n"
             "类型：消耗品，材料，特殊\n"
             "示例：/admin_item 力量药水 消耗品 '{\"攻击力\":10,\"经验\":50}' 增加10点攻击力和50经验"
@@ -106,26 +122,44 @@ async def admin_create_item_command(update: Update, context: ContextTypes.DEFAUL
     try:
         effects = json.loads(context.args[2])
     except json.JSONDecodeError as e:
-        await update.message.reply_text(f"效果JSON格式错误：{e}")
+        await reply_text(update.message, f"效果JSON格式错误：{e}")
+        return
+    
+    if not isinstance(effects, dict):
+        await reply_text(update.message, "效果JSON必须是对象！")
+        return
+    
+    try:
+        compile_effects(effects)
+    except ValueError as e:
+        await reply_text(
+            update.message,
+            f"无效效果：{e}\n"
+            "可用效果：" + "，".join(config.PLAYER_ATTRIBUTES + ['经验', '升级'] + config.SPIRIT_STONE_TYPES)
+        )
         return
     
     description = " ".join(context.args[3:]) if len(context.args) > 3 else ""
     
-    # 创建物品
-    with db.get_connection() as conn:
-        conn.execute('''
-            INSERT OR REPLACE INTO items (name, item_type, description, effects, usable)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (item_name, item_type, description, json.dumps(effects), True))
-        conn.commit()
+    item = Item(
+        name=item_name,
+        item_type=item_type,
+        description=description,
+        effects=effects
+    )
     
-    await update.message.reply_text(f"✅ 成功创建物品：{item_name}")
+    if db.create_item(item):
+        item_catalog.invalidate()
+        await reply_text(update.message, f"✅ 成功创建物品：{item_name}")
+    else:
+        await reply_text(update.message, "❌ 创建物品失败！")
 
 @require_admin
 async def admin_grant_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
     """管理员给予物品命令"""
     if len(context.args) < 3:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             "使用格式：/admin_grant 用户ID 物品名 数量\n"
             "示例：/admin_grant 123456789 神剑 1"
         )
@@ -135,7 +169,7 @@ async def admin_grant_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         user_id = int(context.args[0])
         quantity = int(context.args[2])
     except ValueError:
-        await update.message.reply_text("用户ID和数量必须是数字！")
+        await reply_text(update.message, "用户ID和数量必须是数字！")
         return
     
     item_name = context.args[1]
@@ -143,7 +177,7 @@ async def admin_grant_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     # 检查用户是否存在
     player = db.get_player(user_id)
     if not player:
-        await update.message.reply_text("用户不存在！")
+        await reply_text(update.message, "用户不存在！")
         return
     
     # 检查物品是否存在
@@ -151,24 +185,26 @@ async def admin_grant_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     equipment = db.get_equipment(item_name)
     
     if not item and not equipment:
-        await update.message.reply_text("物品/装备不存在！")
+        await reply_text(update.message, "物品/装备不存在！")
         return
     
     # 给予物品
     player.inventory[item_name] = player.inventory.get(item_name, 0) + quantity
     
     if db.update_player(player):
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             f"✅ 已给予 {player.name}({user_id}) {item_name} x{quantity}"
         )
     else:
-        await update.message.reply_text("❌ 给予物品失败！")
+        await reply_text(update.message, "❌ 给予物品失败！")
 
 @require_admin
 async def admin_teleport_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
     """管理员传送玩家命令"""
     if len(context.args) < 2:
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             "使用格式：/admin_tp 用户ID 世界名\n"
             "示例：/admin_tp 123456789 仙界"
         )
@@ -177,7 +213,7 @@ async def admin_teleport_command(update: Update, context: ContextTypes.DEFAULT_T
     try:
         user_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("用户ID必须是数字！")
+        await reply_text(update.message, "用户ID必须是数字！")
         return
     
     world_name = context.args[1]
@@ -185,7 +221,7 @@ async def admin_teleport_command(update: Update, context: ContextTypes.DEFAULT_T
     # 检查用户是否存在
     player = db.get_player(user_id)
     if not player:
-        await update.message.reply_text("用户不存在！")
+        await reply_text(update.message, "用户不存在！")
         return
     
     # 检查世界是否存在
@@ -195,12 +231,68 @@ async def admin_teleport_command(update: Update, context: ContextTypes.DEFAULT_T
         ).fetchone()
     
     if not world_exists:
-        await update.message.reply_text("世界不存在！")
+        await reply_text(update.message, "世界不存在！")
         return
     
     player.world = world_name
     
     if db.update_player(player):
-        await update.message.reply_text(f"✅ 已将 {player.name} 传送到 {world_name}")
+        await reply_text(update.message, f"✅ 已将 {player.name} 传送到 {world_name}")
+    else:
+        await reply_text(update.message, "❌ 传送失败！")
+
+@require_role(ROLE_OWNER)
+async def admin_add_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
+    """超级管理员添加管理员命令"""
+    if len(context.args) < 1:
+        await reply_text(
+            update.message,
+            "使用格式：/admin_add 用户ID [角色等级]\n"
+            "角色等级：" + "，".join(f"{level}={name}" for level, name in ROLE_NAMES.items()) + "\n"
+            "示例：/admin_add 123456789 1"
+        )
+        return
+    
+    try:
+        user_id = int(context.args[0])
+        role = int(context.args[1]) if len(context.args) > 1 else ROLE_ADMIN
+    except ValueError:
+        await reply_text(update.message, "用户ID和角色等级必须是数字！")
+        return
+    
+    if role not in ROLE_NAMES:
+        await reply_text(update.message, "角色等级无效！")
+        return
+    
+    player = db.get_player(user_id)
+    username = player.username if player else ""
+    
+    if admin_registry.add(db, user_id, username, role):
+        await reply_text(update.message, f"✅ 已将 {user_id} 设为{ROLE_NAMES[role]}")
     else:
-        await update.message.reply_text("❌ 传送失败！")
\ No newline at end of file
+        await reply_text(update.message, "❌ 添加管理员失败！")
+
+@require_admin
+async def admin_memory_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db: GameDatabase):
+    """管理员内存统计命令"""
+    action = context.args[0] if context.args else ""
+    
+    if action == "start":
+        memory_tracker.start()
+        await reply_text(update.message, "✅ 已开启 tracemalloc 并记录基准快照，之后 /admin_mem 会显示增长最多的分配位置")
+        return
+    
+    if action == "stop":
+        memory_tracker.stop()
+        await reply_text(update.message, "✅ 已关闭 tracemalloc")
+        return
+    
+    if action:
+        await reply_text(
+            update.message,
+            "使用格式：/admin_mem [start|stop]\n"
+            "不带参数时显示 RSS、对象数量及(已开启时)分配位置快照"
+        )
+        return
+    
+    await reply_text(update.message, memory_report(memory_tracker))
@@ -1,219 +1,290 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.database import GameDatabase
-from database.models import Player, Equipment, Sect
-from bot.keyboards.panels import *
+from database.models import Player, Equipment, Sect, World
+from database.profiler import query_profiler
+from bot.keyboards.panels import (
+    main_panel_keyboard, admin_panel_keyboard, equipment_panel_keyboard, accessories_keyboard,
+    sect_panel_keyboard, hunt_difficulty_keyboard, retreat_time_keyboard, inventory_keyboard,
+    equipment_slot_keyboard, sect_members_keyboard, sect_list_keyboard, world_selection_keyboard,
+    back_keyboard, confirm_keyboard
+)
 from bot.utils.game_logic import GameLogic
+from bot.utils.matchmaking import matchmaking_index
+from bot.utils.scheduler import status_scheduler
+from bot.utils.item_effects import item_catalog
+from bot.utils.messages import edit_message
+from bot.utils.debounce import tap_debouncer
+from bot.utils.callback_state import callback_states, CallbackState, STATE_PREFIX
+from bot.utils.admins import admin_registry
+from bot.utils.sects import sect_member_counts
+from bot.utils.render import (
+    render_player_panel, render_inventory_entries, render_equipment_list, render_sect_members, INVENTORY_TIPS
+)
+from bot.handlers.router import CallbackRouter
+from bot.utils.logs import access_log
+from tracing import tracer
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 import config
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = CallbackRouter()
 
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """处理所有回调查询"""
     query = update.callback_query
-    await query.answer()
-    
     data = query.data
     user_id = query.from_user.id
-    db = GameDatabase(config.DATABASE_PATH)
-    player = db.get_player(user_id)
     
-    # 如果需要玩家数据但玩家不存在
-    if not player and not data.startswith(('admin_', 'back_to_main')):
-        await query.edit_message_text("请先使用 /start 创建角色！")
+    # 重复点击或重复投递的回调直接应答后丢弃
+    if not tap_debouncer.begin(user_id, data, query.id):
+        await query.answer("处理中…")
         return
     
-    game_logic = GameLogic(db) if player else None
-    
-    # 主面板相关
-    if data == "back_to_main":
-        is_admin = db.is_admin(user_id) or user_id in config.ADMIN_IDS
-        await query.edit_message_text(
-            "🎮 修仙世界主面板\n\n选择你要进行的操作：",
-            reply_markup=main_panel_keyboard(is_admin)
-        )
-    
-    elif data == "panel_player":
-        await handle_player_panel(query, player, db, game_logic)
-    
-    elif data == "panel_inventory":
-        await handle_inventory_panel(query, player, db)
-    
-    elif data == "panel_equipment":
-        await query.edit_message_text(
-            "⚔️ 装备面板\n\n选择要查看的装备部位：",
-            reply_markup=equipment_panel_keyboard()
-        )
-    
-    elif data.startswith("equip_"):
-        await handle_equipment_slot(query, data, player, db, game_logic)
-    
-    elif data == "panel_sect":
-        await handle_sect_panel(query, player, db)
-    
-    elif data == "panel_hunt":
-        await query.edit_message_text(
-            "🗡️ 外出刷怪\n\n选择刷怪难度：",
-            reply_markup=hunt_difficulty_keyboard()
-        )
-    
-    elif data.startswith("hunt_"):
-        await handle_hunt(query, data, player, db, game_logic)
-    
-    elif data == "panel_retreat":
-        await query.edit_message_text(
-            "🧘‍♂️ 闭关修炼\n\n选择闭关时间：",
-            reply_markup=retreat_time_keyboard()
-        )
-    
-    elif data.startswith("retreat_"):
-        await handle_retreat(query, data, player, db, game_logic)
-    
-    elif data == "panel_signin":
-        await handle_signin(query, player, db, game_logic)
-    
-    # 管理员面板
-    elif data == "admin_panel":
-        if db.is_admin(user_id) or user_id in config.ADMIN_IDS:
-            await query.edit_message_text(
-                "⚙️ 管理员面板\n\n选择管理功能：",
-                reply_markup=admin_panel_keyboard()
-            )
+    try:
+        db = GameDatabase(config.DATABASE_PATH)
+        payload = data
+        
+        if data.startswith(STATE_PREFIX):
+            payload = callback_states.decode(db, data)
+            if payload is None:
+                await query.answer("按钮已过期，请重新打开面板")
+                return
+            route = router.resolve_action(payload.action)
         else:
-            await query.edit_message_text("❌ 权限不足！")
+            route = router.resolve(data)
+        
+        if route is None or not route.answers:
+            await query.answer()
+        
+        if route is None:
+            logger.debug("未注册的回调：%s", data)
+            return
+        query_profiler.annotate(route.name)
+        access_log.annotate(route.name)
+        
+        player = None
+        game_logic = None
+        
+        if route.needs_player:
+            player = db.get_player(user_id)
+            if not player:
+                await edit_message(query, "请先使用 /start 创建角色！")
+                return
+            game_logic = GameLogic(db)
+        
+        with tracer.span(route.name, "route"):
+            await route.handler(query, payload, player, db, game_logic)
+    finally:
+        tap_debouncer.end(user_id, data)
 
-async def handle_player_panel(query, player: Player, db: GameDatabase, game_logic: GameLogic):
+# 主面板相关
+@router.exact("back_to_main", needs_player=False)
+async def handle_back_to_main(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """返回主面板"""
+    user_id = query.from_user.id
+    is_admin = admin_registry.is_admin(db, user_id)
+    await edit_message(
+        query,
+        "🎮 修仙世界主面板\n\n选择你要进行的操作：",
+        reply_markup=main_panel_keyboard(is_admin)
+    )
+
+@router.exact("panel_equipment", needs_player=False)
+async def handle_equipment_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """装备面板"""
+    await edit_message(
+        query,
+        "⚔️ 装备面板\n\n选择要查看的装备部位：",
+        reply_markup=equipment_panel_keyboard()
+    )
+
+@router.exact("equip_accessories", needs_player=False)
+async def handle_accessories_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """饰品面板"""
+    await edit_message(
+        query,
+        "💎 饰品装备\n\n选择饰品部位：",
+        reply_markup=accessories_keyboard()
+    )
+
+@router.exact("panel_hunt", needs_player=False)
+async def handle_hunt_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """刷怪面板"""
+    await edit_message(
+        query,
+        "🗡️ 外出刷怪\n\n选择刷怪难度：",
+        reply_markup=hunt_difficulty_keyboard()
+    )
+
+@router.exact("panel_retreat", needs_player=False)
+async def handle_retreat_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """闭关面板"""
+    await edit_message(
+        query,
+        "🧘‍♂️ 闭关修炼\n\n选择闭关时间：",
+        reply_markup=retreat_time_keyboard()
+    )
+
+# 管理员面板
+@router.exact("admin_panel", needs_player=False)
+async def handle_admin_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """管理员面板"""
+    user_id = query.from_user.id
+    if admin_registry.is_admin(db, user_id):
+        await edit_message(
+            query,
+            "⚙️ 管理员面板\n\n选择管理功能：",
+            reply_markup=admin_panel_keyboard()
+        )
+    else:
+        await edit_message(query, "❌ 权限不足！")
+
+@router.exact("panel_player")
+async def handle_player_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
     """处理玩家属性面板"""
-    total_attrs = game_logic.calculate_total_attributes(player)
-    combat_power = game_logic.calculate_combat_power(player)
-    
-    # 获取世界等级信息
-    world_info = config.WORLD_LEVELS.get(player.world_level, {})
-    next_world_level = player.world_level + 1
-    next_world_info = config.WORLD_LEVELS.get(next_world_level, {})
-    
-    text = f"👤 **{player.name}** 的属性面板\n\n"
-    text += f"📊 等级：{player.level}\n"
-    text += f"⚡ 经验：{player.exp}/{game_logic.get_required_exp(player.level)}\n"
-    text += f"🌍 当前世界：{player.world or '未选择'}\n"
-    text += f"🏆 世界等级：{player.world_level} ({world_info.get('name', '')})\n"
+    equipments = db.get_equipments(list(player.equipment.values()))
+    total_attrs = game_logic.calculate_total_attributes(player, equipments)
+    combat_power = game_logic.calculate_combat_power(player, total_attrs)
+    sect = db.get_sect(player.sect_id) if player.sect_id else None
     
-    if next_world_info and player.level >= next_world_info['min_level']:
-        text += f"🆙 可进入：{next_world_info['name']}\n"
-    
-    text += f"⚔️ 战斗力：{combat_power}\n\n"
-    
-    # 宗门信息
-    if player.sect_id:
-        sect = db.get_sect(player.sect_id)
-        if sect:
-            text += f"🏛️ 宗门：{sect.name} ({player.sect_position})\n"
-            text += f"💰 贡献：{player.sect_contribution}\n\n"
+    text = render_player_panel(
+        player, total_attrs, combat_power, game_logic.get_required_exp(player.level), sect, equipments
+    )
+    await edit_message(query, text, reply_markup=back_keyboard())
+
+def _total_pages(total: int) -> int:
+    return max(1, (total + config.PAGE_SIZE - 1) // config.PAGE_SIZE)
+
+def _parse_page(data: str, prefix: str) -> Tuple[str, int]:
+    """解析 {prefix}{参数}_page_{页码}，返回 (参数, 页码)"""
+    rest = data[len(prefix):]
+    if rest.startswith("page_"):
+        arg, page = "", rest[len("page_"):]
     else:
-        text += "🏛️ 宗门：未加入\n\n"
-    
-    # 属性详情
-    text += "💪 **属性详情**\n"
-    for attr in config.PLAYER_ATTRIBUTES:
-        base_value = player.attributes.get(attr, 0)
-        total_value = total_attrs.get(attr, 0)
-        bonus = total_value - base_value
-        
-        if bonus > 0:
-            text += f"  {attr}：{base_value}+{bonus} = {total_value}\n"
-        else:
-            text += f"  {attr}：{total_value}\n"
-    
-    text += "\n💎 **灵石**\n"
-    for currency, amount in player.spirit_stones.items():
-        text += f"  {currency}：{amount}\n"
-    
-    text += "\n⚔️ **当前装备**\n"
-    for slot_name in config.ALL_SLOTS.keys():
-        equip_name = player.equipment.get(slot_name, "")
-        if equip_name:
-            equipment = db.get_equipment(equip_name)
-            if equipment:
-                attrs_text = "，".join([f"{k}+{v}" for k, v in equipment.attributes.items()])
-                text += f"  {slot_name}：{equip_name} ({equipment.quality}，{attrs_text})\n"
-            else:
-                text += f"  {slot_name}：{equip_name}\n"
-        else:
-            text += f"  {slot_name}：无\n"
-    
-    await query.edit_message_text(text, reply_markup=back_keyboard())
+        arg, _, page = rest.rpartition("_page_")
+    try:
+        return arg, max(1, int(page))
+    except ValueError:
+        return arg, 1
 
-async def handle_inventory_panel(query, player: Player, db: GameDatabase):
-    """处理背包面板"""
+async def show_inventory(query, player: Player, db: GameDatabase, filter_key: str = 'all', page: int = 1):
+    """显示背包的一页"""
     text = f"🎒 {player.name} 的背包\n\n"
     
     if not player.inventory:
-        text += "背包空空如也..."
-    else:
-        items = list(player.inventory.items())[:20]  # 显示前20个物品
-        for item_name, count in items:
-            item = db.get_item(item_name)
-            equipment = db.get_equipment(item_name)
-            
-            if item:
-                text += f"📦 {item_name} x{count} ({item.item_type})\n"
-                text += f"    {item.description}\n"
-            elif equipment:
-                text += f"⚔️ {equipment_name} x{count} ({equipment.quality})\n"
-                attrs_text = "，".join([f"{k}+{v}" for k, v in equipment.attributes.items()])
-                text += f"    {attrs_text}\n"
-            else:
-                text += f"❓ {item_name} x{count}\n"
-        
-        if len(player.inventory) > 20:
-            text += f"\n... 还有 {len(player.inventory) - 20} 种物品"
-        
-        text += "\n\n💡 使用 /use 物品名 来使用物品"
-        text += "\n💡 使用 /equip 装备名 来装备物品"
-    
-    await query.edit_message_text(text, reply_markup=back_keyboard())
-
-async def handle_equipment_slot(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
-    """处理装备槽位选择"""
-    slot = data.replace("equip_", "")
-    
-    if slot == "accessories":
-        await query.edit_message_text(
-            "💎 饰品装备\n\n选择饰品部位：",
-            reply_markup=accessories_keyboard()
-        )
+        await edit_message(query, text + "背包空空如也...", reply_markup=back_keyboard())
         return
     
-    # 获取该部位的可用装备
-    equipment_list = db.get_equipment_by_slot(slot, player.level, player.world_level)
+    names = sorted(player.inventory)
     
-    # 过滤玩家背包中拥有的装备
-    available_equipment = []
-    for equipment in equipment_list:
-        if equipment.name in player.inventory and player.inventory[equipment.name] > 0:
-            available_equipment.append(equipment)
+    if filter_key == 'equip':
+        # 装备按品质排序，由数据库统计总数、修正页码后只取当前页
+        candidates = [name for name in names if item_catalog.get(db, name) is None]
+        page_equipments, total, page = db.get_equipment_page(candidates, page=page, page_size=config.PAGE_SIZE)
+        equipments = {equipment.name: equipment for equipment in page_equipments}
+        entries = [(equipment.name, player.inventory[equipment.name]) for equipment in page_equipments]
+        items = {}
+    else:
+        if filter_key == 'item':
+            names = [name for name in names if item_catalog.get(db, name) is not None]
+        total = len(names)
+        page = min(max(page, 1), _total_pages(total))
+        offset = (page - 1) * config.PAGE_SIZE
+        entries = [(name, player.inventory[name]) for name in names[offset:offset + config.PAGE_SIZE]]
+        items = {}
+        for name, _ in entries:
+            compiled = item_catalog.get(db, name)
+            if compiled:
+                items[name] = compiled.item
+        equipments = db.get_equipments([name for name, _ in entries if name not in items])
+    
+    total_pages = _total_pages(total)
+    parts = [text]
+    if entries:
+        parts.extend(render_inventory_entries(entries, items, equipments))
+    else:
+        parts.append("没有符合条件的物品\n")
+    parts.append(INVENTORY_TIPS)
     
+    await edit_message(query, "".join(parts), reply_markup=inventory_keyboard(filter_key, page, total_pages))
+
+@router.exact("panel_inventory")
+async def handle_inventory_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理背包面板"""
+    await show_inventory(query, player, db)
+
+@router.prefix("inv_")
+async def handle_inventory_page(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理背包翻页：inv_page_N、inv_item_page_N、inv_equip_page_N"""
+    filter_key, page = _parse_page(data, "inv_")
+    await show_inventory(query, player, db, filter_key or 'all', page)
+
+async def show_equipment_slot(query, slot: str, player: Player, db: GameDatabase, page: int = 1, notice: str = ""):
+    """显示某部位可装备物品的一页"""
+    # 只查询背包中拥有的该部位装备
+    owned = [name for name, count in player.inventory.items() if count > 0]
+    page_equipments, total, page = db.get_equipment_page(
+        owned, slot, player.level, player.world_level, page=page, page_size=config.PAGE_SIZE
+    )
+    total_pages = _total_pages(total)
     current_equip = player.equipment.get(slot, "")
     
-    text = f"⚔️ {slot}装备\n\n"
-    text += f"当前装备：{current_equip or '无'}\n\n"
+    parts = [f"{notice}\n\n" if notice else "", f"⚔️ {slot}装备\n\n当前装备：{current_equip or '无'}\n\n"]
     
-    if available_equipment:
-        text += "可装备的物品：\n"
-        for i, equipment in enumerate(available_equipment[:10], 1):
-            attrs_text = "，".join([f"{k}+{v}" for k, v in equipment.attributes.items()])
-            text += f"{i}. {equipment.name} ({equipment.quality})\n"
-            text += f"   {attrs_text}\n"
-            text += f"   需要等级{equipment.level_requirement}\n\n"
-        
-        text += "💡 使用 /equip 装备名 来装备"
+    if page_equipments:
+        parts.append("可装备的物品：\n")
+        parts.extend(render_equipment_list(page_equipments, (page - 1) * config.PAGE_SIZE + 1))
+        parts.append("💡 点击下方按钮或使用 /equip 装备名 来装备")
     else:
-        text += "暂无可装备的物品"
-    
-    await query.edit_message_text(text, reply_markup=back_keyboard("panel_equipment"))
+        parts.append("暂无可装备的物品")
+    
+    tokens = callback_states.encode_many(db, 'equip_item', [
+        {'name': equipment.name, 'slot': slot, 'page': page} for equipment in page_equipments
+    ])
+    equip_buttons = tuple(zip((equipment.name for equipment in page_equipments), tokens))
+    await edit_message(
+        query, "".join(parts),
+        reply_markup=equipment_slot_keyboard(slot, page, total_pages, equip_buttons)
+    )
 
-async def handle_sect_panel(query, player: Player, db: GameDatabase):
-    """处理宗门面板"""
+@router.prefix("equip_")
+async def handle_equipment_slot(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理装备槽位选择"""
+    await show_equipment_slot(query, data.replace("equip_", ""), player, db)
+
+@router.prefix("equipslot_")
+async def handle_equipment_slot_page(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理装备槽位翻页：equipslot_{部位}_page_N"""
+    slot, page = _parse_page(data, "equipslot_")
+    if slot not in config.ALL_SLOTS:
+        return
+    await show_equipment_slot(query, slot, player, db, page)
+
+@router.action("equip_item")
+async def handle_equip_item(query, state: CallbackState, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """装备按钮：{name, slot, page}"""
+    success, message = game_logic.equip_item(player, state.params['name'])
+    if success:
+        db.update_player(player)
+        matchmaking_index.refresh(player, game_logic)
+    
+    await show_equipment_slot(
+        query, state.params['slot'], player, db, state.params.get('page', 1),
+        notice=f"{'✅' if success else '❌'} {message}"
+    )
+
+@router.exact("noop", needs_player=False)
+async def handle_noop(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """页码等无操作按钮"""
+    return
+
+async def show_sect_panel(query, player: Player, db: GameDatabase, notice: str = ""):
+    """显示宗门面板"""
     is_member = player.sect_id is not None
     is_leader = False
     
@@ -221,37 +292,141 @@ async def handle_sect_panel(query, player: Player, db: GameDatabase):
         sect = db.get_sect(player.sect_id)
         is_leader = sect and sect.leader_id == player.tg_id
     
-    await query.edit_message_text(
-        "🏛️ 宗门系统\n\n选择操作：",
+    await edit_message(
+        query,
+        (f"{notice}\n\n" if notice else "") + "🏛️ 宗门系统\n\n选择操作：",
         reply_markup=sect_panel_keyboard(is_member, is_leader)
     )
 
+@router.exact("panel_sect")
+async def handle_sect_panel(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理宗门面板"""
+    await show_sect_panel(query, player, db)
+
+@router.exact("sect_list")
+@router.exact("sect_apply")
+async def handle_sect_apply(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """宗门列表，人数按缓存显示，未加入宗门时可选择加入"""
+    sects = db.list_sects()[:config.PAGE_SIZE]
+    if not sects:
+        await edit_message(query, "🏛️ 暂无宗门", reply_markup=back_keyboard("panel_sect"))
+        return
+    
+    parts = ["🏛️ 宗门列表\n\n"]
+    join_buttons = []
+    for sect in sects:
+        count = sect_member_counts.count(db, sect.id)
+        parts.append(f"• {sect.name} Lv.{sect.level} ({count}/{sect.max_members})\n")
+        if player.sect_id is None and count < sect.max_members:
+            join_buttons.append((f"➕ {sect.name}", f"sect_join_{sect.id}"))
+    await edit_message(query, "".join(parts), reply_markup=sect_list_keyboard(tuple(join_buttons)))
+
+@router.prefix("sect_join_")
+async def handle_sect_join(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """加入宗门：sect_join_{宗门ID}"""
+    try:
+        sect = db.get_sect(int(data[len("sect_join_"):]))
+    except ValueError:
+        return
+    if sect is None:
+        await show_sect_panel(query, player, db, "❌ 宗门不存在")
+        return
+    
+    success, msg = game_logic.join_sect(player, sect)
+    if success:
+        # 宗门加成改变战斗力
+        matchmaking_index.refresh(player, game_logic)
+    await show_sect_panel(query, player, db, f"{'✅' if success else '❌'} {msg}")
+
+@router.exact("sect_leave")
+async def handle_sect_leave(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """退出宗门前确认"""
+    await edit_message(
+        query, "🚪 确定要退出宗门吗？贡献将清零。",
+        reply_markup=confirm_keyboard("sect_leave")
+    )
+
+@router.exact("confirm_sect_leave")
+async def handle_confirm_sect_leave(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """确认退出宗门"""
+    success, msg = game_logic.leave_sect(player)
+    if success:
+        matchmaking_index.refresh(player, game_logic)
+    await show_sect_panel(query, player, db, f"{'✅' if success else '❌'} {msg}")
+
+@router.exact("cancel_sect_leave")
+async def handle_cancel_sect_leave(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """取消退出宗门"""
+    await show_sect_panel(query, player, db)
+
+async def show_sect_members(query, player: Player, db: GameDatabase, page: int = 1,
+                            after: Optional[Tuple[int, int]] = None):
+    """显示宗门成员的一页，after 为上一页末尾成员的 (贡献, tg_id)"""
+    sect = db.get_sect(player.sect_id) if player.sect_id is not None else None
+    if sect is None:
+        await edit_message(query, "你尚未加入宗门", reply_markup=back_keyboard("panel_sect"))
+        return
+    
+    # 多取一条判断是否还有下一页
+    members = db.get_sect_members(sect.id, config.PAGE_SIZE + 1, after)
+    has_next = len(members) > config.PAGE_SIZE
+    members = members[:config.PAGE_SIZE]
+    total = sect_member_counts.count(db, sect.id)
+    
+    parts = [f"👥 {sect.name} 成员 ({total}/{sect.max_members})\n\n"]
+    if members:
+        parts.extend(render_sect_members(members, (page - 1) * config.PAGE_SIZE + 1))
+    else:
+        parts.append("没有更多成员")
+    
+    next_data = ""
+    if has_next:
+        last = members[-1]
+        next_data = f"sect_members_{page + 1}_{last.sect_contribution}_{last.tg_id}"
+    await edit_message(
+        query, "".join(parts),
+        reply_markup=sect_members_keyboard(page, _total_pages(total), next_data)
+    )
+
+@router.exact("sect_members")
+async def handle_sect_members(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """宗门成员列表"""
+    await show_sect_members(query, player, db)
+
+@router.prefix("sect_members_")
+async def handle_sect_members_page(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """处理成员列表翻页：sect_members_{页码}_{贡献}_{tg_id}"""
+    try:
+        page, contribution, tg_id = (int(part) for part in data[len("sect_members_"):].split("_"))
+    except ValueError:
+        return
+    await show_sect_members(query, player, db, max(1, page), (contribution, tg_id))
+
+@router.prefix("hunt_")
 async def handle_hunt(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
     """处理刷怪"""
     difficulty = data.replace("hunt_", "")
     
+    # 清除已到期的状态
+    game_logic.clear_expired_statuses(player)
+    
     # 检查是否受伤
     if player.status.get('injured', False):
-        if 'injured_until' in player.status:
-            injured_until = datetime.fromisoformat(player.status['injured_until'])
-            if datetime.now() < injured_until:
-                remaining = injured_until - datetime.now()
-                hours = int(remaining.total_seconds() // 3600)
-                minutes = int((remaining.total_seconds() % 3600) // 60)
-                await query.edit_message_text(
-                    f"❌ 你目前受伤无法刷怪！\n"
-                    f"恢复时间：{hours}小时{minutes}分钟",
-                    reply_markup=back_keyboard()
-                )
-                return
-            else:
-                # 伤势已恢复
-                player.status.pop('injured', None)
-                player.status.pop('injured_until', None)
+        remaining = datetime.fromisoformat(player.status['injured_until']) - datetime.now()
+        hours = int(remaining.total_seconds() // 3600)
+        minutes = int((remaining.total_seconds() % 3600) // 60)
+        await edit_message(
+            query,
+            f"❌ 你目前受伤无法刷怪！\n"
+            f"恢复时间：{hours}小时{minutes}分钟",
+            reply_markup=back_keyboard()
+        )
+        return
     
     # 检查是否在闭关
     if player.status.get('retreating', False):
-        await query.edit_message_text(
+        await edit_message(
+            query,
             "❌ 闭关中无法刷怪！",
             reply_markup=back_keyboard()
         )
@@ -291,23 +466,35 @@ async def handle_hunt(query, data: str, player: Player, db: GameDatabase, game_l
     # 更新最后刷怪时间
     player.last_hunt = datetime.now().isoformat()
     db.update_player(player)
+    matchmaking_index.refresh(player, game_logic)
     
-    await query.edit_message_text(text, reply_markup=back_keyboard())
+    if results['injured']:
+        status_scheduler.schedule(
+            db, player.tg_id, 'injured', datetime.fromisoformat(player.status['injured_until'])
+        )
+    
+    await edit_message(query, text, reply_markup=back_keyboard())
 
+@router.prefix("retreat_")
 async def handle_retreat(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
     """处理闭关修炼"""
     hours = int(data.replace("retreat_", ""))
     
+    # 清除已到期的状态
+    game_logic.clear_expired_statuses(player)
+    
     # 检查状态
     if player.status.get('injured', False):
-        await query.edit_message_text(
+        await edit_message(
+            query,
             "❌ 受伤状态无法闭关！",
             reply_markup=back_keyboard()
         )
         return
     
     if player.status.get('retreating', False):
-        await query.edit_message_text(
+        await edit_message(
+            query,
             "❌ 你已经在闭关中！",
             reply_markup=back_keyboard()
         )
@@ -326,6 +513,8 @@ async def handle_retreat(query, data: str, player: Player, db: GameDatabase, gam
         player.spirit_stones[currency] = player.spirit_stones.get(currency, 0) + amount
     
     db.update_player(player)
+    matchmaking_index.remove(player.tg_id)
+    status_scheduler.schedule(db, player.tg_id, 'retreat', retreat_end)
     
     text = f"🧘‍♂️ 开始闭关修炼\n\n"
     text += f"⏰ 闭关时间：{hours}小时\n"
@@ -335,12 +524,14 @@ async def handle_retreat(query, data: str, player: Player, db: GameDatabase, gam
         text += f"  {currency}：+{amount}\n"
     text += "\n⚠️ 闭关期间无法进行其他活动"
     
-    await query.edit_message_text(text, reply_markup=back_keyboard())
+    await edit_message(query, text, reply_markup=back_keyboard())
 
-async def handle_signin(query, player: Player, db: GameDatabase, game_logic: GameLogic):
+@router.exact("panel_signin")
+async def handle_signin(query, data: str, player: Player, db: GameDatabase, game_logic: GameLogic):
     """处理签到"""
     if not game_logic.can_signin_today(player):
-        await query.edit_message_text(
+        await edit_message(
+            query,
             "❌ 你今天已经签到过了！",
             reply_markup=back_keyboard()
         )
@@ -360,4 +551,108 @@ async def handle_signin(query, player: Player, db: GameDatabase, game_logic: Gam
     for currency, amount in rewards.items():
         text += f"  {currency}：+{amount}\n"
     
-    await query.edit_message_text(text, reply_markup=back_keyboard())
\ No newline at end of file
+    await edit_message(query, text, reply_markup=back_keyboard())
+
+# 世界
+def world_selection_buttons(db: GameDatabase, worlds: List[World], current_world_level: int) -> tuple:
+    """已解锁世界的按钮 ((世界名, 世界等级, 回调数据), ...)，按世界等级排序"""
+    unlocked = sorted(
+        (world for world in worlds if world.world_level <= current_world_level),
+        key=lambda world: (world.world_level, world.name)
+    )
+    tokens = callback_states.encode_many(db, 'goto_world', [
+        {'name': world.name, 'world_level': world.world_level} for world in unlocked
+    ])
+    return tuple((world.name, world.world_level, token) for world, token in zip(unlocked, tokens))
+
+async def show_world_selection(query, player: Player, db: GameDatabase, worlds: List[World]):
+    """显示世界选择面板"""
+    await edit_message(
+        query, "🌍 选择世界：",
+        reply_markup=world_selection_keyboard(world_selection_buttons(db, worlds, player.world_level))
+    )
+
+@router.action("goto_world")
+async def handle_goto_world(query, state: CallbackState, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """世界按钮：{name, world_level}"""
+    world_level = state.params['world_level']
+    if player.world_level < world_level:
+        await edit_message(query, "❌ 你尚未达到该世界等级！", reply_markup=back_keyboard())
+        return
+    
+    world = next((world for world in db.get_worlds_by_level(world_level) if world.name == state.params['name']), None)
+    if world is None:
+        await edit_message(query, "❌ 该世界不存在！", reply_markup=back_keyboard())
+        return
+    
+    text = f"🌍 {world.name} (等级{world.world_level})\n\n"
+    if world.description:
+        text += f"{world.description}\n\n"
+    text += f"💰 主要货币：{world.spirit_stone_type}"
+    await edit_message(query, text, reply_markup=back_keyboard())
+
+# 比武
+BATTLE_ACTIONS = ('accept_battle', 'reject_battle')
+
+async def _claim_challenge(query, state: CallbackState, player: Player, db: GameDatabase) -> bool:
+    """校验点击者并作废挑战的两个按钮令牌，只有第一次有效点击返回 True"""
+    if player.tg_id != state.params['target_id']:
+        await query.answer("这不是给你的挑战", show_alert=True)
+        return False
+    
+    claimed = [callback_states.consume(db, action, **state.params) for action in BATTLE_ACTIONS]
+    if not claimed[BATTLE_ACTIONS.index(state.action)]:
+        await query.answer("挑战已失效", show_alert=True)
+        return False
+    
+    await query.answer()
+    return True
+
+@router.action("accept_battle", answers=True)
+async def handle_accept_battle(query, state: CallbackState, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """接受比武挑战：{challenger_id, target_id}，挑战只能被接受一次"""
+    if not await _claim_challenge(query, state, player, db):
+        return
+    
+    challenger = db.get_player(state.params['challenger_id'])
+    if not challenger:
+        await edit_message(query, "挑战者不存在！")
+        return
+    
+    game_logic.clear_expired_statuses(challenger)
+    game_logic.clear_expired_statuses(player)
+    for fighter in (challenger, player):
+        if fighter.status.get('injured', False) or fighter.status.get('retreating', False):
+            await edit_message(query, f"❌ {fighter.name} 当前状态无法比武！")
+            return
+    
+    result = game_logic.perform_battle(challenger, player)
+    winner = challenger if result['winner_id'] == challenger.tg_id else player
+    
+    text = f"⚔️ {challenger.name} vs {player.name}\n\n"
+    text += f"挑战者战力：{result['challenger_power']}\n"
+    text += f"被挑战者战力：{result['target_power']}\n\n"
+    text += f"🏆 胜者：{winner.name}\n"
+    if 'exp_gain' in result:
+        text += f"⚡ {challenger.name} 获得经验：{result['exp_gain']}"
+        level_ups = 0
+        while game_logic.can_level_up(challenger):
+            game_logic.level_up(challenger)
+            level_ups += 1
+        if level_ups > 0:
+            text += f"\n🎉 {challenger.name} 升级 {level_ups} 次！当前等级：{challenger.level}"
+        db.update_player(challenger)
+    
+    for fighter in (challenger, player):
+        matchmaking_index.refresh(fighter, game_logic)
+    
+    # 不带键盘编辑，按钮随之移除
+    await edit_message(query, text)
+
+@router.action("reject_battle", answers=True)
+async def handle_reject_battle(query, state: CallbackState, player: Player, db: GameDatabase, game_logic: GameLogic):
+    """拒绝比武挑战：{challenger_id, target_id}"""
+    if not await _claim_challenge(query, state, player, db):
+        return
+    
+    await edit_message(query, f"❌ {player.name} 拒绝了比武挑战。")
@@ -0,0 +1,77 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from bot.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Route:
+    handler: Callable
+    needs_player: bool = True
+    name: str = ""
+    answers: bool = False  # 处理函数自行应答回调(如弹出提示)
+
+class CallbackRouter:
+    """回调数据路由：完全匹配用字典，带参数的前缀用前缀树(最长前缀优先)，
+    状态令牌按其动作名分发"""
+
+    def __init__(self):
+        self._exact: Dict[str, Route] = {}
+        self._trie: Dict[str, Any] = {}
+        self._actions: Dict[str, Route] = {}
+
+    def exact(self, data: str, needs_player: bool = True):
+        """注册完全匹配的回调数据"""
+        def decorator(func):
+            if data in self._exact:
+                raise ValueError(f"重复注册回调：{data}")
+            self._exact[data] = Route(metrics.instrument("callback", data)(func), needs_player, data)
+            return func
+        return decorator
+
+    def prefix(self, prefix: str, needs_player: bool = True):
+        """注册前缀匹配的回调数据，如 hunt_、retreat_"""
+        def decorator(func):
+            node = self._trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            if None in node:
+                raise ValueError(f"重复注册回调前缀：{prefix}")
+            name = prefix + "*"
+            node[None] = Route(metrics.instrument("callback", name)(func), needs_player, name)
+            return func
+        return decorator
+
+    def action(self, name: str, needs_player: bool = True, answers: bool = False):
+        """注册状态令牌动作，处理函数收到的 data 为 CallbackState
+
+        answers 为 True 时由处理函数自行调用 query.answer
+        """
+        def decorator(func):
+            if name in self._actions:
+                raise ValueError(f"重复注册回调动作：{name}")
+            route_name = "st:" + name
+            self._actions[name] = Route(
+                metrics.instrument("callback", route_name)(func), needs_player, route_name, answers
+            )
+            return func
+        return decorator
+
+    def resolve_action(self, name: str) -> Optional[Route]:
+        """查找状态令牌动作对应的路由"""
+        return self._actions.get(name)
+
+    def resolve(self, data: str) -> Optional[Route]:
+        """查找回调数据对应的路由"""
+        route = self._exact.get(data)
+        if route is not None:
+            return route
+
+        node = self._trie
+        for ch in data:
+            node = node.get(ch)
+            if node is None:
+                break
+            route = node.get(None, route)
+        return route
@@ -2,8 +2,12 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from database.database import GameDatabase
 from database.models import Player
-from bot.keyboards.panels import *
+from bot.keyboards.panels import main_panel_keyboard
 from bot.utils.game_logic import GameLogic
+from bot.utils.matchmaking import matchmaking_index
+from bot.utils.callback_state import callback_states
+from bot.utils.admins import admin_registry
+from bot.utils.messages import reply_text
 from datetime import datetime
 import config
 
@@ -15,8 +19,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # 检查是否已注册
     existing_player = db.get_player(user.id)
     if existing_player:
-        is_admin = db.is_admin(user.id) or user.id in config.ADMIN_IDS
-        await update.message.reply_text(
+        is_admin = admin_registry.is_admin(db, user.id)
+        await reply_text(
+            update.message,
             f"🎉 欢迎回来，{existing_player.name}！\n"
             f"📊 等级：{existing_player.level}\n"
             f"🌍 当前世界：{existing_player.world or '未选择'}\n"
@@ -34,8 +39,10 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     if db.create_player(player):
-        is_admin = db.is_admin(user.id) or user.id in config.ADMIN_IDS
-        await update.message.reply_text(
+        matchmaking_index.refresh(player, GameLogic(db))
+        is_admin = admin_registry.is_admin(db, user.id)
+        await reply_text(
+            update.message,
             f"🎉 欢迎踏入修仙世界，{player.name}！\n\n"
             f"📊 等级：{player.level}\n"
             f"⚡ 经验：{player.exp}\n"
@@ -46,19 +53,20 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=main_panel_keyboard(is_admin)
         )
     else:
-        await update.message.reply_text("创建角色失败，请稍后重试。")
+        await reply_text(update.message, "创建角色失败，请稍后重试。")
 
 async def panel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """面板命令"""
     if update.effective_chat.type != 'private':
-        await update.message.reply_text("此命令只能在私聊中使用！")
+        await reply_text(update.message, "此命令只能在私聊中使用！")
         return
     
     user_id = update.effective_user.id
     db = GameDatabase(config.DATABASE_PATH)
     
-    is_admin = db.is_admin(user_id) or user_id in config.ADMIN_IDS
-    await update.message.reply_text(
+    is_admin = admin_registry.is_admin(db, user_id)
+    await reply_text(
+        update.message,
         "🎮 修仙世界主面板\n\n"
         "选择你要进行的操作：",
         reply_markup=main_panel_keyboard(is_admin)
@@ -67,11 +75,11 @@ async def panel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def name_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """修改角色名命令"""
     if update.effective_chat.type != 'private':
-        await update.message.reply_text("此命令只能在私聊中使用！")
+        await reply_text(update.message, "此命令只能在私聊中使用！")
         return
     
     if not context.args:
-        await update.message.reply_text("使用格式：/name 新的角色名")
+        await reply_text(update.message, "使用格式：/name 新的角色名")
         return
     
     user_id = update.effective_user.id
@@ -79,30 +87,30 @@ async def name_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     player = db.get_player(user_id)
     
     if not player:
-        await update.message.reply_text("请先使用 /start 创建角色！")
+        await reply_text(update.message, "请先使用 /start 创建角色！")
         return
     
     new_name = " ".join(context.args)
     if len(new_name) > 20:
-        await update.message.reply_text("角色名不能超过20个字符！")
+        await reply_text(update.message, "角色名不能超过20个字符！")
         return
     
     old_name = player.name
     player.name = new_name
     
     if db.update_player(player):
-        await update.message.reply_text(f"✅ 角色名已从 {old_name} 修改为 {new_name}！")
+        await reply_text(update.message, f"✅ 角色名已从 {old_name} 修改为 {new_name}！")
     else:
-        await update.message.reply_text("❌ 修改失败，请稍后重试。")
+        await reply_text(update.message, "❌ 修改失败，请稍后重试。")
 
 async def use_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """使用物品命令"""
     if update.effective_chat.type != 'private':
-        await update.message.reply_text("此命令只能在私聊中使用！")
+        await reply_text(update.message, "此命令只能在私聊中使用！")
         return
     
     if not context.args:
-        await update.message.reply_text("使用格式：/use 物品名")
+        await reply_text(update.message, "使用格式：/use 物品名 [数量]")
         return
     
     user_id = update.effective_user.id
@@ -110,33 +118,38 @@ async def use_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     player = db.get_player(user_id)
     
     if not player:
-        await update.message.reply_text("请先使用 /start 创建角色！")
+        await reply_text(update.message, "请先使用 /start 创建角色！")
         return
     
-    item_name = " ".join(context.args)
+    # 最后一个参数为数字时视为使用数量
+    args = list(context.args)
+    count = 1
+    if len(args) > 1 and args[-1].isdigit():
+        count = int(args.pop())
+    
+    item_name = " ".join(args)
     game_logic = GameLogic(db)
     
-    success, message = game_logic.use_item(player, item_name)
+    success, message = game_logic.use_item(player, item_name, count)
     if success:
-        db.update_player(player)
-        
         # 检查是否可以升级
         while game_logic.can_level_up(player):
             game_logic.level_up(player)
             message += f"\n🎉 升级到 {player.level} 级！"
         
         db.update_player(player)
+        matchmaking_index.refresh(player, game_logic)
     
-    await update.message.reply_text(f"{'✅' if success else '❌'} {message}")
+    await reply_text(update.message, f"{'✅' if success else '❌'} {message}")
 
 async def equip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """装备物品命令"""
     if update.effective_chat.type != 'private':
-        await update.message.reply_text("此命令只能在私聊中使用！")
+        await reply_text(update.message, "此命令只能在私聊中使用！")
         return
     
     if not context.args:
-        await update.message.reply_text("使用格式：/equip 装备名")
+        await reply_text(update.message, "使用格式：/equip 装备名")
         return
     
     user_id = update.effective_user.id
@@ -144,7 +157,7 @@ async def equip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     player = db.get_player(user_id)
     
     if not player:
-        await update.message.reply_text("请先使用 /start 创建角色！")
+        await reply_text(update.message, "请先使用 /start 创建角色！")
         return
     
     equip_name = " ".join(context.args)
@@ -153,24 +166,25 @@ async def equip_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     success, message = game_logic.equip_item(player, equip_name)
     if success:
         db.update_player(player)
+        matchmaking_index.refresh(player, game_logic)
     
-    await update.message.reply_text(f"{'✅' if success else '❌'} {message}")
+    await reply_text(update.message, f"{'✅' if success else '❌'} {message}")
 
 async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """比武命令 (群聊使用)"""
     if update.effective_chat.type == 'private':
-        await update.message.reply_text("比武命令只能在群聊中使用！")
+        await reply_text(update.message, "比武命令只能在群聊中使用！")
         return
     
     if not update.message.reply_to_message:
-        await update.message.reply_text("请回复要挑战的玩家消息使用此命令！")
+        await reply_text(update.message, "请回复要挑战的玩家消息使用此命令！")
         return
     
     challenger_id = update.effective_user.id
     target_id = update.message.reply_to_message.from_user.id
     
     if challenger_id == target_id:
-        await update.message.reply_text("不能挑战自己！")
+        await reply_text(update.message, "不能挑战自己！")
         return
     
     db = GameDatabase(config.DATABASE_PATH)
@@ -178,32 +192,76 @@ async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     target = db.get_player(target_id)
     
     if not challenger:
-        await update.message.reply_text("你还没有创建角色！请私聊bot使用 /start")
+        await reply_text(update.message, "你还没有创建角色！请私聊bot使用 /start")
         return
     
     if not target:
-        await update.message.reply_text("对方还没有创建角色！")
+        await reply_text(update.message, "对方还没有创建角色！")
         return
     
     # 检查状态
     if challenger.status.get('injured', False) or challenger.status.get('retreating', False):
-        await update.message.reply_text("你当前状态无法比武！")
+        await reply_text(update.message, "你当前状态无法比武！")
         return
     
     if target.status.get('injured', False) or target.status.get('retreating', False):
-        await update.message.reply_text("对方当前状态无法比武！")
+        await reply_text(update.message, "对方当前状态无法比武！")
         return
     
     # 创建比武邀请
     keyboard = [
-        [InlineKeyboardButton("⚔️ 接受挑战", callback_data=f"accept_battle_{challenger_id}_{target_id}")],
-        [InlineKeyboardButton("❌ 拒绝挑战", callback_data=f"reject_battle_{challenger_id}_{target_id}")]
+        [InlineKeyboardButton("⚔️ 接受挑战", callback_data=callback_states.encode(
+            db, 'accept_battle', challenger_id=challenger_id, target_id=target_id))],
+        [InlineKeyboardButton("❌ 拒绝挑战", callback_data=callback_states.encode(
+            db, 'reject_battle', challenger_id=challenger_id, target_id=target_id))]
     ]
     
-    await update.message.reply_text(
+    await reply_text(
+        update.message,
         f"⚔️ {challenger.name} 向 {target.name} 发起比武挑战！\n\n"
         f"挑战者战力：{GameLogic(db).calculate_combat_power(challenger)}\n"
         f"被挑战者战力：{GameLogic(db).calculate_combat_power(target)}\n\n"
         f"@{update.message.reply_to_message.from_user.username or target.name} 请选择：",
         reply_markup=InlineKeyboardMarkup(keyboard)
-    )
\ No newline at end of file
+    )
+
+async def match_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """比武匹配命令：查找战力相近的对手"""
+    k = config.MATCH_DEFAULT_COUNT
+    if context.args:
+        try:
+            k = int(context.args[0])
+        except ValueError:
+            await reply_text(update.message, "使用格式：/match [数量]")
+            return
+    k = max(1, min(k, config.MATCH_MAX_COUNT))
+    
+    user_id = update.effective_user.id
+    db = GameDatabase(config.DATABASE_PATH)
+    player = db.get_player(user_id)
+    
+    if not player:
+        await reply_text(update.message, "请先使用 /start 创建角色！")
+        return
+    
+    game_logic = GameLogic(db)
+    matchmaking_index.ensure_loaded(db)
+    
+    power = matchmaking_index.get_power(user_id)
+    if power is None:
+        power = game_logic.calculate_combat_power(player)
+    
+    opponents = matchmaking_index.nearest(player.world_level, power, k, exclude=user_id)
+    if not opponents:
+        await reply_text(update.message, "暂时没有可匹配的对手！")
+        return
+    
+    targets = {target.tg_id: target for target in db.get_players([target_id for target_id, _ in opponents])}
+    text = f"⚔️ 比武匹配 (你的战力：{power})\n\n"
+    for i, (target_id, target_power) in enumerate(opponents, 1):
+        target = targets.get(target_id)
+        if not target:
+            continue
+        text += f"{i}. {target.name} (等级{target.level}) 战力：{target_power}\n"
+    
+    await reply_text(update.message, text)
@@ -1,7 +1,30 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from functools import lru_cache
 from typing import List, Dict, Any
 import config
 
+# 装备部位图标
+SLOT_ICONS = {
+    '头饰': '👑', '服饰': '👕', '腿部': '👖', '手部': '🧤', '鞋子': '👟',
+    '武器': '⚔️', '法器': '🔮',
+    '戒指': '💍', '手串': '📿', '腰带': '🔗', '挂件': '🎗️', '项链': '📿',
+    '玉牌': '🏷️', '香囊': '👝', '称号': '🏆', '护符': '🛡️', '符篆': '📜'
+}
+
+# 刷怪难度图标
+DIFFICULTY_ICONS = ['😊', '😐', '😰']
+
+# 以下键盘只依赖参数和配置，按参数缓存；配置重载后需调用 clear_keyboard_cache()
+
+def _slot_rows(slots, per_row: int = 2):
+    """按部位生成两列按钮"""
+    buttons = [
+        InlineKeyboardButton(f"{SLOT_ICONS.get(slot, '▫️')} {slot}", callback_data=f"equip_{slot}")
+        for slot in slots
+    ]
+    return [buttons[i:i+per_row] for i in range(0, len(buttons), per_row)]
+
+@lru_cache(maxsize=None)
 def main_panel_keyboard(is_admin: bool = False):
     """主面板键盘"""
     keyboard = [
@@ -21,6 +44,7 @@ def main_panel_keyboard(is_admin: bool = False):
     
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def admin_panel_keyboard():
     """管理员面板键盘"""
     keyboard = [
@@ -36,22 +60,11 @@ def admin_panel_keyboard():
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def equipment_panel_keyboard():
     """装备面板键盘"""
-    keyboard = []
-    
     # 基础装备
-    basic_slots = [
-        ("👑 头饰", "equip_头饰"), ("👕 服饰", "equip_服饰"),
-        ("👖 腿部", "equip_腿部"), ("🧤 手部", "equip_手部"),
-        ("👟 鞋子", "equip_鞋子"), ("⚔️ 武器", "equip_武器"),
-        ("🔮 法器", "equip_法器")
-    ]
-    
-    for i in range(0, len(basic_slots), 2):
-        row = [InlineKeyboardButton(name, callback_data=callback) 
-               for name, callback in basic_slots[i:i+2]]
-        keyboard.append(row)
+    keyboard = _slot_rows(config.EQUIPMENT_SLOTS)
     
     # 饰品
     keyboard.append([InlineKeyboardButton("💎 饰品", callback_data="equip_accessories")])
@@ -59,25 +72,14 @@ def equipment_panel_keyboard():
     
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def accessories_keyboard():
     """饰品键盘"""
-    accessories = [
-        ("💍 戒指", "equip_戒指"), ("📿 手串", "equip_手串"),
-        ("🔗 腰带", "equip_腰带"), ("🎗️ 挂件", "equip_挂件"),
-        ("📿 项链", "equip_项链"), ("🏷️ 玉牌", "equip_玉牌"),
-        ("👝 香囊", "equip_香囊"), ("🏆 称号", "equip_称号"),
-        ("🛡️ 护符", "equip_护符"), ("📜 符篆", "equip_符篆")
-    ]
-    
-    keyboard = []
-    for i in range(0, len(accessories), 2):
-        row = [InlineKeyboardButton(name, callback_data=callback) 
-               for name, callback in accessories[i:i+2]]
-        keyboard.append(row)
-    
+    keyboard = _slot_rows(config.ACCESSORY_SLOTS)
     keyboard.append([InlineKeyboardButton("🔙 返回装备", callback_data="panel_equipment")])
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def sect_panel_keyboard(is_member: bool = False, is_leader: bool = False):
     """宗门面板键盘"""
     keyboard = []
@@ -105,20 +107,25 @@ def sect_panel_keyboard(is_member: bool = False, is_leader: bool = False):
     keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="back_to_main")])
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def hunt_difficulty_keyboard():
     """刷怪难度选择键盘"""
-    keyboard = [
-        [InlineKeyboardButton("😊 简单 (受伤率10%)", callback_data="hunt_简单")],
-        [InlineKeyboardButton("😐 普通 (受伤率30%)", callback_data="hunt_普通")],
-        [InlineKeyboardButton("😰 困难 (受伤率60%)", callback_data="hunt_困难")],
-        [InlineKeyboardButton("🔙 返回", callback_data="back_to_main")]
-    ]
+    keyboard = []
+    for i, (difficulty, data) in enumerate(config.HUNT_DIFFICULTIES.items()):
+        icon = DIFFICULTY_ICONS[min(i, len(DIFFICULTY_ICONS) - 1)]
+        keyboard.append([InlineKeyboardButton(
+            f"{icon} {difficulty} (受伤率{data['injury_rate']}%)",
+            callback_data=f"hunt_{difficulty}"
+        )])
+    
+    keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="back_to_main")])
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def retreat_time_keyboard():
     """闭关时间选择键盘"""
     keyboard = []
-    times = [1, 3, 6, 12, 24, 48]
+    times = config.RETREAT_HOURS
     
     for i in range(0, len(times), 2):
         row = []
@@ -131,20 +138,12 @@ def retreat_time_keyboard():
     keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="back_to_main")])
     return InlineKeyboardMarkup(keyboard)
 
-def world_selection_keyboard(worlds: List[Dict], current_world_level: int):
-    """世界选择键盘"""
-    keyboard = []
-    
-    for world_level in range(1, 6):
-        if current_world_level >= world_level:
-            level_worlds = [w for w in worlds if w.world_level == world_level]
-            if level_worlds:
-                for world in level_worlds:
-                    keyboard.append([InlineKeyboardButton(
-                        f"🌍 {world.name} (等级{world_level})", 
-                        callback_data=f"goto_world_{world.name}"
-                    )])
-    
+def world_selection_keyboard(world_buttons: tuple = ()):
+    """世界选择键盘，world_buttons 为 ((世界名, 世界等级, 回调数据), ...)"""
+    keyboard = [
+        [InlineKeyboardButton(f"🌍 {name} (等级{world_level})", callback_data=callback)]
+        for name, world_level, callback in world_buttons
+    ]
     keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="back_to_main")])
     return InlineKeyboardMarkup(keyboard)
 
@@ -167,6 +166,60 @@ def pagination_keyboard(current_page: int, total_pages: int, prefix: str):
     
     return keyboard
 
+# 背包筛选 {筛选: (按钮文字, 回调前缀)}
+INVENTORY_FILTERS = {
+    'all': ("📦 全部", "inv"),
+    'item': ("💊 物品", "inv_item"),
+    'equip': ("⚔️ 装备", "inv_equip")
+}
+
+@lru_cache(maxsize=256)
+def inventory_keyboard(filter_key: str, current_page: int, total_pages: int):
+    """背包分页键盘"""
+    keyboard = [[
+        InlineKeyboardButton(f"✅ {text}" if key == filter_key else text, callback_data=f"{prefix}_page_1")
+        for key, (text, prefix) in INVENTORY_FILTERS.items()
+    ]]
+    keyboard.extend(pagination_keyboard(current_page, total_pages, INVENTORY_FILTERS[filter_key][1]))
+    keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="back_to_main")])
+    return InlineKeyboardMarkup(keyboard)
+
+@lru_cache(maxsize=256)
+def equipment_slot_keyboard(slot: str, current_page: int, total_pages: int, equip_buttons: tuple = ()):
+    """装备部位分页键盘，equip_buttons 为 ((装备名, 回调数据), ...)"""
+    keyboard = [
+        [InlineKeyboardButton(f"⚔️ 装备 {name}", callback_data=callback)]
+        for name, callback in equip_buttons
+    ]
+    keyboard.extend(pagination_keyboard(current_page, total_pages, f"equipslot_{slot}"))
+    back_data = "equip_accessories" if slot in config.ACCESSORY_SLOTS else "panel_equipment"
+    keyboard.append([InlineKeyboardButton("🔙 返回", callback_data=back_data)])
+    return InlineKeyboardMarkup(keyboard)
+
+def sect_list_keyboard(join_buttons: tuple = ()):
+    """宗门列表键盘，join_buttons 为 ((按钮文字, 回调数据), ...)"""
+    keyboard = [[InlineKeyboardButton(text, callback_data=data)] for text, data in join_buttons]
+    keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="panel_sect")])
+    return InlineKeyboardMarkup(keyboard)
+
+def sect_members_keyboard(current_page: int, total_pages: int, next_data: str = ""):
+    """宗门成员列表键盘
+
+    按键集分页只能向后翻，next_data 为下一页的回调数据(含上一页末尾的游标)，为空表示已到末页。
+    """
+    page_buttons = []
+    if current_page > 1:
+        page_buttons.append(InlineKeyboardButton("⏮️", callback_data="sect_members"))
+    if total_pages > 1:
+        page_buttons.append(InlineKeyboardButton(f"{current_page}/{total_pages}", callback_data="noop"))
+    if next_data:
+        page_buttons.append(InlineKeyboardButton("➡️", callback_data=next_data))
+    
+    keyboard = [page_buttons] if page_buttons else []
+    keyboard.append([InlineKeyboardButton("🔙 返回", callback_data="panel_sect")])
+    return InlineKeyboardMarkup(keyboard)
+
+@lru_cache(maxsize=128)
 def back_keyboard(callback_data: str = "back_to_main"):
     """返回按钮键盘"""
     return InlineKeyboardMarkup([[InlineKeyboardButton("🔙 返回", callback_data=callback_data)]])
@@ -180,4 +233,11 @@ def confirm_keyboard(action: str, item_id: str = ""):
         [InlineKeyboardButton("✅ 确认", callback_data=confirm_data),
          InlineKeyboardButton("❌ 取消", callback_data=cancel_data)]
     ]
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+def clear_keyboard_cache():
+    """清空键盘缓存(配置重载后调用)"""
+    for builder in (main_panel_keyboard, admin_panel_keyboard, equipment_panel_keyboard,
+                    accessories_keyboard, sect_panel_keyboard, hunt_difficulty_keyboard,
+                    retreat_time_keyboard, inventory_keyboard, equipment_slot_keyboard, back_keyboard):
+        builder.cache_clear()
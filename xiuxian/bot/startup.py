@@ -0,0 +1,152 @@
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes, TypeHandler
+from database.database import GameDatabase
+from database.profiler import query_profiler
+from bot.utils.lifecycle import lifecycle
+from bot.utils.logs import access_log
+from bot.utils.metrics import metrics
+from tracing import tracer
+import config
+
+logger = logging.getLogger(__name__)
+
+# 处理器清单：(命令, 模块, 函数名)
+USER_COMMANDS: List[Tuple[str, str, str]] = [
+    ("start", "bot.handlers.user_commands", "start_command"),
+    ("panel", "bot.handlers.user_commands", "panel_command"),
+    ("name", "bot.handlers.user_commands", "name_command"),
+    ("use", "bot.handlers.user_commands", "use_command"),
+    ("equip", "bot.handlers.user_commands", "equip_command"),
+    ("match", "bot.handlers.user_commands", "match_command"),
+    ("battle", "bot.handlers.user_commands", "battle_command"),
+]
+
+# 管理员命令很少使用，模块在第一次调用时才导入
+ADMIN_COMMANDS: List[Tuple[str, str, str]] = [
+    ("admin_world", "bot.handlers.admin_commands", "admin_create_world_command"),
+    ("admin_equip", "bot.handlers.admin_commands", "admin_create_equipment_command"),
+    ("admin_item", "bot.handlers.admin_commands", "admin_create_item_command"),
+    ("admin_grant", "bot.handlers.admin_commands", "admin_grant_command"),
+    ("admin_tp", "bot.handlers.admin_commands", "admin_teleport_command"),
+    ("admin_add", "bot.handlers.admin_commands", "admin_add_command"),
+    ("admin_mem", "bot.handlers.admin_commands", "admin_memory_command"),
+]
+
+CALLBACK_HANDLER = ("bot.handlers.callbacks", "callback_handler")
+
+def resolve(module_name: str, attr: str):
+    return getattr(importlib.import_module(module_name), attr)
+
+def lazy_callback(module_name: str, attr: str):
+    """首次调用时才导入模块的处理器"""
+    resolved = None
+
+    async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        nonlocal resolved
+        if resolved is None:
+            started = time.perf_counter()
+            resolved = resolve(module_name, attr)
+            logger.info("已加载 %s.%s，用时 %.1fms", module_name, attr, (time.perf_counter() - started) * 1000)
+        return await resolved(update, context)
+
+    callback.__name__ = attr
+    return callback
+
+class StartupReport:
+    """启动各阶段耗时与首个更新到达时间(time-to-first-update)"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+        self.first_update_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = elapsed
+            logger.info("启动阶段 %s 用时 %.1fms", name, elapsed * 1000)
+
+    def mark_ready(self):
+        self.ready_at = time.monotonic()
+        logger.info("启动完成，共用时 %.1fms", (self.ready_at - self.started_at) * 1000)
+
+    @property
+    def time_to_first_update(self) -> Optional[float]:
+        if self.first_update_at is None:
+            return None
+        return self.first_update_at - self.started_at
+
+    async def on_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """group -1 的 TypeHandler：记录第一个更新到达的时间，不影响后续处理"""
+        if self.first_update_at is not None:
+            return
+        self.first_update_at = time.monotonic()
+        logger.info("收到首个更新，time-to-first-update %.3fs", self.time_to_first_update)
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        metrics = {f"phase_{name}_seconds": elapsed for name, elapsed in self.phases.items()}
+        metrics["ready_seconds"] = self.ready_at - self.started_at if self.ready_at is not None else None
+        metrics["time_to_first_update_seconds"] = self.time_to_first_update
+        return metrics
+
+# 全局启动报告，进程导入本模块时开始计时
+startup_report = StartupReport()
+metrics.add_collector(lambda: {f"xiuxian_startup_{name}": value for name, value in startup_report.as_dict().items()})
+
+def register_handlers(application: Application):
+    """按清单注册处理器"""
+    application.add_handler(TypeHandler(Update, startup_report.on_update), group=-1)
+
+    def command_handler(command: str, callback):
+        callback = query_profiler.profiled(command)(metrics.instrument("command", command)(callback))
+        callback = tracer.traced_update(command)(access_log.logged(command)(callback))
+        return CommandHandler(command, lifecycle.tracked(callback))
+
+    for command, module_name, attr in USER_COMMANDS:
+        application.add_handler(command_handler(command, resolve(module_name, attr)))
+    for command, module_name, attr in ADMIN_COMMANDS:
+        application.add_handler(command_handler(command, lazy_callback(module_name, attr)))
+
+    # 回调路由各自在 CallbackRouter 中记录指标，这里只开启查询统计、追踪与日志范围
+    callback = access_log.logged("callback")(query_profiler.profiled("callback")(resolve(*CALLBACK_HANDLER)))
+    callback = tracer.traced_update("callback")(callback)
+    application.add_handler(CallbackQueryHandler(lifecycle.tracked(callback)))
+
+def warm_up(db: GameDatabase):
+    """在开始接收更新前预热缓存，避免部署后的首批点击承担冷启动开销"""
+    from bot.utils.scheduler import status_scheduler
+    from bot.utils.item_effects import item_catalog
+    from bot.utils.loot import loot_tables
+    from bot.utils.admins import admin_registry
+    from bot.utils.sects import sect_member_counts
+    from bot.utils.matchmaking import matchmaking_index
+
+    with startup_report.phase("timers"):
+        status_scheduler.load(db)
+    with startup_report.phase("catalog"):
+        item_catalog.load(db)
+        loot_tables.rebuild(db)
+    with startup_report.phase("admins"):
+        admin_registry.load(db)
+    with startup_report.phase("sects"):
+        sect_member_counts.load(db)
+    with startup_report.phase("matchmaking"):
+        # 在开始接收更新前构建，首个 /match 不再同步阻塞事件循环
+        matchmaking_index.load(db)
+    with startup_report.phase("sql"):
+        # 每次调用都新建连接，没有可复用的预编译语句；
+        # 这里先把热点查询各执行一次，让数据库页进入系统缓存
+        db.get_player(0)
+        db.get_players([0])
+        db.get_equipment_page([""], None, 1, 1, 1, config.PAGE_SIZE)
+        db.get_callback_state("")
@@ -0,0 +1,59 @@
+import logging
+from typing import Dict, Optional
+from database.database import GameDatabase
+import config
+
+logger = logging.getLogger(__name__)
+
+# 管理员角色等级：数字越大权限越高
+ROLE_NONE = 0
+ROLE_ADMIN = 1
+ROLE_OWNER = 2
+
+ROLE_NAMES = {
+    ROLE_ADMIN: "管理员",
+    ROLE_OWNER: "超级管理员",
+}
+
+class AdminRegistry:
+    """管理员角色缓存
+
+    合并 config.ADMIN_IDS(视为超级管理员)与 admins 表，首次访问时加载，
+    之后的权限判断只查内存，非管理员不再为是否显示⚙️按钮访问数据库。
+    """
+
+    def __init__(self):
+        self._roles: Optional[Dict[int, int]] = None
+
+    def load(self, db: GameDatabase):
+        roles = db.list_admins()
+        for tg_id in config.ADMIN_IDS:
+            roles[tg_id] = ROLE_OWNER
+        self._roles = roles
+        logger.info("管理员列表已加载，共 %s 人", len(roles))
+
+    def invalidate(self):
+        """管理员变更后调用，下次访问时重新加载"""
+        self._roles = None
+
+    def role(self, db: Optional[GameDatabase], tg_id: int) -> int:
+        """获取用户的角色等级，非管理员为 ROLE_NONE
+
+        db 只在缓存尚未加载时使用，为 None 时按需打开默认数据库。
+        """
+        if self._roles is None:
+            self.load(db or GameDatabase(config.DATABASE_PATH))
+        return self._roles.get(tg_id, ROLE_NONE)
+
+    def is_admin(self, db: Optional[GameDatabase], tg_id: int, min_role: int = ROLE_ADMIN) -> bool:
+        return self.role(db, tg_id) >= min_role
+
+    def add(self, db: GameDatabase, tg_id: int, username: str = "", role: int = ROLE_ADMIN) -> bool:
+        """添加管理员并刷新缓存"""
+        if not db.add_admin(tg_id, username, role):
+            return False
+        self.load(db)
+        return True
+
+# 全局管理员缓存
+admin_registry = AdminRegistry()
@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from telegram.ext import ContextTypes
+from database.database import GameDatabase
+import config
+
+logger = logging.getLogger(__name__)
+
+# 带状态令牌的回调数据前缀
+STATE_PREFIX = "st_"
+
+class CallbackState(NamedTuple):
+    action: str
+    params: Dict[str, Any]
+
+class CallbackStateStore:
+    """回调状态令牌存储
+
+    按钮只携带 st_ + 12 字符的令牌，令牌由参数内容哈希得到，相同参数复用同一令牌。
+    参数保存在内存 LRU 与 callback_states 表中，过期后按钮失效。
+    """
+
+    def __init__(self, ttl: float, cache_size: int):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[CallbackState, float]]" = OrderedDict()
+
+    @staticmethod
+    def _payload(action: str, params: Dict[str, Any]) -> str:
+        return json.dumps([action, params], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+    @staticmethod
+    def _token(payload: str) -> str:
+        digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=9).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii')
+
+    def _remember(self, token: str, state: CallbackState, expires_at: float):
+        self._cache[token] = (state, expires_at)
+        self._cache.move_to_end(token)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _lookup(self, action: str, params: Dict[str, Any], now: float) -> Tuple[str, str, bool]:
+        """返回 (令牌, payload, 是否需要写库)；缓存中剩余有效期过半的令牌直接复用"""
+        payload = self._payload(action, params)
+        token = self._token(payload)
+        cached = self._cache.get(token)
+        if cached is not None and cached[1] - now > self.ttl / 2:
+            self._cache.move_to_end(token)
+            return token, payload, False
+        return token, payload, True
+
+    def encode(self, db: GameDatabase, action: str, **params) -> str:
+        """生成携带参数的回调数据"""
+        now = time.time()
+        token, payload, fresh = self._lookup(action, params, now)
+        if fresh:
+            expires_at = now + self.ttl
+            db.set_callback_state(token, payload, expires_at)
+            self._remember(token, CallbackState(action, params), expires_at)
+        return STATE_PREFIX + token
+
+    def encode_many(self, db: GameDatabase, action: str, params_list: List[Dict[str, Any]]) -> List[str]:
+        """批量生成回调数据，新令牌在一次 executemany 中写库"""
+        now = time.time()
+        expires_at = now + self.ttl
+        results, pending = [], {}
+        for params in params_list:
+            token, payload, fresh = self._lookup(action, params, now)
+            if fresh:
+                pending[token] = (payload, params)
+            results.append(STATE_PREFIX + token)
+
+        if pending:
+            db.set_callback_states([(token, payload, expires_at) for token, (payload, _) in pending.items()])
+            for token, (_, params) in pending.items():
+                self._remember(token, CallbackState(action, params), expires_at)
+        return results
+
+    def consume(self, db: GameDatabase, action: str, **params) -> bool:
+        """作废一次性按钮的令牌，返回令牌此前是否有效；并发点击只有一次返回 True"""
+        token = self._token(self._payload(action, params))
+        self._cache.pop(token, None)
+        return db.delete_callback_state(token)
+
+    def decode(self, db: GameDatabase, data: str) -> Optional[CallbackState]:
+        """解析回调数据，令牌不存在或已过期时返回None"""
+        token = data[len(STATE_PREFIX):]
+        now = time.time()
+
+        cached = self._cache.get(token)
+        if cached is not None:
+            state, expires_at = cached
+            if expires_at > now:
+                self._cache.move_to_end(token)
+                return state
+            del self._cache[token]
+            return None
+
+        row = db.get_callback_state(token)
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at <= now:
+            return None
+
+        action, params = json.loads(payload)
+        state = CallbackState(action, params)
+        self._remember(token, state, expires_at)
+        return state
+
+    async def purge_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """JobQueue 回调：清理过期令牌"""
+        removed = GameDatabase(config.DATABASE_PATH).purge_callback_states(time.time())
+        if removed:
+            logger.info("已清理 %s 个过期回调令牌", removed)
+
+# 全局回调状态存储
+callback_states = CallbackStateStore(config.CALLBACK_STATE_TTL, config.CALLBACK_STATE_CACHE_SIZE)
@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Tuple
+import config
+
+class TapDebouncer:
+    """回调点击去重
+
+    同一用户的相同回调数据在上一次仍在处理、或处理结束后的窗口期内再次到达时丢弃；
+    同一个回调查询 id 重复投递(如 webhook 重试)时也丢弃。
+    """
+
+    def __init__(self, window: float, max_entries: int = 10000):
+        self.window = window
+        self.max_entries = max_entries
+        self._inflight = set()
+        self._recent: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._seen_ids: "OrderedDict[Hashable, None]" = OrderedDict()
+
+    def begin(self, user_id: int, data: str, query_id: Hashable = None) -> bool:
+        """开始处理一次点击，返回 False 表示应丢弃"""
+        if query_id is not None:
+            if query_id in self._seen_ids:
+                return False
+            self._seen_ids[query_id] = None
+            if len(self._seen_ids) > self.max_entries:
+                self._seen_ids.popitem(last=False)
+
+        key = (user_id, data)
+        if key in self._inflight:
+            return False
+
+        finished_at = self._recent.get(key)
+        if finished_at is not None and time.monotonic() - finished_at < self.window:
+            return False
+
+        self._inflight.add(key)
+        return True
+
+    def end(self, user_id: int, data: str):
+        """处理结束"""
+        key = (user_id, data)
+        self._inflight.discard(key)
+        self._recent[key] = time.monotonic()
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+tap_debouncer = TapDebouncer(config.CALLBACK_DEBOUNCE_SECONDS)
@@ -1,5 +1,7 @@
 from functools import wraps
 from database.database import GameDatabase
+from bot.utils.admins import admin_registry, ROLE_ADMIN
+from bot.utils.messages import reply_text
 import config
 
 def require_registration(func):
@@ -11,7 +13,8 @@ def require_registration(func):
         player = db.get_player(user_id)
         
         if not player:
-            await update.message.reply_text(
+            await reply_text(
+                update.message,
                 "你还没有开始修仙之旅！\n"
                 "请使用 /start 命令开始游戏。"
             )
@@ -20,26 +23,32 @@ def require_registration(func):
         return await func(update, context, player, db)
     return wrapper
 
+def require_role(min_role: int):
+    """需要指定管理员角色等级的装饰器"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(update, context):
+            user_id = update.effective_user.id
+            
+            # 先查角色缓存，权限不足时不打开数据库
+            if not admin_registry.is_admin(None, user_id, min_role):
+                await reply_text(update.message, "❌ 你没有管理员权限！")
+                return
+            
+            return await func(update, context, GameDatabase(config.DATABASE_PATH))
+        return wrapper
+    return decorator
+
 def require_admin(func):
     """需要管理员权限的装饰器"""
-    @wraps(func)
-    async def wrapper(update, context):
-        user_id = update.effective_user.id
-        db = GameDatabase(config.DATABASE_PATH)
-        
-        if not db.is_admin(user_id) and user_id not in config.ADMIN_IDS:
-            await update.message.reply_text("❌ 你没有管理员权限！")
-            return
-        
-        return await func(update, context, db)
-    return wrapper
+    return require_role(ROLE_ADMIN)(func)
 
 def require_private_chat(func):
     """需要私聊的装饰器"""
     @wraps(func)
     async def wrapper(update, context):
         if update.effective_chat.type != 'private':
-            await update.message.reply_text("此命令只能在私聊中使用！")
+            await reply_text(update.message, "此命令只能在私聊中使用！")
             return
         return await func(update, context)
     return wrapper
\ No newline at end of file
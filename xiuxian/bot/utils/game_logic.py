@@ -1,39 +1,53 @@
 import random
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 from database.database import GameDatabase
-from database.models import Player, Equipment, Item
+from database.models import Player, Equipment, Item, Sect
+from bot.utils.loot import loot_tables
+from bot.utils.item_effects import item_catalog
+from bot.utils.sects import sect_member_counts
+from tracing import tracer
 import config
 
+@tracer.trace_methods("logic")
 class GameLogic:
     def __init__(self, db: GameDatabase):
         self.db = db
     
-    def calculate_total_attributes(self, player: Player) -> Dict[str, float]:
-        """计算玩家总属性(基础+装备)"""
+    def calculate_total_attributes(self, player: Player, equipments: Optional[Dict[str, Equipment]] = None,
+                                   sects: Optional[Dict[int, Sect]] = None) -> Dict[str, float]:
+        """计算玩家总属性(基础+装备+宗门)
+
+        equipments 为已加载的装备 {装备名: 装备}，sects 为已加载的宗门 {宗门ID: 宗门}，
+        批量计算时传入可避免每名玩家各查一次数据库。
+        """
         total_attrs = player.attributes.copy()
         
+        if equipments is None:
+            equipments = self.db.get_equipments(list(player.equipment.values()))
+        
         # 装备加成
         for slot, equip_name in player.equipment.items():
             if equip_name:
-                equipment = self.db.get_equipment(equip_name)
+                equipment = equipments.get(equip_name)
                 if equipment:
                     for attr, value in equipment.attributes.items():
                         total_attrs[attr] = total_attrs.get(attr, 0) + value
         
         # 宗门加成
         if player.sect_id:
-            sect = self.db.get_sect(player.sect_id)
+            sect = sects.get(player.sect_id) if sects is not None else self.db.get_sect(player.sect_id)
             if sect:
                 for attr, value in sect.buffs.items():
                     total_attrs[attr] = total_attrs.get(attr, 0) + value
         
         return total_attrs
     
-    def calculate_combat_power(self, player: Player) -> int:
-        """计算战斗力"""
-        attrs = self.calculate_total_attributes(player)
+    def calculate_combat_power(self, player: Player, attrs: Optional[Dict[str, float]] = None) -> int:
+        """计算战斗力，attrs 为已计算的总属性"""
+        if attrs is None:
+            attrs = self.calculate_total_attributes(player)
         
         # 战斗力 = 攻击力 * 1.5 + 防御力 * 1.2 + 生命值 * 0.8 + 其他属性综合
         power = (
@@ -121,38 +135,49 @@ class GameLogic:
         
         return True, f"已装备 {equip_name}"
     
-    def use_item(self, player: Player, item_name: str) -> Tuple[bool, str]:
-        """使用物品"""
-        if item_name not in player.inventory or player.inventory[item_name] <= 0:
-            return False, "背包中没有此物品"
+    def use_item(self, player: Player, item_name: str, count: int = 1) -> Tuple[bool, str]:
+        """使用物品，count 为一次使用的数量"""
+        if count <= 0:
+            return False, "使用数量必须大于0"
+        
+        if player.inventory.get(item_name, 0) < count:
+            return False, "背包中没有此物品" if item_name not in player.inventory else "物品数量不足"
         
-        item = self.db.get_item(item_name)
-        if not item or not item.usable:
+        compiled = item_catalog.get(self.db, item_name)
+        if not compiled or not compiled.item.usable:
             return False, "此物品无法使用"
         
         # 应用物品效果
-        result_msgs = []
-        for effect, value in item.effects.items():
-            if effect in config.PLAYER_ATTRIBUTES:
-                player.attributes[effect] = player.attributes.get(effect, 0) + value
-                result_msgs.append(f"{effect} +{value}")
-            elif effect == "经验":
-                player.exp += value
-                result_msgs.append(f"经验 +{value}")
-            elif effect == "升级":
-                for _ in range(value):
-                    if self.level_up(player):
-                        result_msgs.append("升级成功！")
-            elif effect in player.spirit_stones:
-                player.spirit_stones[effect] = player.spirit_stones.get(effect, 0) + value
-                result_msgs.append(f"{effect} +{value}")
+        result_msgs = compiled.apply(player, self, count)
         
         # 扣除物品
-        player.inventory[item_name] -= 1
+        player.inventory[item_name] -= count
         if player.inventory[item_name] <= 0:
             del player.inventory[item_name]
         
-        return True, f"使用 {item_name}：" + "，".join(result_msgs)
+        title = f"使用 {item_name}" if count == 1 else f"使用 {item_name} x{count}"
+        return True, f"{title}：" + "，".join(result_msgs)
+    
+    def clear_expired_statuses(self, player: Player, now: Optional[datetime] = None) -> List[str]:
+        """清除已到期的受伤/闭关状态，返回被清除的状态类型"""
+        now = now or datetime.now()
+        cleared = []
+        
+        if player.status.get('injured', False):
+            injured_until = player.status.get('injured_until')
+            if not injured_until or datetime.fromisoformat(injured_until) <= now:
+                player.status.pop('injured', None)
+                player.status.pop('injured_until', None)
+                cleared.append('injured')
+        
+        if player.status.get('retreating', False):
+            retreat_end = player.status.get('retreat_end')
+            if not retreat_end or datetime.fromisoformat(retreat_end) <= now:
+                player.status.pop('retreating', None)
+                player.status.pop('retreat_end', None)
+                cleared.append('retreat')
+        
+        return cleared
     
     def calculate_hunt_rewards(self, player: Player, difficulty: str) -> Dict[str, Any]:
         """计算刷怪奖励"""
@@ -188,18 +213,16 @@ class GameLogic:
             
             # 装备掉落（低概率）
             if random.random() < 0.1 * config_data['reward_multiplier']:
-                dropped_equip = self.generate_random_equipment(player.level, player.world_level)
+                dropped_equip = self.generate_random_equipment(player.level, player.world_level, difficulty)
                 if dropped_equip:
                     results['equipment_dropped'].append(dropped_equip)
                     player.inventory[dropped_equip] = player.inventory.get(dropped_equip, 0) + 1
         
         return results
     
-    def generate_random_equipment(self, player_level: int, world_level: int) -> Optional[str]:
+    def generate_random_equipment(self, player_level: int, world_level: int, difficulty: str = '简单') -> Optional[str]:
         """生成随机装备"""
-        # 这里应该从数据库中随机选择符合等级的装备
-        # 暂时返回None，实际实现需要查询数据库
-        return None
+        return loot_tables.sample(self.db, world_level, player_level, difficulty)
     
     def get_world_currency(self, world_name: str) -> str:
         """获取世界主要货币"""
@@ -257,4 +280,43 @@ class GameLogic:
             challenger.exp += exp_gain
             result['exp_gain'] = exp_gain
         
-        return result
\ No newline at end of file
+        return result
+    
+    def join_sect(self, player: Player, sect: Sect) -> Tuple[bool, str]:
+        """加入宗门并保存，人数上限按缓存的宗门人数检查"""
+        if player.sect_id is not None:
+            return False, "你已加入宗门"
+        
+        if not sect_member_counts.has_room(self.db, sect):
+            return False, f"{sect.name}人数已满({sect.max_members}人)"
+        
+        previous = (player.sect_id, player.sect_position, player.sect_contribution)
+        player.sect_id = sect.id
+        player.sect_position = "弟子"
+        player.sect_contribution = 0
+        if not self.db.update_player(player):
+            player.sect_id, player.sect_position, player.sect_contribution = previous
+            return False, "加入宗门失败，请稍后再试"
+        
+        sect_member_counts.joined(sect.id)
+        return True, f"已加入{sect.name}"
+    
+    def leave_sect(self, player: Player) -> Tuple[bool, str]:
+        """退出宗门并保存"""
+        if player.sect_id is None:
+            return False, "你尚未加入宗门"
+        
+        sect = self.db.get_sect(player.sect_id)
+        if sect and sect.leader_id == player.tg_id:
+            return False, "宗主无法退出宗门"
+        
+        previous = (player.sect_id, player.sect_position, player.sect_contribution)
+        player.sect_id = None
+        player.sect_position = "弟子"
+        player.sect_contribution = 0
+        if not self.db.update_player(player):
+            player.sect_id, player.sect_position, player.sect_contribution = previous
+            return False, "退出宗门失败，请稍后再试"
+        
+        sect_member_counts.left(previous[0])
+        return True, f"已退出{sect.name if sect else '宗门'}"
@@ -0,0 +1,130 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from database.database import GameDatabase
+from database.models import Player, Item
+import config
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_KEYS = frozenset(config.PLAYER_ATTRIBUTES)
+STONE_KEYS = frozenset(config.SPIRIT_STONE_TYPES)
+
+@dataclass(frozen=True)
+class AttributeEffect:
+    """属性加成"""
+    attr: str
+    value: float
+
+    def apply(self, player: Player, game_logic, count: int) -> List[str]:
+        total = self.value * count
+        player.attributes[self.attr] = player.attributes.get(self.attr, 0) + total
+        return [f"{self.attr} +{total}"]
+
+@dataclass(frozen=True)
+class ExpEffect:
+    """经验"""
+    value: int
+
+    def apply(self, player: Player, game_logic, count: int) -> List[str]:
+        total = self.value * count
+        player.exp += total
+        return [f"经验 +{total}"]
+
+@dataclass(frozen=True)
+class LevelUpEffect:
+    """升级(经验足够时)"""
+    times: int
+
+    def apply(self, player: Player, game_logic, count: int) -> List[str]:
+        levels = 0
+        for _ in range(self.times * count):
+            if not game_logic.level_up(player):
+                break
+            levels += 1
+        return [f"升级 {levels} 次！"] if levels else []
+
+@dataclass(frozen=True)
+class StoneEffect:
+    """灵石"""
+    currency: str
+    value: int
+
+    def apply(self, player: Player, game_logic, count: int) -> List[str]:
+        total = self.value * count
+        player.spirit_stones[self.currency] = player.spirit_stones.get(self.currency, 0) + total
+        return [f"{self.currency} +{total}"]
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def compile_effects(effects: Dict[str, Any], strict: bool = True) -> List[Any]:
+    """将物品效果编译为效果操作列表
+
+    strict 为 True 时遇到无效效果抛出 ValueError，否则记录日志并跳过。
+    """
+    ops = []
+    for key, value in effects.items():
+        try:
+            if key == "升级":
+                if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                    raise ValueError(f"效果 {key} 的值必须是正整数")
+                ops.append(LevelUpEffect(value))
+                continue
+
+            if not _is_number(value):
+                raise ValueError(f"效果 {key} 的值必须是数字")
+
+            if key in ATTRIBUTE_KEYS:
+                ops.append(AttributeEffect(key, value))
+            elif key == "经验":
+                ops.append(ExpEffect(int(value)))
+            elif key in STONE_KEYS:
+                ops.append(StoneEffect(key, int(value)))
+            else:
+                raise ValueError(f"未知效果：{key}")
+        except ValueError as e:
+            if strict:
+                raise
+            logger.warning("忽略无效物品效果: %s", e)
+
+    # 升级效果放在最后，先获得本次的经验
+    ops.sort(key=lambda op: isinstance(op, LevelUpEffect))
+    return ops
+
+@dataclass
+class CompiledItem:
+    item: Item
+    ops: List[Any] = field(default_factory=list)
+
+    def apply(self, player: Player, game_logic, count: int = 1) -> List[str]:
+        """一次性应用 count 次物品效果，返回效果描述"""
+        msgs = []
+        for op in self.ops:
+            msgs.extend(op.apply(player, game_logic, count))
+        return msgs
+
+class ItemCatalog:
+    """物品目录，加载时编译物品效果"""
+
+    def __init__(self):
+        self._items: Optional[Dict[str, CompiledItem]] = None
+
+    def load(self, db: GameDatabase):
+        items = {}
+        for item in db.list_items():
+            items[item.name] = CompiledItem(item, compile_effects(item.effects, strict=False))
+        self._items = items
+        logger.info("物品目录已加载，共 %s 种物品", len(items))
+
+    def invalidate(self):
+        """物品目录变更后调用，下次访问时重新加载"""
+        self._items = None
+
+    def get(self, db: GameDatabase, name: str) -> Optional[CompiledItem]:
+        if self._items is None:
+            self.load(db)
+        return self._items.get(name)
+
+# 全局物品目录
+item_catalog = ItemCatalog()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import signal
+import time
+from functools import wraps
+from typing import Callable, Optional, Set
+from telegram.ext import Application
+from database.database import GameDatabase
+from bot.utils.scheduler import status_scheduler
+from bot.utils.send_queue import send_queue
+from bot.utils.metrics import metrics, metrics_server
+from tracing import tracer
+import config
+
+logger = logging.getLogger(__name__)
+
+class Lifecycle:
+    """进程生命周期：启动时挂接信号，停机时依次
+
+    1. 停止接收新更新(轮询/webhook 先于 Application.stop 停止)
+    2. 等待处理中的 handler 完成，超过 SHUTDOWN_DRAIN_TIMEOUT 的被取消
+    3. 处理一轮已到期的限时状态，刷出发送队列
+    4. 数据库 WAL 检查点
+    """
+
+    def __init__(self, drain_timeout: float, flush_timeout: float):
+        self.drain_timeout = drain_timeout
+        self.flush_timeout = flush_timeout
+        self.shutting_down = False
+        self._deadline: Optional[float] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._cancelled: Set[asyncio.Task] = set()
+        self._signals_installed = False
+        self.dropped = 0
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def tracked(self, callback):
+        """包装 handler，使停机时能够等待或取消它"""
+        @wraps(callback)
+        async def wrapper(update, context):
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                self.dropped += 1
+                return
+
+            task = asyncio.ensure_future(callback(update, context))
+            self._inflight.add(task)
+            try:
+                return await task
+            except asyncio.CancelledError:
+                if task not in self._cancelled:
+                    raise
+                logger.warning("停机超时，已取消处理中的 %s", getattr(callback, '__name__', callback))
+            finally:
+                self._inflight.discard(task)
+                self._cancelled.discard(task)
+        return wrapper
+
+    def install_signal_handlers(self, stop: Callable[[], None]):
+        """SIGINT/SIGTERM 时进入停机流程并调用 stop 结束主循环"""
+        loop = asyncio.get_running_loop()
+
+        def handle():
+            self.begin_shutdown()
+            stop()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, handle)
+            except NotImplementedError:
+                pass
+        self._signals_installed = True
+
+    def begin_shutdown(self):
+        if self.shutting_down:
+            return
+        self.shutting_down = True
+        self._deadline = time.monotonic() + self.drain_timeout
+        asyncio.get_running_loop().call_later(self.drain_timeout, self._cancel_inflight)
+        logger.info("开始停机，处理中的请求 %s 个", len(self._inflight))
+
+    def _cancel_inflight(self):
+        for task in self._inflight:
+            if not task.done():
+                self._cancelled.add(task)
+                task.cancel()
+
+    async def post_init(self, application: Application):
+        send_queue.start()
+        if metrics.enabled:
+            await metrics_server.start()
+        if not self._signals_installed:
+            self.install_signal_handlers(application.stop_running)
+
+    async def post_stop(self, application: Application):
+        """Application.stop 之后：更新处理与定时任务都已结束，Bot 连接仍可用"""
+        if self.dropped:
+            logger.warning("停机等待超时，丢弃了 %s 个未处理的更新", self.dropped)
+        try:
+            await status_scheduler.expire_due(application.bot)
+        except Exception as e:
+            logger.error("停机前处理到期状态失败: %s", e)
+        pending = len(send_queue)
+        await send_queue.close(self.flush_timeout)
+        logger.info("发送队列已刷出 (%s 条待发)", pending)
+
+    async def post_shutdown(self, application: Application):
+        await metrics_server.stop()
+        tracer.close()
+        GameDatabase(config.DATABASE_PATH).checkpoint()
+        logger.info("数据库检查点完成，已安全退出")
+
+# 全局生命周期管理
+lifecycle = Lifecycle(config.SHUTDOWN_DRAIN_TIMEOUT, config.SHUTDOWN_FLUSH_TIMEOUT)
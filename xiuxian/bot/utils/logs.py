@@ -0,0 +1,217 @@
+"""日志管道
+
+事件循环中的 logger 只经过 QueueHandler：在调用方线程注入请求上下文、按类别采样、
+对重复告警限流后把记录放入有界队列，格式化(含 % 参数展开与异常堆栈)与写 stderr
+都在 QueueListener 的后台线程中完成，输出阻塞时不会卡住事件循环；队列满时丢弃并计数。
+"""
+import asyncio
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from bot.utils.metrics import metrics
+from tracing import tracer
+import config
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("access")
+
+# 当前更新的日志上下文：user_id、route
+_context: ContextVar[Optional[dict]] = ContextVar('log_context', default=None)
+
+# 结构化字段，来自请求上下文或 extra=
+STRUCTURED_FIELDS = ("user_id", "route", "latency_ms", "outcome", "trace_id", "suppressed")
+
+class ContextFilter(logging.Filter):
+    """把当前更新的 user_id、route 与 trace_id 附加到记录上(必须在调用方线程执行)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        if context is not None:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        if not hasattr(record, "trace_id"):
+            trace_id = tracer.current_trace_id()
+            if trace_id is not None:
+                record.trace_id = trace_id
+        return True
+
+class SamplingFilter(logging.Filter):
+    """按 logger 名前缀对 WARNING 以下的记录采样，告警与错误总是保留"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            # 最长前缀优先
+            for category in sorted(self.rates, key=len, reverse=True):
+                if name == category or name.startswith(category + "."):
+                    rate = self.rates[category]
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+class RateLimitFilter(logging.Filter):
+    """同一 logger、级别与消息模板的告警/错误，每个窗口最多输出 burst 条
+
+    以未展开参数的消息模板为键，同一类错误即使异常文本不同也会被归并；
+    窗口结束后该类的下一条记录带上 suppressed 字段，说明上个窗口丢弃了多少条。
+    """
+
+    def __init__(self, window: float, burst: int, max_keys: int = 10000):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        # 键 -> [窗口开始时间, 本窗口已输出条数, 本窗口丢弃条数]
+        self._windows: Dict[Tuple[str, int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        state = self._windows.get(key)
+        if state is None or now - state[0] >= self.window:
+            if state is not None and state[2]:
+                record.suppressed = state[2]
+            if state is None and len(self._windows) >= self.max_keys:
+                self._windows.clear()
+            self._windows[key] = [now, 1, 0]
+            return True
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+        state[2] += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    """每条记录一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """文本格式，结构化字段附在消息之后"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = " ".join(
+            f"{field}={getattr(record, field)}" for field in STRUCTURED_FIELDS
+            if getattr(record, field, None) is not None
+        )
+        return f"{text} [{fields}]" if fields else text
+
+class LazyQueueHandler(QueueHandler):
+    """不在调用方格式化的 QueueHandler，队列满时丢弃
+
+    标准 QueueHandler.prepare 会在调用方线程展开消息与异常堆栈；这里原样入队，
+    展开推迟到监听线程。日志参数应为不再修改的值(字符串、数字、异常等)。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class AccessLog:
+    """每个更新结束时输出一条访问日志：user_id、route、latency_ms、outcome"""
+
+    def logged(self, name: str):
+        """为每个更新开启日志上下文，name 为命令名等入口名称"""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(update, context):
+                user = getattr(update, 'effective_user', None)
+                log_context = {"user_id": user.id if user is not None else None, "route": name}
+                token = _context.set(log_context)
+                started = time.perf_counter()
+                outcome = "ok"
+                try:
+                    return await func(update, context)
+                except BaseException as e:
+                    outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+                    raise
+                finally:
+                    _context.reset(token)
+                    # 出错的访问记为告警，不参与采样
+                    access_logger.log(
+                        logging.INFO if outcome == "ok" else logging.WARNING,
+                        "%s %s", log_context["route"], outcome,
+                        extra={**log_context, "latency_ms": round((time.perf_counter() - started) * 1000, 2), "outcome": outcome},
+                    )
+            return wrapper
+        return decorator
+
+    def annotate(self, route: str):
+        """在日志上下文中细化路由名称，如回调路由"""
+        context = _context.get()
+        if context is not None:
+            context["route"] = route
+
+# 全局访问日志
+access_log = AccessLog()
+
+def setup_logging(level: str = None, fmt: str = None) -> QueueListener:
+    """配置根 logger 走队列，返回已启动的 QueueListener(停机时需 stop 以刷出剩余记录)"""
+    stream = logging.StreamHandler(sys.stderr)
+    if (fmt or config.LOG_FORMAT) == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    handler = LazyQueueHandler(queue.Queue(config.LOG_QUEUE_SIZE))
+    # 先丢弃再注入上下文，被采样或限流掉的记录不做多余工作
+    handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATES))
+    handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT_WINDOW, config.LOG_RATE_LIMIT_BURST))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level or config.LOG_LEVEL)
+    metrics.add_collector(lambda: {"xiuxian_log_dropped": handler.dropped})
+
+    listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,144 @@
+import random
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+from database.database import GameDatabase
+from database.models import Equipment
+import config
+
+logger = logging.getLogger(__name__)
+
+class AliasTable:
+    """Walker 别名法加权抽样表，构建 O(n)，抽样 O(1)"""
+
+    def __init__(self, items: Sequence[str], weights: Sequence[float]):
+        if not items or len(items) != len(weights):
+            raise ValueError("物品与权重数量不一致或为空")
+
+        n = len(items)
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重总和必须大于0")
+
+        self.items = list(items)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # 剩余项因浮点误差落在1附近，直接取自身
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def sample(self, rng: random.Random = random) -> str:
+        """抽取一个物品"""
+        i = int(rng.random() * len(self.items))
+        if rng.random() < self.prob[i]:
+            return self.items[i]
+        return self.items[self.alias[i]]
+
+def quality_weight(quality: str, difficulty: str) -> float:
+    """品质权重：品质越高越稀有，难度倍率越高稀有品质越容易掉落"""
+    try:
+        rank = config.EQUIPMENT_QUALITIES.index(quality)
+    except ValueError:
+        return 0.0
+
+    difficulty_data = config.HUNT_DIFFICULTIES.get(difficulty, config.HUNT_DIFFICULTIES['简单'])
+    return config.LOOT_QUALITY_DECAY ** (rank / difficulty_data['reward_multiplier'])
+
+def level_band(level: int) -> int:
+    """玩家等级所在分段"""
+    return max(0, level) // config.LOOT_LEVEL_BAND
+
+class LootTables:
+    """按 (世界等级, 等级分段, 难度) 预计算的装备掉落表
+
+    世界等级与分段超过装备目录中最高要求后，可掉落的装备集合不再变化，
+    查询时把二者截到该上限，因此有限个表即可覆盖所有玩家，rebuild 时一次算好。
+    """
+
+    def __init__(self):
+        self._catalog: Optional[List[Equipment]] = None
+        self._tables: Dict[Tuple[int, int, str], Optional[AliasTable]] = {}
+        self._max_world_level = 1
+        self._max_band = 0
+
+    def __len__(self):
+        """已计算的掉落表数量"""
+        return len(self._tables)
+
+    def rebuild(self, db: GameDatabase):
+        """重新加载装备目录并预计算全部掉落表"""
+        self._catalog = db.list_equipment()
+        self._max_world_level = max([1] + [e.world_level_requirement for e in self._catalog])
+        self._max_band = max([0] + [-(-e.level_requirement // config.LOOT_LEVEL_BAND) for e in self._catalog])
+        self._tables = {
+            (world_level, band, difficulty): self._build_table(world_level, band, difficulty)
+            for world_level in range(1, self._max_world_level + 1)
+            for band in range(self._max_band + 1)
+            for difficulty in config.HUNT_DIFFICULTIES
+        }
+        logger.info("掉落表已重建，装备目录 %s 件，掉落表 %s 个", len(self._catalog), len(self._tables))
+
+    def invalidate(self):
+        """装备目录变更后调用，下次抽样时重新加载"""
+        self._catalog = None
+        self._tables = {}
+
+    def get_table(self, db: GameDatabase, world_level: int, level: int, difficulty: str) -> Optional[AliasTable]:
+        """获取掉落表，没有可掉落装备时返回None"""
+        if self._catalog is None:
+            self.rebuild(db)
+
+        key = (min(world_level, self._max_world_level), min(level_band(level), self._max_band), difficulty)
+        if key not in self._tables:
+            # 预计算范围之外(如未知难度、世界等级小于1)时按需构建
+            self._tables[key] = self._build_table(*key)
+        return self._tables[key]
+
+    def _build_table(self, world_level: int, band: int, difficulty: str) -> Optional[AliasTable]:
+        # 只掉落分段内所有玩家都能装备的装备
+        max_level = max(1, band * config.LOOT_LEVEL_BAND)
+
+        names = []
+        weights = []
+        for equipment in self._catalog:
+            if equipment.level_requirement > max_level:
+                continue
+            if equipment.world_level_requirement > world_level:
+                continue
+            weight = quality_weight(equipment.quality, difficulty)
+            if weight > 0:
+                names.append(equipment.name)
+                weights.append(weight)
+
+        if not names:
+            return None
+        return AliasTable(names, weights)
+
+    def sample(self, db: GameDatabase, world_level: int, level: int, difficulty: str,
+               rng: random.Random = random) -> Optional[str]:
+        """随机抽取一件掉落装备"""
+        table = self.get_table(db, world_level, level, difficulty)
+        if table is None:
+            return None
+        return table.sample(rng)
+
+# 全局掉落表
+loot_tables = LootTables()
@@ -0,0 +1,119 @@
+import bisect
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from database.database import GameDatabase
+from database.models import Player
+from bot.utils.game_logic import GameLogic
+
+logger = logging.getLogger(__name__)
+
+def is_available(player: Player) -> bool:
+    """玩家当前是否可以比武(未受伤且未闭关)"""
+    status = player.status
+    if status.get('retreating', False):
+        return False
+    if status.get('injured', False):
+        injured_until = status.get('injured_until')
+        if not injured_until or datetime.now() < datetime.fromisoformat(injured_until):
+            return False
+    return True
+
+class MatchmakingIndex:
+    """按世界等级分区、以战斗力排序的比武匹配索引
+
+    每个分区是按 (战斗力, tg_id) 有序的列表，只收录可以比武的玩家，
+    查询用二分定位后向两侧扩展，复杂度 O(log n + k)。
+    """
+
+    def __init__(self):
+        self._partitions: Dict[int, List[Tuple[int, int]]] = {}
+        self._entries: Dict[int, Tuple[int, int]] = {}  # tg_id -> (world_level, power)
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: GameDatabase):
+        """从数据库构建索引
+
+        装备目录与宗门各读取一次，玩家只读取计算战斗力所需的列，
+        整个构建共三次查询；每个分区排序一次而不是逐个插入。
+        """
+        game_logic = GameLogic(db)
+        equipments = {equipment.name: equipment for equipment in db.list_equipment()}
+        sects = {sect.id: sect for sect in db.list_sects()}
+        partitions: Dict[int, List[Tuple[int, int]]] = {}
+        entries: Dict[int, Tuple[int, int]] = {}
+        for player in db.list_players_for_matchmaking():
+            if is_available(player):
+                attrs = game_logic.calculate_total_attributes(player, equipments, sects)
+                power = game_logic.calculate_combat_power(player, attrs)
+                partitions.setdefault(player.world_level, []).append((power, player.tg_id))
+                entries[player.tg_id] = (player.world_level, power)
+        for partition in partitions.values():
+            partition.sort()
+        self._partitions = partitions
+        self._entries = entries
+        self._loaded = True
+        logger.info("比武匹配索引已构建，共 %s 名玩家", len(self._entries))
+
+    def ensure_loaded(self, db: GameDatabase):
+        if not self._loaded:
+            self.load(db)
+
+    def refresh(self, player: Player, game_logic: GameLogic):
+        """属性、装备或状态变化后更新玩家的索引项
+
+        索引尚未构建时直接跳过，首次查询时会整体构建。
+        """
+        if not self._loaded:
+            return
+
+        self.remove(player.tg_id)
+        if is_available(player):
+            self._insert(player.tg_id, player.world_level, game_logic.calculate_combat_power(player))
+
+    def remove(self, tg_id: int):
+        """移除玩家"""
+        entry = self._entries.pop(tg_id, None)
+        if entry is None:
+            return
+
+        world_level, power = entry
+        partition = self._partitions[world_level]
+        i = bisect.bisect_left(partition, (power, tg_id))
+        if i < len(partition) and partition[i] == (power, tg_id):
+            del partition[i]
+
+    def _insert(self, tg_id: int, world_level: int, power: int):
+        bisect.insort(self._partitions.setdefault(world_level, []), (power, tg_id))
+        self._entries[tg_id] = (world_level, power)
+
+    def get_power(self, tg_id: int) -> Optional[int]:
+        entry = self._entries.get(tg_id)
+        return entry[1] if entry else None
+
+    def nearest(self, world_level: int, power: int, k: int, exclude: Optional[int] = None) -> List[Tuple[int, int]]:
+        """返回同世界等级中战斗力最接近的 k 名玩家 [(tg_id, power)]"""
+        partition = self._partitions.get(world_level, [])
+        right = bisect.bisect_left(partition, (power, -1))
+        left = right - 1
+        result = []
+
+        while len(result) < k and (left >= 0 or right < len(partition)):
+            if right >= len(partition) or (left >= 0 and power - partition[left][0] <= partition[right][0] - power):
+                candidate_power, tg_id = partition[left]
+                left -= 1
+            else:
+                candidate_power, tg_id = partition[right]
+                right += 1
+
+            if tg_id != exclude:
+                result.append((tg_id, candidate_power))
+
+        return result
+
+# 全局比武匹配索引
+matchmaking_index = MatchmakingIndex()
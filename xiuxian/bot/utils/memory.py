@@ -0,0 +1,125 @@
+import gc
+import logging
+import os
+import tracemalloc
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 重点关注的对象类型
+TRACKED_TYPES = (
+    "Player", "Equipment", "Item", "Sect", "CompiledItem", "AliasTable", "CallbackState",
+    "InlineKeyboardMarkup", "InlineKeyboardButton", "Update", "Message",
+)
+
+# 不计入分配统计的帧
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+def rss_bytes() -> Optional[int]:
+    """当前常驻内存(RSS)，无法获取时返回None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # 非 Linux 平台只能取到峰值
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+def object_counts() -> Counter:
+    """gc 跟踪的对象按类型名计数"""
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+class MemoryTracker:
+    """tracemalloc 快照与差异
+
+    start() 开启跟踪并记录基准快照，之后每次 snapshot() 与上一次快照比较，
+    按源码行列出增长最多的分配位置，便于把长时间运行中的泄漏定位到具体模块。
+    """
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._previous = self._take()
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, name) for name in _IGNORED_FILES]
+        )
+
+    def snapshot(self, limit: int = 10) -> Tuple[List[tracemalloc.Statistic], List[tracemalloc.StatisticDiff]]:
+        """返回 (当前占用最多的位置, 相对上次快照增长最多的位置)"""
+        current = self._take()
+        top = current.statistics('lineno')[:limit]
+        diff = current.compare_to(self._previous, 'lineno')[:limit] if self._previous is not None else []
+        self._previous = current
+        return top, diff
+
+def _site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{_short_path(frame.filename)}:{frame.lineno}"
+
+def _short_path(filename: str) -> str:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if filename.startswith(root):
+        return os.path.relpath(filename, root)
+    parts = filename.replace('\\', '/').split('/')
+    return '/'.join(parts[-2:])
+
+def memory_report(tracker: "MemoryTracker", limit: int = 10, types: Sequence[str] = TRACKED_TYPES) -> str:
+    """生成内存报告文本"""
+    lines = []
+    rss = rss_bytes()
+    lines.append(f"💾 RSS：{format_size(rss) if rss is not None else '未知'}")
+
+    counts = object_counts()
+    lines.append("\n📦 重点对象：")
+    lines.extend(f"  {name}：{counts.get(name, 0)}" for name in types)
+    lines.append("\n📊 数量最多的类型：")
+    lines.extend(f"  {name}：{count}" for name, count in counts.most_common(limit))
+
+    if tracker.tracing:
+        top, diff = tracker.snapshot(limit)
+        traced, peak = tracemalloc.get_traced_memory()
+        lines.append(f"\n🔍 tracemalloc：当前 {format_size(traced)}，峰值 {format_size(peak)}")
+        lines.append("占用最多：")
+        lines.extend(f"  {_site(stat)} {format_size(stat.size)} ({stat.count})" for stat in top)
+        if diff:
+            lines.append("较上次快照增长：")
+            lines.extend(
+                f"  {_site(stat)} {'+' if stat.size_diff > 0 else ''}{format_size(stat.size_diff)} ({stat.count_diff:+d})"
+                for stat in diff if stat.size_diff
+            )
+    else:
+        lines.append("\ntracemalloc 未开启")
+
+    return "\n".join(lines)
+
+# 全局内存跟踪
+memory_tracker = MemoryTracker()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import partial
+from typing import Hashable, Optional
+from telegram.error import BadRequest
+from bot.utils.send_queue import send_queue, PRIORITY_INTERACTIVE
+import config
+
+logger = logging.getLogger(__name__)
+
+class EditFingerprints:
+    """记录每条消息最后一次编辑内容的指纹 (LRU)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._fingerprints: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[int]:
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is not None:
+            self._fingerprints.move_to_end(key)
+        return fingerprint
+
+    def set(self, key: Hashable, fingerprint: int):
+        self._fingerprints[key] = fingerprint
+        self._fingerprints.move_to_end(key)
+        if len(self._fingerprints) > self.maxsize:
+            self._fingerprints.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._fingerprints.pop(key, None)
+
+edit_fingerprints = EditFingerprints(config.EDIT_FINGERPRINT_CACHE_SIZE)
+
+def message_key(query) -> Optional[Hashable]:
+    """回调查询所属消息的标识"""
+    if query.message is not None:
+        return (query.message.chat_id, query.message.message_id)
+    if query.inline_message_id:
+        return query.inline_message_id
+    return None
+
+def content_fingerprint(text: str, reply_markup=None) -> int:
+    return hash((text, reply_markup))
+
+def _edit_done(key: Optional[Hashable], future: asyncio.Future):
+    """编辑发出后的回调：失败时清除指纹，使下次相同内容的编辑不会被跳过"""
+    if future.cancelled():
+        if key is not None:
+            edit_fingerprints.discard(key)
+        return
+    e = future.exception()
+    if e is None:
+        return
+    if isinstance(e, BadRequest) and "message is not modified" in str(e).lower():
+        logger.debug("消息内容未变化：%s", key)
+        return
+    if key is not None:
+        edit_fingerprints.discard(key)
+    logger.warning("编辑消息失败 %s: %s", key, e)
+
+async def edit_message(query, text: str, reply_markup=None, **kwargs) -> bool:
+    """编辑回调消息，内容与上次相同时跳过，返回是否提交了编辑
+
+    编辑只提交到发送队列而不等待发出：会话限流的等待不占用更新处理，
+    一个会话的点击不会拖慢其他用户；发送失败在回调中记录日志。
+    """
+    key = message_key(query)
+    fingerprint = content_fingerprint(text, reply_markup)
+
+    if key is not None and edit_fingerprints.get(key) == fingerprint:
+        return False
+
+    chat_id = query.message.chat_id if query.message is not None else None
+    future = send_queue.submit(
+        chat_id,
+        lambda: query.edit_message_text(text, reply_markup=reply_markup, **kwargs),
+        PRIORITY_INTERACTIVE,
+        coalesce_key=('edit', key) if key is not None else None
+    )
+    future.add_done_callback(partial(_edit_done, key))
+
+    if key is not None:
+        edit_fingerprints.set(key, fingerprint)
+    return True
+
+def _reply_done(chat_id: Optional[int], future: asyncio.Future):
+    if future.cancelled():
+        return
+    e = future.exception()
+    if e is not None:
+        logger.warning("回复消息失败 %s: %s", chat_id, e)
+
+async def reply_text(message, text: str, **kwargs) -> asyncio.Future:
+    """经发送队列以交互优先级回复消息，计入全局与会话限流
+
+    与 edit_message 一样只提交不等待，返回发送结果的 Future；失败在回调中记录日志。
+    """
+    future = send_queue.submit(
+        message.chat_id,
+        lambda: message.reply_text(text, **kwargs),
+        PRIORITY_INTERACTIVE
+    )
+    future.add_done_callback(partial(_reply_done, message.chat_id))
+    return future
@@ -0,0 +1,204 @@
+import asyncio
+import bisect
+import logging
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from telegram.request import HTTPXRequest
+from tracing import tracer
+import config
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """累计分桶直方图"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """进程内指标：handler 延迟直方图、错误计数、处理中数量，以 Prometheus 文本格式导出
+
+    未开启时 instrument 直接返回原函数，不引入额外开销。
+    """
+
+    def __init__(self, enabled: bool, buckets: Sequence[float]):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Dict[str, Optional[float]]]] = []
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def observe(self, name: str, labels: Labels, value: float):
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, labels: Labels, value: float = 1):
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def gauge_add(self, name: str, labels: Labels, value: float):
+        series = self._gauges.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def add_collector(self, collector: Callable[[], Dict[str, Optional[float]]]):
+        """导出时调用，返回 {指标名: 值} 作为无标签 gauge"""
+        self._collectors.append(collector)
+
+    def instrument(self, kind: str, name: str):
+        """记录 handler 的延迟、错误数和处理中数量
+
+        kind 为 command 或 callback，name 为命令名或回调路由
+        """
+        def decorator(func):
+            if not self.enabled:
+                return func
+            labels = (("kind", kind), ("handler", name))
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                self.gauge_add("xiuxian_handler_inflight", labels, 1)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    self.inc("xiuxian_handler_errors_total", labels)
+                    raise
+                finally:
+                    self.observe("xiuxian_handler_latency_seconds", labels, time.perf_counter() - started)
+                    self.gauge_add("xiuxian_handler_inflight", labels, -1)
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+
+        def header(name: str, kind: str):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    bound_label = _format_labels(labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{bound_label} {cumulative}")
+                inf_label = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{inf_label} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, series in sorted(self._gauges.items()):
+            header(name, "gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            for name, value in collector().items():
+                if value is not None:
+                    header(name, "gauge")
+                    lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+# 全局指标
+metrics = Metrics(config.METRICS_ENABLED, config.METRICS_BUCKETS)
+metrics.describe("xiuxian_handler_latency_seconds", "Handler latency by command or callback route")
+metrics.describe("xiuxian_handler_errors_total", "Handler exceptions by command or callback route")
+metrics.describe("xiuxian_handler_inflight", "Handlers currently running")
+metrics.describe("xiuxian_telegram_api_latency_seconds", "Telegram Bot API call latency by method")
+metrics.describe("xiuxian_telegram_api_errors_total", "Telegram Bot API calls that raised")
+
+class TimedRequest(HTTPXRequest):
+    """记录每次 Telegram API 调用耗时与追踪 span 的请求对象(不用于 getUpdates 长轮询)"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        labels = (("method", api_method),)
+        started = time.perf_counter()
+        try:
+            with tracer.span(api_method, "telegram"):
+                return await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            if metrics.enabled:
+                metrics.inc("xiuxian_telegram_api_errors_total", labels)
+            raise
+        finally:
+            if metrics.enabled:
+                metrics.observe("xiuxian_telegram_api_latency_seconds", labels, time.perf_counter() - started)
+
+class MetricsServer:
+    """GET /metrics 的本地 HTTP 服务"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info("指标服务已启动：http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = line.decode('latin-1').split(' ')
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?', 1)[0] == '/metrics':
+                status, body = "200 OK", metrics.render().encode('utf-8')
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+metrics_server = MetricsServer(config.METRICS_LISTEN, config.METRICS_PORT)
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional
+from database.models import Player, Equipment, Item, Sect, SectMember
+import config
+
+# 面板模板
+PLAYER_HEADER = (
+    "👤 **{name}** 的属性面板\n\n"
+    "📊 等级：{level}\n"
+    "⚡ 经验：{exp}/{required_exp}\n"
+    "🌍 当前世界：{world}\n"
+    "🏆 世界等级：{world_level} ({world_name})\n"
+)
+PLAYER_NEXT_WORLD = "🆙 可进入：{name}\n"
+PLAYER_POWER = "⚔️ 战斗力：{power}\n\n"
+PLAYER_SECT = "🏛️ 宗门：{name} ({position})\n💰 贡献：{contribution}\n\n"
+PLAYER_NO_SECT = "🏛️ 宗门：未加入\n\n"
+PLAYER_ATTR = "  {attr}：{value}\n"
+PLAYER_ATTR_BONUS = "  {attr}：{base}+{bonus} = {total}\n"
+PLAYER_STONE = "  {currency}：{amount}\n"
+PLAYER_SLOT = "  {slot}：{text}\n"
+
+INVENTORY_ITEM = "📦 {name} x{count} ({item_type})\n    {description}\n"
+INVENTORY_EQUIPMENT = "⚔️ {name} x{count} ({quality})\n    {attrs}\n"
+INVENTORY_UNKNOWN = "❓ {name} x{count}\n"
+INVENTORY_TIPS = "\n\n💡 使用 /use 物品名 来使用物品\n💡 使用 /equip 装备名 来装备物品"
+
+SLOT_EQUIPMENT = "{index}. {name} ({quality})\n   {attrs}\n   需要等级{level_requirement}\n\n"
+
+SECT_MEMBER = "{index}. {name} ({position}) Lv.{level}\n   💰 贡献：{contribution}\n"
+
+# 装备描述片段缓存 {装备名: 文本}
+_attrs_cache: Dict[str, str] = {}
+_slot_cache: Dict[str, str] = {}
+
+def invalidate_equipment(name: Optional[str] = None):
+    """装备变更后清除描述缓存，name 为空时全部清除"""
+    if name is None:
+        _attrs_cache.clear()
+        _slot_cache.clear()
+    else:
+        _attrs_cache.pop(name, None)
+        _slot_cache.pop(name, None)
+
+def equipment_attrs_text(equipment: Equipment) -> str:
+    """装备属性描述，如 攻击力+10，暴击率+5"""
+    text = _attrs_cache.get(equipment.name)
+    if text is None:
+        text = "，".join([f"{k}+{v}" for k, v in equipment.attributes.items()])
+        _attrs_cache[equipment.name] = text
+    return text
+
+def equipment_slot_text(equipment: Equipment) -> str:
+    """属性面板中的装备描述，如 神剑 (传说，攻击力+100)"""
+    text = _slot_cache.get(equipment.name)
+    if text is None:
+        text = f"{equipment.name} ({equipment.quality}，{equipment_attrs_text(equipment)})"
+        _slot_cache[equipment.name] = text
+    return text
+
+def render_player_panel(player: Player, total_attrs: Dict[str, float], combat_power: int,
+                        required_exp: int, sect: Optional[Sect],
+                        equipments: Dict[str, Equipment]) -> str:
+    """渲染人物属性面板"""
+    world_info = config.WORLD_LEVELS.get(player.world_level, {})
+    next_world_info = config.WORLD_LEVELS.get(player.world_level + 1, {})
+
+    parts = [PLAYER_HEADER.format(
+        name=player.name,
+        level=player.level,
+        exp=player.exp,
+        required_exp=required_exp,
+        world=player.world or '未选择',
+        world_level=player.world_level,
+        world_name=world_info.get('name', '')
+    )]
+
+    if next_world_info and player.level >= next_world_info['min_level']:
+        parts.append(PLAYER_NEXT_WORLD.format(name=next_world_info['name']))
+
+    parts.append(PLAYER_POWER.format(power=combat_power))
+
+    # 宗门信息
+    if player.sect_id:
+        if sect:
+            parts.append(PLAYER_SECT.format(
+                name=sect.name, position=player.sect_position, contribution=player.sect_contribution
+            ))
+    else:
+        parts.append(PLAYER_NO_SECT)
+
+    # 属性详情
+    parts.append("💪 **属性详情**\n")
+    for attr in config.PLAYER_ATTRIBUTES:
+        base_value = player.attributes.get(attr, 0)
+        total_value = total_attrs.get(attr, 0)
+        bonus = total_value - base_value
+
+        if bonus > 0:
+            parts.append(PLAYER_ATTR_BONUS.format(attr=attr, base=base_value, bonus=bonus, total=total_value))
+        else:
+            parts.append(PLAYER_ATTR.format(attr=attr, value=total_value))
+
+    parts.append("\n💎 **灵石**\n")
+    for currency, amount in player.spirit_stones.items():
+        parts.append(PLAYER_STONE.format(currency=currency, amount=amount))
+
+    parts.append("\n⚔️ **当前装备**\n")
+    for slot_name in config.ALL_SLOTS:
+        equip_name = player.equipment.get(slot_name, "")
+        if equip_name:
+            equipment = equipments.get(equip_name)
+            text = equipment_slot_text(equipment) if equipment else equip_name
+        else:
+            text = "无"
+        parts.append(PLAYER_SLOT.format(slot=slot_name, text=text))
+
+    return "".join(parts)
+
+def render_inventory_entries(entries: List[tuple], items: Dict[str, Item],
+                             equipments: Dict[str, Equipment]) -> List[str]:
+    """渲染背包条目 [(物品名, 数量)]"""
+    parts = []
+    for item_name, count in entries:
+        item = items.get(item_name)
+        equipment = equipments.get(item_name)
+
+        if item:
+            parts.append(INVENTORY_ITEM.format(
+                name=item_name, count=count, item_type=item.item_type, description=item.description
+            ))
+        elif equipment:
+            parts.append(INVENTORY_EQUIPMENT.format(
+                name=item_name, count=count, quality=equipment.quality, attrs=equipment_attrs_text(equipment)
+            ))
+        else:
+            parts.append(INVENTORY_UNKNOWN.format(name=item_name, count=count))
+    return parts
+
+def render_equipment_list(equipment_list: List[Equipment], start: int = 1) -> List[str]:
+    """渲染可装备列表"""
+    return [SLOT_EQUIPMENT.format(
+        index=i,
+        name=equipment.name,
+        quality=equipment.quality,
+        attrs=equipment_attrs_text(equipment),
+        level_requirement=equipment.level_requirement
+    ) for i, equipment in enumerate(equipment_list, start)]
+
+def render_sect_members(members: List[SectMember], start: int = 1) -> List[str]:
+    """渲染宗门成员列表"""
+    return [SECT_MEMBER.format(
+        index=i,
+        name=member.name,
+        position=member.sect_position,
+        level=member.level,
+        contribution=member.sect_contribution
+    ) for i, member in enumerate(members, start)]
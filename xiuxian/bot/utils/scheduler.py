@@ -0,0 +1,127 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+from telegram.ext import ContextTypes
+from database.database import GameDatabase
+from bot.utils.game_logic import GameLogic
+from bot.utils.matchmaking import matchmaking_index
+from bot.utils.send_queue import send_message
+import config
+
+logger = logging.getLogger(__name__)
+
+# 状态到期提醒
+EXPIRE_MESSAGES = {
+    'injured': "🏥 你的伤势已经痊愈，可以继续外出刷怪了！",
+    'retreat': "🧘‍♂️ 闭关结束，你已出关！",
+}
+
+class StatusScheduler:
+    """受伤、闭关等限时状态的到期调度
+
+    到期时间持久化在 timed_status 表中，内存里用最小堆排序，
+    由 JobQueue 定时批量处理到期项。重新设置同一状态时旧的堆项
+    不会删除，而是在弹出时与最新到期时间比对后丢弃。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._current: Dict[Tuple[int, str], float] = {}
+
+    def __len__(self):
+        return len(self._current)
+
+    def load(self, db: GameDatabase):
+        """启动时从 timed_status 表重建调度堆"""
+        self._heap = []
+        self._current = {}
+        for tg_id, kind, expires_at in db.get_timed_statuses():
+            self._push(tg_id, kind, datetime.fromisoformat(expires_at).timestamp())
+        logger.info("状态调度已加载，共 %s 项", len(self._current))
+
+    def schedule(self, db: GameDatabase, tg_id: int, kind: str, expires_at: datetime) -> bool:
+        """登记一个限时状态"""
+        if not db.set_timed_status(tg_id, kind, expires_at.isoformat()):
+            return False
+        self._push(tg_id, kind, expires_at.timestamp())
+        return True
+
+    def _push(self, tg_id: int, kind: str, ts: float):
+        self._current[(tg_id, kind)] = ts
+        heapq.heappush(self._heap, (ts, tg_id, kind))
+
+    def pop_due(self, now: datetime, limit: int) -> List[Tuple[int, str]]:
+        """弹出最多 limit 个已到期的状态 [(tg_id, kind)]"""
+        ts_now = now.timestamp()
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= ts_now:
+            ts, tg_id, kind = heapq.heappop(self._heap)
+            if self._current.get((tg_id, kind)) != ts:
+                continue  # 已被重新设置
+            del self._current[(tg_id, kind)]
+            due.append((tg_id, kind))
+        return due
+
+    def _retry(self, entries: List[Tuple[int, str]], now: datetime):
+        """把未处理的到期项放回堆中，下一轮再处理"""
+        for tg_id, kind in entries:
+            self._push(tg_id, kind, now.timestamp())
+
+    async def expire_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """JobQueue 回调：批量清除到期状态并通知玩家"""
+        await self.expire_due(context.bot)
+
+    async def expire_due(self, bot):
+        """清除一批到期状态并通知玩家"""
+        now = datetime.now()
+        due = self.pop_due(now, config.STATUS_EXPIRE_BATCH)
+        if not due:
+            return
+
+        db = GameDatabase(config.DATABASE_PATH)
+        game_logic = GameLogic(db)
+        players = {p.tg_id: p for p in db.get_players(list({tg_id for tg_id, _ in due}))}
+
+        # 读取失败或未读到的玩家：状态未清除，放回堆中等待下次重试
+        missing = [(tg_id, kind) for tg_id, kind in due if tg_id not in players]
+        if missing:
+            logger.warning("%s 个到期状态的玩家未能读取，稍后重试", len(missing))
+            self._retry(missing, now)
+            due = [(tg_id, kind) for tg_id, kind in due if tg_id in players]
+            if not due:
+                return
+
+        notifications = []
+        changed = []
+        for player in players.values():
+            cleared = game_logic.clear_expired_statuses(player, now)
+            if cleared:
+                changed.append(player)
+                notifications.extend((player.tg_id, kind) for kind in cleared)
+
+        if changed and not db.update_player_statuses(changed):
+            # 写入失败，放回堆中等待下次重试
+            self._retry(due, now)
+            return
+
+        db.delete_timed_statuses(due)
+        for player in changed:
+            matchmaking_index.refresh(player, game_logic)
+
+        # 通知经发送队列限流，与交互回复相比优先级较低
+        targets = [(tg_id, EXPIRE_MESSAGES[kind]) for tg_id, kind in notifications if kind in EXPIRE_MESSAGES]
+        results = await asyncio.gather(
+            *[send_message(bot, tg_id, text) for tg_id, text in targets],
+            return_exceptions=True
+        )
+        for (tg_id, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.warning("发送状态到期通知失败 %s: %s", tg_id, result)
+
+        if len(due) >= config.STATUS_EXPIRE_BATCH:
+            logger.info("本轮清除 %s 个到期状态，剩余 %s 项", len(due), len(self._current))
+
+# 全局状态调度器
+status_scheduler = StatusScheduler()
@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, Optional
+from database.database import GameDatabase
+from database.models import Sect
+
+logger = logging.getLogger(__name__)
+
+class SectMemberCounts:
+    """宗门人数缓存
+
+    首次访问时一次性统计各宗门人数，之后加入/退出宗门时增减，
+    加入时的人数上限检查不再为每次申请执行 COUNT 查询。
+    成员变更都应经过 GameLogic.join_sect/leave_sect；绕过它修改 sect_id 后需调用 invalidate。
+    """
+
+    def __init__(self):
+        self._counts: Optional[Dict[int, int]] = None
+
+    def load(self, db: GameDatabase):
+        self._counts = db.get_sect_member_counts()
+        logger.info("宗门人数已加载，共 %s 个宗门", len(self._counts))
+
+    def invalidate(self):
+        """下次访问时重新统计"""
+        self._counts = None
+
+    def count(self, db: GameDatabase, sect_id: int) -> int:
+        if self._counts is None:
+            self.load(db)
+        return self._counts.get(sect_id, 0)
+
+    def has_room(self, db: GameDatabase, sect: Sect) -> bool:
+        return self.count(db, sect.id) < sect.max_members
+
+    def joined(self, sect_id: int):
+        if self._counts is not None:
+            self._counts[sect_id] = self._counts.get(sect_id, 0) + 1
+
+    def left(self, sect_id: int):
+        if self._counts is not None and self._counts.get(sect_id, 0) > 0:
+            self._counts[sect_id] -= 1
+
+# 全局宗门人数缓存
+sect_member_counts = SectMemberCounts()
@@ -0,0 +1,276 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from telegram.error import RetryAfter
+from bot.utils.metrics import metrics
+import config
+
+logger = logging.getLogger(__name__)
+
+# 发送优先级：数字越小越优先
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BROADCAST = 1
+
+class TokenBucket:
+    """令牌桶限流"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # 调用方的 now 可能早于桶的创建时刻，不能倒扣令牌
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """距离可取得一个令牌还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+class SendJob:
+    __slots__ = ('chat_id', 'factory', 'priority', 'coalesce_key', 'future', 'started', 'context', 'superseded_by')
+
+    def __init__(self, chat_id: Optional[int], factory: Callable[[], Awaitable[Any]],
+                 priority: int, coalesce_key: Optional[Hashable], future: asyncio.Future):
+        self.chat_id = chat_id
+        self.factory = factory
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.future = future
+        self.started = False
+        # 发出后同一 coalesce_key 又提交的新任务；本任务被限流退回时由它取代
+        self.superseded_by: Optional["SendJob"] = None
+        # 提交方的上下文，发送时在其中执行，使追踪 span 归入发起的更新
+        self.context = contextvars.copy_context()
+
+class SendQueue:
+    """Telegram 出站消息队列
+
+    全局与每个会话各有一个令牌桶(私聊约1条/秒，群聊约20条/分钟)，
+    交互回复优先于广播通知；同一条消息尚未发出的编辑会被新的编辑覆盖。
+    """
+
+    def __init__(self, global_rate: float = None, private_rate: float = None,
+                 group_rate: float = None, concurrency: int = None, max_chat_buckets: int = 10000):
+        self.global_bucket = TokenBucket(
+            global_rate or config.SEND_GLOBAL_RATE, global_rate or config.SEND_GLOBAL_RATE
+        )
+        self.private_rate = private_rate or config.SEND_PRIVATE_RATE
+        self.group_rate = group_rate or config.SEND_GROUP_RATE_PER_MINUTE / 60
+        self.concurrency = concurrency or config.SEND_CONCURRENCY
+        self.max_chat_buckets = max_chat_buckets
+
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._ready: List[Tuple[int, int, SendJob]] = []
+        self._delayed: List[Tuple[float, int, int, SendJob]] = []
+        self._pending_edits: Dict[Hashable, SendJob] = {}
+        self._sending_edits: Dict[Hashable, SendJob] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+        self._closing = False
+        # 收到 RetryAfter 后全局暂停发送直到该时刻
+        self._paused_until = 0.0
+
+    def __len__(self):
+        return len(self._ready) + len(self._delayed)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # 正数为私聊，负数为群聊/频道
+            if chat_id > 0:
+                bucket = TokenBucket(self.private_rate, config.SEND_PRIVATE_BURST)
+            else:
+                bucket = TokenBucket(self.group_rate, config.SEND_GROUP_BURST)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chat_buckets:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def start(self):
+        """在当前事件循环中启动发送协程"""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._worker = loop.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """停止接收新消息并等待队列发送完毕"""
+        if self._worker is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._worker), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("发送队列关闭超时，丢弃 %s 条消息", len(self))
+            self._worker.cancel()
+        self._worker = None
+
+    def submit(self, chat_id: Optional[int], factory: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_BROADCAST, coalesce_key: Optional[Hashable] = None) -> asyncio.Future:
+        """提交一次 API 调用，返回其结果的 Future
+
+        coalesce_key 相同且尚未发出的调用会被合并，只执行最后一次提交的 factory。
+        """
+        if self._closing:
+            raise RuntimeError("发送队列已关闭")
+        self.start()
+
+        if coalesce_key is not None:
+            job = self._pending_edits.get(coalesce_key)
+            if job is not None and not job.started:
+                job.factory = factory
+                job.context = contextvars.copy_context()
+                if priority < job.priority:
+                    # 提升优先级：重新入队，旧的队列项在出队时被跳过
+                    job.priority = priority
+                    self._push_ready(job)
+                return job.future
+
+        job = SendJob(chat_id, factory, priority, coalesce_key, asyncio.get_running_loop().create_future())
+        if coalesce_key is not None:
+            self._pending_edits[coalesce_key] = job
+            sending = self._sending_edits.get(coalesce_key)
+            if sending is not None:
+                sending.superseded_by = job
+        self._push_ready(job)
+        return job.future
+
+    def _push_ready(self, job: SendJob):
+        heapq.heappush(self._ready, (job.priority, next(self._seq), job))
+        self._wakeup.set()
+
+    def _push_delayed(self, job: SendJob, ready_at: float):
+        heapq.heappush(self._delayed, (ready_at, job.priority, next(self._seq), job))
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, _, job = heapq.heappop(self._delayed)
+                heapq.heappush(self._ready, (job.priority, next(self._seq), job))
+
+            if not self._ready:
+                if self._closing and not self._delayed:
+                    break
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            priority, _, job = heapq.heappop(self._ready)
+            if job.started or job.priority != priority:
+                continue  # 已发出或已以更高优先级重新入队
+
+            if job.chat_id is not None:
+                chat_delay = self._chat_bucket(job.chat_id).delay(now)
+                if chat_delay > 0:
+                    self._push_delayed(job, now + chat_delay)
+                    continue
+
+            global_delay = max(self.global_bucket.delay(now), self._paused_until - now)
+            if global_delay > 0:
+                heapq.heappush(self._ready, (priority, next(self._seq), job))
+                await asyncio.sleep(global_delay)
+                continue
+
+            self.global_bucket.take(now)
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id).take(now)
+
+            job.started = True
+            if job.coalesce_key is not None:
+                if self._pending_edits.get(job.coalesce_key) is job:
+                    del self._pending_edits[job.coalesce_key]
+                self._sending_edits[job.coalesce_key] = job
+
+            await self._semaphore.acquire()
+            task = asyncio.get_running_loop().create_task(self._execute(job), context=job.context)
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _execute(self, job: SendJob):
+        try:
+            result = await job.factory()
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning("触发Telegram限流，%s秒后重试 (chat %s)", retry_after, job.chat_id)
+            ready_at = time.monotonic() + float(retry_after)
+            # 限流是全局的：暂停所有发送，而不只是这一条
+            self._paused_until = max(self._paused_until, ready_at)
+            job.started = False
+            if job.coalesce_key is not None:
+                if job.superseded_by is not None:
+                    # 发出后同一消息已有新的编辑，本次被取代
+                    job.superseded_by.future.add_done_callback(partial(_chain_result, job.future))
+                    return
+                # 重新登记，限流等待期间的新编辑合并进本任务
+                self._pending_edits[job.coalesce_key] = job
+            self._push_delayed(job, ready_at)
+            self._wakeup.set()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            if job.coalesce_key is not None and self._sending_edits.get(job.coalesce_key) is job:
+                del self._sending_edits[job.coalesce_key]
+            self._semaphore.release()
+
+def _chain_result(target: asyncio.Future, source: asyncio.Future):
+    """被合并的调用与取代它的调用共享结果"""
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+# 全局发送队列
+send_queue = SendQueue()
+metrics.add_collector(lambda: {"xiuxian_send_queue_depth": len(send_queue)})
+
+async def send_message(bot, chat_id: int, text: str, priority: int = PRIORITY_BROADCAST, **kwargs):
+    """通过发送队列发送消息"""
+    return await send_queue.submit(
+        chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority
+    )
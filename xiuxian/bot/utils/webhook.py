@@ -0,0 +1,182 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Optional, Tuple
+from telegram import Update
+from telegram.ext import Application
+from bot.utils.lifecycle import lifecycle
+import config
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large"}
+
+class WebhookServer:
+    """接收 Telegram webhook 的内置 HTTP 服务
+
+    POST {path}   校验 X-Telegram-Bot-Api-Secret-Token(必须配置)后把更新放入 application.update_queue，
+                  请求体可以是单个 Update 或 Update 数组(批量)，格式不符的更新返回 400
+    GET  /healthz 健康检查
+    """
+
+    def __init__(self, application: Application, host: str, port: int, path: str, secret_token: str):
+        if not secret_token:
+            # 不校验密钥时任何能访问端口的人都可以伪造任意 from.id 的更新(含管理员)
+            raise ValueError("webhook 必须配置 secret token")
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.received = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def sockets(self):
+        return self._server.sockets if self._server else []
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info("Webhook 服务已启动：%s:%s%s", self.host, self.port, self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            self._write_response(writer, 413 if "too large" in str(e) else 400, {"error": str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError("bad request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_SIZE:
+            raise ValueError("body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    def _write_response(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def _dispatch(self, method: str, path: str, headers: dict, body: bytes) -> Tuple[int, dict]:
+        if path == '/healthz':
+            if method != 'GET':
+                return 405, {"error": "method not allowed"}
+            return 200, {
+                "status": "ok" if self.application.running else "starting",
+                "received": self.received,
+                "queue": self.application.update_queue.qsize(),
+            }
+
+        if path != self.path:
+            return 404, {"error": "not found"}
+        if method != 'POST':
+            return 405, {"error": "method not allowed"}
+
+        token = headers.get('x-telegram-bot-api-secret-token', '')
+        if not hmac.compare_digest(token.encode('utf-8'), self.secret_token.encode('utf-8')):
+            return 403, {"error": "invalid secret token"}
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {"error": "invalid json"}
+
+        batch = data if isinstance(data, list) else [data]
+        updates = []
+        for item in batch:
+            try:
+                update = Update.de_json(item, self.application.bot) if isinstance(item, dict) else None
+            except (TypeError, AttributeError, KeyError, ValueError):
+                # 字段缺失或类型不符，如 {} 或 {"update_id": 1, "message": "x"}
+                update = None
+            if update is None:
+                return 400, {"error": "invalid update"}
+            updates.append(update)
+
+        for update in updates:
+            await self.application.update_queue.put(update)
+        self.received += len(updates)
+        return 200, {"ok": True, "accepted": len(updates)}
+
+async def run_webhook(application: Application, allowed_updates=None):
+    """以 webhook 模式运行 Bot，直到收到 SIGINT/SIGTERM"""
+    if not config.WEBHOOK_SECRET:
+        raise RuntimeError("webhook 模式需要设置 XIUXIAN_WEBHOOK_SECRET")
+    server = WebhookServer(
+        application,
+        config.WEBHOOK_LISTEN,
+        config.WEBHOOK_PORT,
+        config.WEBHOOK_PATH,
+        config.WEBHOOK_SECRET
+    )
+
+    stop_event = asyncio.Event()
+    lifecycle.install_signal_handlers(stop_event.set)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await server.start()
+
+    if config.WEBHOOK_URL:
+        await application.bot.set_webhook(
+            url=config.WEBHOOK_URL.rstrip('/') + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=allowed_updates
+        )
+
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("正在停止 Webhook 服务...")
+        await server.stop()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
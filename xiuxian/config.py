@@ -4,6 +4,16 @@ from typing import List
 # Bot配置
 BOT_TOKEN = "8457177707:AAFL_Vtwxw3ukCjZjoVoPlPSIDEuTmKKLAs"
 
+# 更新接收方式：polling(长轮询) 或 webhook
+UPDATE_MODE = os.environ.get('XIUXIAN_UPDATE_MODE', 'polling')
+
+# Webhook配置(UPDATE_MODE 为 webhook 时生效)
+WEBHOOK_URL = os.environ.get('XIUXIAN_WEBHOOK_URL', '')  # 对外访问地址，如 https://example.com
+WEBHOOK_LISTEN = '0.0.0.0'
+WEBHOOK_PORT = 8443
+WEBHOOK_PATH = '/telegram'
+WEBHOOK_SECRET = os.environ.get('XIUXIAN_WEBHOOK_SECRET', '')  # 必填，校验 X-Telegram-Bot-Api-Secret-Token，未设置时拒绝启动
+
 # 数据库配置
 DATABASE_PATH = 'game.db'
 
@@ -58,6 +68,9 @@ ACCESSORY_SLOTS = {
 # 所有装备槽位
 ALL_SLOTS = {**EQUIPMENT_SLOTS, **ACCESSORY_SLOTS}
 
+# 灵石种类
+SPIRIT_STONE_TYPES = ['下品灵石', '中品灵石', '上品灵石', '极品灵石']
+
 # 玩家属性
 PLAYER_ATTRIBUTES = [
     '攻击力', '防御力', '生命值', '法力值', '速度', '暴击率', 
@@ -92,4 +105,67 @@ RETREAT_HOURS = [1, 3, 6, 12, 24, 48]
 MAX_SECT_MEMBERS = 50
 
 # 宗门最大法宝贡献数
-MAX_ARTIFACT_CONTRIBUTION = 10
\ No newline at end of file
+MAX_ARTIFACT_CONTRIBUTION = 10
+
+# 装备掉落：等级分段大小
+LOOT_LEVEL_BAND = 10
+
+# 装备掉落：品质每提升一级权重的衰减系数(难度倍率越高衰减越慢)
+LOOT_QUALITY_DECAY = 0.5
+
+# 比武匹配：默认/最大返回对手数
+MATCH_DEFAULT_COUNT = 5
+MATCH_MAX_COUNT = 20
+
+# 限时状态到期检查间隔(秒)与每轮处理上限
+STATUS_TICK_SECONDS = 30
+STATUS_EXPIRE_BATCH = 200
+
+# 消息编辑指纹缓存条数(跳过内容未变化的编辑)
+EDIT_FINGERPRINT_CACHE_SIZE = 10000
+
+# 出站消息限流：全局每秒条数、私聊每秒条数、群聊每分钟条数及突发上限、并发请求数
+SEND_GLOBAL_RATE = 30
+SEND_PRIVATE_RATE = 1
+SEND_PRIVATE_BURST = 3
+SEND_GROUP_RATE_PER_MINUTE = 20
+SEND_GROUP_BURST = 3
+SEND_CONCURRENCY = 8
+
+# 同一用户相同回调的去重窗口(秒)
+CALLBACK_DEBOUNCE_SECONDS = 1.0
+
+# 回调状态令牌有效期(秒)与内存缓存条数
+CALLBACK_STATE_TTL = 7 * 24 * 3600
+CALLBACK_STATE_CACHE_SIZE = 10000
+
+# 优雅停机：等待处理中请求的时间与发送队列刷出时间(秒)
+SHUTDOWN_DRAIN_TIMEOUT = 10
+SHUTDOWN_FLUSH_TIMEOUT = 10
+
+# 指标：是否开启及 Prometheus 文本格式的本地监听地址，延迟直方图分桶(秒)
+METRICS_ENABLED = os.environ.get('XIUXIAN_METRICS', '') not in ('', '0')
+METRICS_LISTEN = '127.0.0.1'
+METRICS_PORT = int(os.environ.get('XIUXIAN_METRICS_PORT', 9108))
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# SQL 查询分析：是否开启、慢查询阈值(毫秒)、单个更新的查询条数预算
+DB_PROFILE = os.environ.get('XIUXIAN_DB_PROFILE', '') not in ('', '0')
+DB_SLOW_QUERY_MS = 50
+DB_QUERY_BUDGET = 20
+
+# 请求级链路追踪：采样率(0 关闭)与 Chrome trace 事件的 JSONL 输出路径
+TRACE_SAMPLE_RATE = float(os.environ.get('XIUXIAN_TRACE_SAMPLE', 0) or 0)
+TRACE_PATH = os.environ.get('XIUXIAN_TRACE_PATH', 'traces.jsonl')
+
+# 日志：级别、格式(json/text)、队列容量、按类别(logger 名前缀)的 INFO/DEBUG 采样率，
+# 以及重复告警/错误的限流(每个窗口内同一消息模板最多输出的条数)
+LOG_LEVEL = os.environ.get('XIUXIAN_LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('XIUXIAN_LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = 10000
+LOG_SAMPLE_RATES = {
+    'access': float(os.environ.get('XIUXIAN_ACCESS_LOG_SAMPLE', 0.1) or 0),
+    'httpx': 0.0,
+}
+LOG_RATE_LIMIT_WINDOW = 60
+LOG_RATE_LIMIT_BURST = 5
@@ -2,17 +2,30 @@ import sqlite3
 import json
 from typing import List, Optional, Dict, Any, Tuple
 from .models import *
+from .profiler import query_profiler, ProfiledConnection
+from tracing import tracer
+import config
 import logging
 
 logger = logging.getLogger(__name__)
 
+@tracer.trace_methods("db", exclude=("get_connection",))
 class GameDatabase:
+    # 本进程已完成建表与迁移的数据库路径
+    _initialized_paths: set = set()
+    
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.init_database()
+        # handler 每个更新都会构造 GameDatabase，建表与迁移只在每个路径首次构造时执行
+        if db_path not in GameDatabase._initialized_paths:
+            self.init_database()
+            GameDatabase._initialized_paths.add(db_path)
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        if query_profiler.enabled:
+            conn = sqlite3.connect(self.db_path, factory=ProfiledConnection)
+        else:
+            conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -140,9 +153,14 @@ class GameDatabase:
                 CREATE TABLE IF NOT EXISTS admins (
                     tg_id INTEGER PRIMARY KEY,
                     username TEXT,
-                    created_at TEXT
+                    created_at TEXT,
+                    role INTEGER DEFAULT 1
                 )
             ''')
+            # 旧库升级：管理员表增加角色等级列
+            admin_columns = {row['name'] for row in conn.execute('PRAGMA table_info(admins)')}
+            if 'role' not in admin_columns:
+                conn.execute('ALTER TABLE admins ADD COLUMN role INTEGER DEFAULT 1')
             
             # 游戏配置表
             conn.execute('''
@@ -152,6 +170,36 @@ class GameDatabase:
                 )
             ''')
             
+            # 限时状态表(受伤、闭关等到期时间)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timed_status (
+                    tg_id INTEGER,
+                    kind TEXT,
+                    expires_at TEXT,
+                    PRIMARY KEY (tg_id, kind)
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_timed_status_expires ON timed_status (expires_at)'
+            )
+            
+            # 回调状态表(按钮参数令牌)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS callback_states (
+                    token TEXT PRIMARY KEY,
+                    payload TEXT,
+                    expires_at REAL
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_callback_states_expires ON callback_states (expires_at)'
+            )
+            
+            # 宗门成员按贡献分页与人数统计
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_players_sect ON players (sect_id, sect_contribution DESC, tg_id)'
+            )
+            
             conn.commit()
     
     # 玩家相关方法
@@ -178,7 +226,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"创建玩家失败: {e}")
+            logger.error("创建玩家失败: %s", e)
             return False
     
     def get_player(self, tg_id: int) -> Optional[Player]:
@@ -211,7 +259,7 @@ class GameDatabase:
                         created_at=row['created_at']
                     )
         except Exception as e:
-            logger.error(f"获取玩家信息失败: {e}")
+            logger.error("获取玩家信息失败: %s", e)
         return None
     
     def update_player(self, player: Player) -> bool:
@@ -237,7 +285,56 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"更新玩家信息失败: {e}")
+            logger.error("更新玩家信息失败: %s", e)
+            return False
+    
+    def get_players(self, tg_ids: List[int]) -> List[Player]:
+        """批量获取玩家信息"""
+        if not tg_ids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                placeholders = ','.join('?' * len(tg_ids))
+                rows = conn.execute(
+                    f'SELECT * FROM players WHERE tg_id IN ({placeholders})', list(tg_ids)
+                ).fetchall()
+                
+                return [Player(
+                    tg_id=row['tg_id'],
+                    username=row['username'] or "",
+                    name=row['name'],
+                    level=row['level'],
+                    exp=row['exp'],
+                    world=row['world'],
+                    world_level=row['world_level'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    spirit_stones=json.loads(row['spirit_stones'] or '{}'),
+                    inventory=json.loads(row['inventory'] or '{}'),
+                    equipment=json.loads(row['equipment'] or '{}'),
+                    sect_id=row['sect_id'],
+                    sect_position=row['sect_position'],
+                    sect_contribution=row['sect_contribution'],
+                    status=json.loads(row['status'] or '{}'),
+                    last_signin=row['last_signin'],
+                    last_hunt=row['last_hunt'],
+                    created_at=row['created_at']
+                ) for row in rows]
+        except Exception as e:
+            logger.error("批量获取玩家信息失败: %s", e)
+            return []
+    
+    def update_player_statuses(self, players: List[Player]) -> bool:
+        """批量更新玩家状态"""
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    'UPDATE players SET status=? WHERE tg_id=?',
+                    [(json.dumps(p.status), p.tg_id) for p in players]
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("批量更新玩家状态失败: %s", e)
             return False
     
     def get_players_by_sect(self, sect_id: int) -> List[Player]:
@@ -274,7 +371,106 @@ class GameDatabase:
                     players.append(player)
                 return players
         except Exception as e:
-            logger.error(f"获取宗门成员失败: {e}")
+            logger.error("获取宗门成员失败: %s", e)
+            return []
+    
+    def get_sect_members(self, sect_id: int, limit: int,
+                         after: Optional[Tuple[int, int]] = None) -> List[SectMember]:
+        """按贡献降序分页获取宗门成员
+
+        after 为上一页最后一名成员的 (sect_contribution, tg_id)，按键集分页，
+        翻到任意一页都只扫描本页的索引项。
+        """
+        try:
+            with self.get_connection() as conn:
+                if after is None:
+                    rows = conn.execute('''
+                        SELECT tg_id, name, level, sect_position, sect_contribution FROM players
+                        WHERE sect_id = ?
+                        ORDER BY sect_contribution DESC, tg_id LIMIT ?
+                    ''', (sect_id, limit)).fetchall()
+                else:
+                    contribution, tg_id = after
+                    rows = conn.execute('''
+                        SELECT tg_id, name, level, sect_position, sect_contribution FROM players
+                        WHERE sect_id = ? AND (sect_contribution < ? OR (sect_contribution = ? AND tg_id > ?))
+                        ORDER BY sect_contribution DESC, tg_id LIMIT ?
+                    ''', (sect_id, contribution, contribution, tg_id, limit)).fetchall()
+                return [SectMember(
+                    tg_id=row['tg_id'],
+                    name=row['name'],
+                    level=row['level'],
+                    sect_position=row['sect_position'],
+                    sect_contribution=row['sect_contribution']
+                ) for row in rows]
+        except Exception as e:
+            logger.error("分页获取宗门成员失败: %s", e)
+            return []
+    
+    def get_sect_member_counts(self) -> Dict[int, int]:
+        """获取各宗门人数"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    'SELECT sect_id, COUNT(*) FROM players WHERE sect_id IS NOT NULL GROUP BY sect_id'
+                ).fetchall()
+                return {row[0]: row[1] for row in rows}
+        except Exception as e:
+            logger.error("统计宗门人数失败: %s", e)
+            return {}
+    
+    def list_players(self) -> List[Player]:
+        """获取所有玩家"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT * FROM players').fetchall()
+                
+                return [Player(
+                    tg_id=row['tg_id'],
+                    username=row['username'] or "",
+                    name=row['name'],
+                    level=row['level'],
+                    exp=row['exp'],
+                    world=row['world'],
+                    world_level=row['world_level'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    spirit_stones=json.loads(row['spirit_stones'] or '{}'),
+                    inventory=json.loads(row['inventory'] or '{}'),
+                    equipment=json.loads(row['equipment'] or '{}'),
+                    sect_id=row['sect_id'],
+                    sect_position=row['sect_position'],
+                    sect_contribution=row['sect_contribution'],
+                    status=json.loads(row['status'] or '{}'),
+                    last_signin=row['last_signin'],
+                    last_hunt=row['last_hunt'],
+                    created_at=row['created_at']
+                ) for row in rows]
+        except Exception as e:
+            logger.error("获取玩家列表失败: %s", e)
+            return []
+    
+    def list_players_for_matchmaking(self) -> List[Player]:
+        """获取计算战斗力与比武资格所需的玩家字段
+
+        只读取并解码 tg_id、world_level、attributes、equipment、sect_id、status，
+        返回的 Player 其余字段为默认值，不可用于保存。
+        """
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    'SELECT tg_id, world_level, attributes, equipment, sect_id, status FROM players'
+                ).fetchall()
+                
+                return [Player(
+                    tg_id=row['tg_id'],
+                    world_level=row['world_level'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    equipment=json.loads(row['equipment'] or '{}'),
+                    sect_id=row['sect_id'],
+                    status=json.loads(row['status'] or '{}')
+                ) for row in rows]
+        except Exception as e:
+            logger.error("获取比武玩家列表失败: %s", e)
             return []
     
     # 世界相关方法
@@ -291,7 +487,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"创建世界失败: {e}")
+            logger.error("创建世界失败: %s", e)
             return False
     
     def get_worlds_by_level(self, world_level: int) -> List[World]:
@@ -311,7 +507,7 @@ class GameDatabase:
                     attributes=json.loads(row['attributes'] or '{}')
                 ) for row in rows]
         except Exception as e:
-            logger.error(f"获取世界列表失败: {e}")
+            logger.error("获取世界列表失败: %s", e)
             return []
     
     # 装备相关方法
@@ -333,7 +529,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"创建装备失败: {e}")
+            logger.error("创建装备失败: %s", e)
             return False
     
     def get_equipment(self, name: str) -> Optional[Equipment]:
@@ -356,9 +552,35 @@ class GameDatabase:
                         special_effects=json.loads(row['special_effects'] or '{}')
                     )
         except Exception as e:
-            logger.error(f"获取装备信息失败: {e}")
+            logger.error("获取装备信息失败: %s", e)
         return None
     
+    def get_equipments(self, names: List[str]) -> Dict[str, Equipment]:
+        """批量获取装备信息 {装备名: 装备}"""
+        names = [name for name in set(names) if name]
+        if not names:
+            return {}
+        try:
+            with self.get_connection() as conn:
+                placeholders = ','.join('?' * len(names))
+                rows = conn.execute(
+                    f'SELECT * FROM equipment WHERE name IN ({placeholders})', names
+                ).fetchall()
+                
+                return {row['name']: Equipment(
+                    name=row['name'],
+                    slot=row['slot'],
+                    quality=row['quality'],
+                    level_requirement=row['level_requirement'],
+                    world_level_requirement=row['world_level_requirement'],
+                    description=row['description'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    special_effects=json.loads(row['special_effects'] or '{}')
+                ) for row in rows}
+        except Exception as e:
+            logger.error("批量获取装备信息失败: %s", e)
+            return {}
+    
     def get_equipment_by_slot(self, slot: str, player_level: int = 1, world_level: int = 1) -> List[Equipment]:
         """获取指定部位的可用装备"""
         try:
@@ -380,7 +602,136 @@ class GameDatabase:
                     special_effects=json.loads(row['special_effects'] or '{}')
                 ) for row in rows]
         except Exception as e:
-            logger.error(f"获取装备列表失败: {e}")
+            logger.error("获取装备列表失败: %s", e)
+            return []
+    
+    def get_equipment_page(self, names: List[str], slot: Optional[str] = None,
+                           player_level: Optional[int] = None, world_level: Optional[int] = None,
+                           page: int = 1, page_size: int = 10) -> Tuple[List[Equipment], int, int]:
+        """分页获取指定名称范围内的装备，按品质从高到低排序，返回 (当前页装备, 总数, 页码)
+
+        先统计总数，页码超出末页时取最后一页，再按页码计算偏移。
+        """
+        if not names:
+            return [], 0, 1
+        
+        conditions = ['name IN (SELECT value FROM json_each(?))']
+        params: List[Any] = [json.dumps(list(names))]
+        if slot is not None:
+            conditions.append('slot = ?')
+            params.append(slot)
+        if player_level is not None:
+            conditions.append('level_requirement <= ?')
+            params.append(player_level)
+        if world_level is not None:
+            conditions.append('world_level_requirement <= ?')
+            params.append(world_level)
+        where = ' AND '.join(conditions)
+        
+        # 品质按 config.EQUIPMENT_QUALITIES 中的顺序排名
+        quality_rank = 'CASE quality ' + ' '.join(
+            f'WHEN ? THEN {rank}' for rank in range(len(config.EQUIPMENT_QUALITIES))
+        ) + ' ELSE -1 END'
+        
+        try:
+            with self.get_connection() as conn:
+                total = conn.execute(
+                    f'SELECT COUNT(*) FROM equipment WHERE {where}', params
+                ).fetchone()[0]
+                total_pages = max(1, (total + page_size - 1) // page_size)
+                page = min(max(page, 1), total_pages)
+                
+                rows = conn.execute(f'''
+                    SELECT * FROM equipment WHERE {where}
+                    ORDER BY {quality_rank} DESC, level_requirement DESC, name
+                    LIMIT ? OFFSET ?
+                ''', params + list(config.EQUIPMENT_QUALITIES) + [page_size, (page - 1) * page_size]).fetchall()
+                
+                return [Equipment(
+                    name=row['name'],
+                    slot=row['slot'],
+                    quality=row['quality'],
+                    level_requirement=row['level_requirement'],
+                    world_level_requirement=row['world_level_requirement'],
+                    description=row['description'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    special_effects=json.loads(row['special_effects'] or '{}')
+                ) for row in rows], total, page
+        except Exception as e:
+            logger.error("分页获取装备失败: %s", e)
+            return [], 0, 1
+    
+    def list_equipment(self) -> List[Equipment]:
+        """获取全部装备"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT * FROM equipment ORDER BY name').fetchall()
+                
+                return [Equipment(
+                    name=row['name'],
+                    slot=row['slot'],
+                    quality=row['quality'],
+                    level_requirement=row['level_requirement'],
+                    world_level_requirement=row['world_level_requirement'],
+                    description=row['description'],
+                    attributes=json.loads(row['attributes'] or '{}'),
+                    special_effects=json.loads(row['special_effects'] or '{}')
+                ) for row in rows]
+        except Exception as e:
+            logger.error("获取装备列表失败: %s", e)
+            return []
+    
+    # 物品相关方法
+    def create_item(self, item: Item) -> bool:
+        """创建物品"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO items (name, item_type, description, effects, usable)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (item.name, item.item_type, item.description,
+                     json.dumps(item.effects), int(item.usable)))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("创建物品失败: %s", e)
+            return False
+    
+    def get_item(self, name: str) -> Optional[Item]:
+        """获取物品信息"""
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    'SELECT * FROM items WHERE name = ?', (name,)
+                ).fetchone()
+                
+                if row:
+                    return Item(
+                        name=row['name'],
+                        item_type=row['item_type'],
+                        description=row['description'],
+                        effects=json.loads(row['effects'] or '{}'),
+                        usable=bool(row['usable'])
+                    )
+        except Exception as e:
+            logger.error("获取物品信息失败: %s", e)
+        return None
+    
+    def list_items(self) -> List[Item]:
+        """获取全部物品"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT * FROM items ORDER BY name').fetchall()
+                
+                return [Item(
+                    name=row['name'],
+                    item_type=row['item_type'],
+                    description=row['description'],
+                    effects=json.loads(row['effects'] or '{}'),
+                    usable=bool(row['usable'])
+                ) for row in rows]
+        except Exception as e:
+            logger.error("获取物品列表失败: %s", e)
             return []
     
     # 宗门相关方法
@@ -399,7 +750,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"创建宗门失败: {e}")
+            logger.error("创建宗门失败: %s", e)
             return False
     
     def get_sect(self, sect_id: int) -> Optional[Sect]:
@@ -424,7 +775,7 @@ class GameDatabase:
                         created_at=row['created_at']
                     )
         except Exception as e:
-            logger.error(f"获取宗门信息失败: {e}")
+            logger.error("获取宗门信息失败: %s", e)
         return None
     
     def list_sects(self) -> List[Sect]:
@@ -448,7 +799,7 @@ class GameDatabase:
                     created_at=row['created_at']
                 ) for row in rows]
         except Exception as e:
-            logger.error(f"获取宗门列表失败: {e}")
+            logger.error("获取宗门列表失败: %s", e)
             return []
     
     def get_sect_contributions(self, sect_id: int) -> List[SectContribution]:
@@ -470,7 +821,7 @@ class GameDatabase:
                     contributed_at=row['contributed_at']
                 ) for row in rows]
         except Exception as e:
-            logger.error(f"获取宗门贡献失败: {e}")
+            logger.error("获取宗门贡献失败: %s", e)
             return []
     
     def add_sect_contribution(self, contribution: SectContribution) -> bool:
@@ -490,7 +841,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"添加宗门贡献失败: {e}")
+            logger.error("添加宗门贡献失败: %s", e)
             return False
     
     def remove_sect_contribution(self, contribution_id: int) -> bool:
@@ -503,7 +854,7 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"移除宗门贡献失败: {e}")
+            logger.error("移除宗门贡献失败: %s", e)
             return False
     
     def update_sect_defense(self, sect_id: int) -> bool:
@@ -521,22 +872,22 @@ class GameDatabase:
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"更新宗门防御失败: {e}")
+            logger.error("更新宗门防御失败: %s", e)
             return False
     
     # 管理员相关方法
-    def add_admin(self, tg_id: int, username: str = "") -> bool:
+    def add_admin(self, tg_id: int, username: str = "", role: int = 1) -> bool:
         """添加管理员"""
         try:
             with self.get_connection() as conn:
                 conn.execute('''
-                    INSERT OR REPLACE INTO admins (tg_id, username, created_at)
-                    VALUES (?, ?, ?)
-                ''', (tg_id, username, datetime.now().isoformat()))
+                    INSERT OR REPLACE INTO admins (tg_id, username, created_at, role)
+                    VALUES (?, ?, ?, ?)
+                ''', (tg_id, username, datetime.now().isoformat(), role))
                 conn.commit()
                 return True
         except Exception as e:
-            logger.error(f"添加管理员失败: {e}")
+            logger.error("添加管理员失败: %s", e)
             return False
     
     def is_admin(self, tg_id: int) -> bool:
@@ -548,5 +899,133 @@ class GameDatabase:
                 ).fetchone()
                 return result is not None
         except Exception as e:
-            logger.error(f"检查管理员权限失败: {e}")
-            return False
\ No newline at end of file
+            logger.error("检查管理员权限失败: %s", e)
+            return False
+    
+    def list_admins(self) -> Dict[int, int]:
+        """获取所有管理员 {tg_id: 角色等级}"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT tg_id, role FROM admins').fetchall()
+                return {row['tg_id']: row['role'] or 1 for row in rows}
+        except Exception as e:
+            logger.error("获取管理员列表失败: %s", e)
+            return {}
+    
+    def checkpoint(self) -> bool:
+        """把 WAL 日志写回主库并截断(非 WAL 模式下无操作)"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                return True
+        except Exception as e:
+            logger.error("数据库检查点失败: %s", e)
+            return False
+    
+    # 限时状态相关方法
+    def set_timed_status(self, tg_id: int, kind: str, expires_at: str) -> bool:
+        """设置限时状态到期时间"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO timed_status (tg_id, kind, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (tg_id, kind, expires_at))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("设置限时状态失败: %s", e)
+            return False
+    
+    def get_timed_statuses(self) -> List[Tuple[int, str, str]]:
+        """获取所有未清除的限时状态 [(tg_id, kind, expires_at)]"""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    'SELECT tg_id, kind, expires_at FROM timed_status ORDER BY expires_at'
+                ).fetchall()
+                return [(row['tg_id'], row['kind'], row['expires_at']) for row in rows]
+        except Exception as e:
+            logger.error("获取限时状态失败: %s", e)
+            return []
+    
+    def delete_timed_statuses(self, entries: List[Tuple[int, str]]) -> bool:
+        """删除已处理的限时状态 [(tg_id, kind)]"""
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    'DELETE FROM timed_status WHERE tg_id = ? AND kind = ?', entries
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("删除限时状态失败: %s", e)
+            return False
+    
+    # 回调状态相关方法
+    def set_callback_state(self, token: str, payload: str, expires_at: float) -> bool:
+        """保存回调状态"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO callback_states (token, payload, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (token, payload, expires_at))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("保存回调状态失败: %s", e)
+            return False
+    
+    def set_callback_states(self, entries: List[Tuple[str, str, float]]) -> bool:
+        """批量保存回调状态 [(token, payload, expires_at)]，一个事务内完成"""
+        if not entries:
+            return True
+        try:
+            with self.get_connection() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO callback_states (token, payload, expires_at)
+                    VALUES (?, ?, ?)
+                ''', entries)
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error("批量保存回调状态失败: %s", e)
+            return False
+    
+    def get_callback_state(self, token: str) -> Optional[Tuple[str, float]]:
+        """获取回调状态 (payload, expires_at)"""
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    'SELECT payload, expires_at FROM callback_states WHERE token = ?', (token,)
+                ).fetchone()
+                if row:
+                    return row['payload'], row['expires_at']
+        except Exception as e:
+            logger.error("获取回调状态失败: %s", e)
+        return None
+    
+    def delete_callback_state(self, token: str) -> bool:
+        """删除回调状态，返回是否确实删除了一行(用于一次性令牌)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute('DELETE FROM callback_states WHERE token = ?', (token,))
+                conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error("删除回调状态失败: %s", e)
+            return False
+    
+    def purge_callback_states(self, now: float) -> int:
+        """删除已过期的回调状态，返回删除数量"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute(
+                    'DELETE FROM callback_states WHERE expires_at <= ?', (now,)
+                )
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error("清理回调状态失败: %s", e)
+            return 0
@@ -91,6 +91,15 @@ class Sect:
     
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
 
+@dataclass
+class SectMember:
+    """宗门成员列表项(只含列表所需的列)"""
+    tg_id: int
+    name: str
+    level: int
+    sect_position: str
+    sect_contribution: int
+
 @dataclass
 class SectContribution:
     id: int
@@ -0,0 +1,120 @@
+import logging
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, List, Optional
+import config
+
+logger = logging.getLogger(__name__)
+
+class QueryStats:
+    """单个更新内的查询统计"""
+    __slots__ = ('update_id', 'handler', 'count', 'total_time')
+
+    def __init__(self, update_id: Optional[int], handler: str):
+        self.update_id = update_id
+        self.handler = handler
+        self.count = 0
+        self.total_time = 0.0
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+class QueryProfiler:
+    """SQL 查询分析
+
+    开启后 GameDatabase 使用 ProfiledConnection，每条语句计入当前更新的统计；
+    超过阈值的语句连同 EXPLAIN QUERY PLAN 记录到日志，查询条数超出预算的 handler 给出警告。
+    """
+
+    def __init__(self, enabled: bool, slow_ms: float, budget: int):
+        self.enabled = enabled
+        self.slow_seconds = slow_ms / 1000
+        self.budget = budget
+        self._listeners: List[Callable[[QueryStats], None]] = []
+
+    def add_listener(self, listener: Callable[[QueryStats], None]):
+        """每个更新结束时以其 QueryStats 回调，供压测等工具汇总"""
+        self._listeners.append(listener)
+
+    def profiled(self, handler: str):
+        """为每个更新开启统计范围，handler 为命令名等入口名称"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            async def wrapper(update, context):
+                stats = QueryStats(getattr(update, 'update_id', None), handler)
+                token = _current.set(stats)
+                try:
+                    return await func(update, context)
+                finally:
+                    _current.reset(token)
+                    self._report(stats)
+            return wrapper
+        return decorator
+
+    def annotate(self, handler: str):
+        """在统计范围内细化 handler 名称，如回调路由"""
+        stats = _current.get()
+        if stats is not None:
+            stats.handler = handler
+
+    def record(self, conn: sqlite3.Connection, sql: str, params, elapsed: float):
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.total_time += elapsed
+
+        if elapsed >= self.slow_seconds:
+            where = f"{stats.handler}#{stats.update_id}" if stats is not None else "-"
+            logger.warning("慢查询 %.1fms [%s]: %s\n%s", elapsed * 1000, where, ' '.join(sql.split()), self._explain(conn, sql, params))
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, params) -> str:
+        try:
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        except sqlite3.Error as e:
+            return f"  (无法获取查询计划: {e})"
+        return "\n".join(f"  {row[-1]}" for row in rows)
+
+    def _report(self, stats: QueryStats):
+        for listener in self._listeners:
+            listener(stats)
+        if stats.count > self.budget:
+            logger.warning(
+                "%s 在更新 %s 中执行了 %s 条查询(预算 %s)，共 %.1fms",
+                stats.handler, stats.update_id, stats.count, self.budget, stats.total_time * 1000
+            )
+        else:
+            logger.debug(
+                "%s 更新 %s：%s 条查询，共 %.1fms",
+                stats.handler, stats.update_id, stats.count, stats.total_time * 1000
+            )
+
+# 全局查询分析器
+query_profiler = QueryProfiler(config.DB_PROFILE, config.DB_SLOW_QUERY_MS, config.DB_QUERY_BUDGET)
+
+class ProfiledConnection(sqlite3.Connection):
+    """记录每条语句耗时的连接(只计执行到第一行结果的时间)"""
+
+    def execute(self, sql: str, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_profiler.record(self, sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = _current.get()
+            if stats is not None:
+                stats.count += len(seq_of_parameters)
+                stats.total_time += elapsed
+            if elapsed >= query_profiler.slow_seconds:
+                logger.warning("慢批量语句 %.1fms x%s: %s", elapsed * 1000, len(seq_of_parameters), ' '.join(sql.split()))
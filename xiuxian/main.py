@@ -1,18 +1,20 @@
 import logging
 import asyncio
 import os
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from bot.handlers.user_commands import *
-from bot.handlers.admin_commands import *
-from bot.handlers.callbacks import callback_handler
+from bot.startup import startup_report, register_handlers, warm_up
+from telegram.ext import Application
 from database.database import GameDatabase
+from bot.utils.scheduler import status_scheduler
+from bot.utils.webhook import run_webhook
+from bot.utils.callback_state import callback_states
+from bot.utils.lifecycle import lifecycle
+from bot.utils.metrics import metrics, TimedRequest
+from bot.utils.logs import setup_logging
+from tracing import tracer
 import config
 
-# 设置日志
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# 设置日志：经队列由后台线程输出
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
 def ensure_data_directory():
@@ -29,33 +31,49 @@ def main():
     ensure_data_directory()
     
     # 初始化数据库
-    db = GameDatabase(config.DATABASE_PATH)
+    with startup_report.phase("schema"):
+        db = GameDatabase(config.DATABASE_PATH)
     logger.info("数据库初始化完成")
     
-    # 创建应用
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    # 创建应用并按清单注册处理器
+    with startup_report.phase("handlers"):
+        builder = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .post_init(lifecycle.post_init)
+            .post_stop(lifecycle.post_stop)
+            .post_shutdown(lifecycle.post_shutdown)
+        )
+        if metrics.enabled or tracer.enabled:
+            # 只替换普通 API 请求，getUpdates 长轮询不计入
+            builder = builder.request(TimedRequest())
+        application = builder.build()
+        register_handlers(application)
     
-    # 用户命令
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("panel", panel_command))
-    application.add_handler(CommandHandler("name", name_command))
-    application.add_handler(CommandHandler("use", use_command))
-    application.add_handler(CommandHandler("equip", equip_command))
+    # 预热缓存
+    warm_up(db)
     
-    # 管理员命令
-    application.add_handler(CommandHandler("admin_world", admin_create_world_command))
-    application.add_handler(CommandHandler("admin_equip", admin_create_equipment_command))
-    application.add_handler(CommandHandler("admin_item", admin_create_item_command))
-    application.add_handler(CommandHandler("admin_grant", admin_grant_command))
-    application.add_handler(CommandHandler("admin_tp", admin_teleport_command))
+    # 定时任务
+    application.job_queue.run_repeating(
+        status_scheduler.expire_job, interval=config.STATUS_TICK_SECONDS, first=1
+    )
+    application.job_queue.run_repeating(callback_states.purge_job, interval=3600, first=60)
     
-    # 回调处理
-    application.add_handler(CallbackQueryHandler(callback_handler))
-    
-    logger.info("Bot启动成功，开始轮询...")
+    allowed_updates = ["message", "callback_query"]
+    startup_report.mark_ready()
     
     # 启动Bot
-    application.run_polling(allowed_updates=["message", "callback_query"])
+    if config.UPDATE_MODE == 'webhook':
+        logger.info("Bot启动成功，开始接收Webhook...")
+        asyncio.run(run_webhook(application, allowed_updates))
+    else:
+        logger.info("Bot启动成功，开始轮询...")
+        # 信号由 lifecycle 在 post_init 中接管
+        application.run_polling(allowed_updates=allowed_updates, stop_signals=None)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # 刷出队列中剩余的日志
+        log_listener.stop()
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""测试公共配置
+
+模块按 `python -m` 在 xiuxian 目录下运行时的方式导入(import config、from bot... 等)，
+因此把 xiuxian 目录加入 sys.path；数据库一律使用每个测试自己的临时文件。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
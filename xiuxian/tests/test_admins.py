@@ -0,0 +1,78 @@
+"""管理员角色缓存与权限装饰器"""
+import asyncio
+import types
+
+import pytest
+
+import config
+from bot.utils import decorators
+from bot.utils.admins import admin_registry, ROLE_ADMIN, ROLE_OWNER
+from database.database import GameDatabase
+
+
+class Message:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def command_update(user_id: int):
+    return types.SimpleNamespace(effective_user=types.SimpleNamespace(id=user_id), message=Message())
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "game.db")
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    monkeypatch.setattr(config, "ADMIN_IDS", [1])
+    db = GameDatabase(path)
+    db.add_admin(2, "admin", ROLE_ADMIN)
+    admin_registry.load(db)
+    yield db
+    admin_registry.invalidate()
+
+
+def test_registry_roles(db):
+    assert admin_registry.role(None, 1) == ROLE_OWNER
+    assert admin_registry.is_admin(None, 2)
+    assert not admin_registry.is_admin(None, 2, ROLE_OWNER)
+    assert not admin_registry.is_admin(None, 3)
+
+
+def test_require_role_checks_cache_before_opening_database(db, monkeypatch):
+    opened = []
+
+    class CountingDatabase(GameDatabase):
+        def __init__(self, db_path):
+            opened.append(db_path)
+            super().__init__(db_path)
+
+    monkeypatch.setattr(decorators, "GameDatabase", CountingDatabase)
+
+    async def fake_reply(message, text, **kwargs):
+        await message.reply_text(text, **kwargs)
+
+    monkeypatch.setattr(decorators, "reply_text", fake_reply)
+    calls = []
+
+    @decorators.require_role(ROLE_OWNER)
+    async def owner_command(update, context, db):
+        calls.append(db)
+
+    denied = command_update(2)
+    asyncio.run(owner_command(denied, None))
+    assert denied.message.replies == ["❌ 你没有管理员权限！"]
+    assert opened == [] and calls == []
+
+    asyncio.run(owner_command(command_update(1), None))
+    assert len(opened) == 1 and len(calls) == 1
+
+
+def test_schema_pass_runs_once_per_path(db, monkeypatch):
+    runs = []
+    monkeypatch.setattr(GameDatabase, "init_database", lambda self: runs.append(self.db_path))
+    GameDatabase(config.DATABASE_PATH)
+    GameDatabase(config.DATABASE_PATH)
+    assert runs == []
@@ -0,0 +1,110 @@
+"""比武挑战按钮：只能被目标玩家使用一次，胜者升级并刷新匹配索引"""
+import asyncio
+import itertools
+import types
+
+import pytest
+
+import config
+from bot.handlers import callbacks
+from bot.utils.callback_state import CallbackStateStore
+from bot.utils.debounce import tap_debouncer
+from bot.utils.matchmaking import matchmaking_index
+from database.database import GameDatabase
+from database.models import Player
+
+CHALLENGER, TARGET, BYSTANDER = 1, 2, 3
+query_ids = itertools.count()
+# 令牌作废后按钮按过期处理
+EXPIRED = [("按钮已过期，请重新打开面板", False)]
+
+
+class Query:
+    def __init__(self, user_id: int, data: str):
+        self.id = next(query_ids)
+        self.data = data
+        self.from_user = types.SimpleNamespace(id=user_id)
+        self.message = None
+        self.inline_message_id = None
+        self.answers = []
+
+    async def answer(self, text=None, show_alert=False):
+        self.answers.append((text, show_alert))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "game.db")
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    monkeypatch.setattr(tap_debouncer, "window", 0)
+    monkeypatch.setattr(callbacks, "callback_states", CallbackStateStore(ttl=3600, cache_size=100))
+    db = GameDatabase(path)
+    # 挑战者必胜：目标战力为 0
+    db.create_player(Player(tg_id=CHALLENGER, name="挑战者", level=1, exp=0, attributes={'攻击力': 100}))
+    db.create_player(Player(tg_id=TARGET, name="目标", level=50, attributes={}))
+    db.create_player(Player(tg_id=BYSTANDER, name="路人"))
+    matchmaking_index.load(db)
+    yield db
+    matchmaking_index.__init__()
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    sent = []
+
+    async def fake_edit(query, text, reply_markup=None, **kwargs):
+        sent.append((text, reply_markup))
+        return True
+
+    monkeypatch.setattr(callbacks, "edit_message", fake_edit)
+    return sent
+
+
+@pytest.fixture
+def buttons(db):
+    """发起挑战时生成的两个按钮"""
+    return {
+        action: callbacks.callback_states.encode(db, action, challenger_id=CHALLENGER, target_id=TARGET)
+        for action in callbacks.BATTLE_ACTIONS
+    }
+
+
+def press(user_id: int, data: str) -> Query:
+    query = Query(user_id, data)
+    update = types.SimpleNamespace(callback_query=query)
+    asyncio.run(callbacks.callback_handler(update, None))
+    return query
+
+
+def test_accept_is_single_use_and_levels_up(db, edits, buttons):
+    before = matchmaking_index.get_power(CHALLENGER)
+    query = press(TARGET, buttons['accept_battle'])
+    assert query.answers == [(None, False)]
+
+    challenger = db.get_player(CHALLENGER)
+    # 经验 100 足够从 1 级连升，且不会停留在超过升级要求的状态
+    assert challenger.level > 1
+    assert "升级" in edits[-1][0] and edits[-1][1] is None
+    assert matchmaking_index.get_power(CHALLENGER) > before
+
+    # 重放同一按钮不再战斗、不再加经验
+    replay = press(TARGET, buttons['accept_battle'])
+    assert replay.answers == EXPIRED
+    assert db.get_player(CHALLENGER) == challenger
+    assert len(edits) == 1
+
+    # 拒绝按钮也随之作废
+    assert press(TARGET, buttons['reject_battle']).answers == EXPIRED
+
+
+def test_only_target_may_answer(db, edits, buttons):
+    for user_id in (CHALLENGER, BYSTANDER):
+        query = press(user_id, buttons['accept_battle'])
+        assert query.answers == [("这不是给你的挑战", True)]
+    assert edits == []
+
+    # 旁人的点击不消耗令牌，目标仍可拒绝
+    query = press(TARGET, buttons['reject_battle'])
+    assert query.answers == [(None, False)]
+    assert "拒绝" in edits[-1][0]
+    assert press(TARGET, buttons['accept_battle']).answers == EXPIRED
@@ -0,0 +1,85 @@
+"""回调状态令牌：批量编码一次写库，令牌可从数据库恢复；世界按钮走令牌"""
+import asyncio
+import types
+
+import pytest
+
+from bot.handlers import callbacks
+from bot.utils.callback_state import CallbackState, CallbackStateStore, STATE_PREFIX
+from bot.utils.game_logic import GameLogic
+from database.database import GameDatabase
+from database.models import Player, World
+
+
+class CountingDatabase(GameDatabase):
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.writes = []
+
+    def set_callback_state(self, token, payload, expires_at):
+        self.writes.append(1)
+        return super().set_callback_state(token, payload, expires_at)
+
+    def set_callback_states(self, entries):
+        self.writes.append(len(entries))
+        return super().set_callback_states(entries)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return CountingDatabase(str(tmp_path / "game.db"))
+
+
+def test_encode_many_writes_new_tokens_once(db):
+    store = CallbackStateStore(ttl=3600, cache_size=100)
+    params = [{'name': f"剑{i}", 'slot': "武器", 'page': 1} for i in range(5)]
+
+    cached = store.encode(db, 'equip_item', **params[0])
+    tokens = store.encode_many(db, 'equip_item', params + [params[1]])
+
+    # 已缓存的令牌复用，其余 4 个新令牌一次批量写入，重复参数只写一次
+    assert db.writes == [1, 4]
+    assert tokens[0] == cached and tokens[1] == tokens[-1]
+    assert all(token.startswith(STATE_PREFIX) for token in tokens)
+
+    # 冷缓存时从数据库恢复
+    fresh = CallbackStateStore(ttl=3600, cache_size=100)
+    assert [fresh.decode(db, token) for token in tokens[:5]] == [CallbackState('equip_item', p) for p in params]
+
+    # 热缓存的整页渲染不再写库
+    store.encode_many(db, 'equip_item', params)
+    assert db.writes == [1, 4]
+
+
+def test_encode_many_empty_page(db):
+    store = CallbackStateStore(ttl=3600, cache_size=100)
+    assert store.encode_many(db, 'equip_item', []) == []
+    assert db.writes == []
+
+
+def test_world_buttons_carry_state_tokens(db, monkeypatch):
+    store = CallbackStateStore(ttl=3600, cache_size=100)
+    monkeypatch.setattr(callbacks, "callback_states", store)
+    sent = []
+
+    async def fake_edit(query, text, reply_markup=None, **kwargs):
+        sent.append(text)
+
+    monkeypatch.setattr(callbacks, "edit_message", fake_edit)
+    worlds = [World(name="凡人界", world_level=1, description="起点"), World(name="灵界", world_level=2)]
+    for world in worlds:
+        db.create_world(world)
+
+    buttons = callbacks.world_selection_buttons(db, worlds, 1)
+    assert [(name, level) for name, level, _ in buttons] == [("凡人界", 1)]
+    assert all(data.startswith(STATE_PREFIX) and len(data.encode()) <= 64 for _, _, data in buttons)
+
+    state = store.decode(db, buttons[0][2])
+    route = callbacks.router.resolve_action(state.action)
+    player = Player(tg_id=1, name="测试")
+    asyncio.run(route.handler(types.SimpleNamespace(), state, player, db, GameLogic(db)))
+    assert "凡人界" in sent[-1] and "起点" in sent[-1]
+
+    locked = CallbackState('goto_world', {'name': "灵界", 'world_level': 2})
+    asyncio.run(route.handler(types.SimpleNamespace(), locked, player, db, GameLogic(db)))
+    assert "尚未达到" in sent[-1]
@@ -0,0 +1,212 @@
+"""负载下停机：处理中的更新在等待期内完成并落库，超时后新更新丢弃、卡住的 handler 被取消；
+真实 Application 收到 SIGTERM 后刷出发送队列并做检查点"""
+import asyncio
+import json
+import os
+import signal
+import types
+
+import pytest
+from telegram.ext import Application
+
+import config
+from bot.startup import register_handlers
+from bot.utils import lifecycle as lifecycle_module
+from bot.utils.lifecycle import Lifecycle
+from bot.utils.send_queue import TokenBucket, send_queue
+from database.database import GameDatabase
+from database.models import Player
+from tools.loadtest import BOT_USER, StubRequest
+
+PLAYERS = 50
+REWARD = 10
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = GameDatabase(str(tmp_path / "game.db"))
+    for tg_id in range(1, PLAYERS + 1):
+        db.create_player(Player(tg_id=tg_id, name=f"玩家{tg_id}"))
+    return db
+
+
+def update(user_id: int):
+    return types.SimpleNamespace(effective_user=types.SimpleNamespace(id=user_id))
+
+
+def reward_handler(db: GameDatabase, started: list, delay: float):
+    """读取玩家，跨越一次 await 后发放修为并写回，模拟真实的奖励 handler"""
+    async def handle(update, context):
+        player = db.get_player(update.effective_user.id)
+        started.append(player.tg_id)
+        await asyncio.sleep(delay)
+        player.exp += REWARD
+        db.update_player(player)
+    return handle
+
+
+def test_inflight_rewards_commit_during_drain(db):
+    lifecycle = Lifecycle(drain_timeout=0.5, flush_timeout=1)
+    started = []
+    handler = lifecycle.tracked(reward_handler(db, started, delay=0.05))
+
+    async def main():
+        tasks = [asyncio.create_task(handler(update(tg_id), None)) for tg_id in range(1, PLAYERS + 1)]
+        while len(started) < PLAYERS:
+            await asyncio.sleep(0)
+        assert lifecycle.inflight == PLAYERS
+
+        # 在所有 handler 都处于 await 中途时收到 SIGTERM
+        lifecycle.begin_shutdown()
+        await asyncio.gather(*tasks)
+
+        assert lifecycle.inflight == 0
+        # 等待期内到达的更新仍被处理
+        await handler(update(1), None)
+
+    asyncio.run(main())
+
+    assert lifecycle.dropped == 0
+    exps = {player.tg_id: player.exp for player in db.get_players(list(range(1, PLAYERS + 1)))}
+    assert exps == {tg_id: REWARD * (2 if tg_id == 1 else 1) for tg_id in range(1, PLAYERS + 1)}
+
+
+def test_deadline_drops_new_updates_and_cancels_stuck_handler(db):
+    lifecycle = Lifecycle(drain_timeout=0.1, flush_timeout=1)
+    started = []
+    fast = lifecycle.tracked(reward_handler(db, started, delay=0.01))
+
+    async def stuck(update, context):
+        started.append("stuck")
+        await asyncio.Event().wait()
+
+    stuck = lifecycle.tracked(stuck)
+
+    async def main():
+        tasks = [asyncio.create_task(fast(update(tg_id), None)) for tg_id in range(1, 11)]
+        hung = asyncio.create_task(stuck(update(11), None))
+        while len(started) < 11:
+            await asyncio.sleep(0)
+
+        lifecycle.begin_shutdown()
+        await asyncio.gather(*tasks)
+        # 卡住的 handler 在超时后被取消，且取消不会向调用方抛出
+        assert await asyncio.wait_for(hung, 1) is None
+        assert lifecycle.inflight == 0
+
+        # 超过期限后到达的更新直接丢弃，不再读写数据库
+        await fast(update(12), None)
+        await fast(update(13), None)
+
+    asyncio.run(main())
+
+    assert lifecycle.dropped == 2
+    assert 12 not in started and 13 not in started
+    exps = {player.tg_id: player.exp for player in db.get_players(list(range(1, 14)))}
+    assert all(exps[tg_id] == REWARD for tg_id in range(1, 11))
+    assert exps[11] == exps[12] == exps[13] == 0
+
+
+def test_cancellation_outside_shutdown_propagates(db):
+    lifecycle = Lifecycle(drain_timeout=1, flush_timeout=1)
+
+    async def slow(update, context):
+        await asyncio.sleep(10)
+
+    handler = lifecycle.tracked(slow)
+
+    async def main():
+        task = asyncio.create_task(handler(update(1), None))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert lifecycle.inflight == 0
+
+    asyncio.run(main())
+
+
+class PollingStub(StubRequest):
+    """getUpdates 第一次返回一批刷怪点击，之后返回空"""
+
+    def __init__(self, updates):
+        super().__init__()
+        self.updates = updates
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if url.endswith("/getUpdates"):
+            updates, self.updates = self.updates, []
+            if not updates:
+                await asyncio.sleep(0.05)
+            return 200, json.dumps({"ok": True, "result": updates}).encode()
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+def hunt_update(tg_id: int) -> dict:
+    return {
+        "update_id": tg_id,
+        "callback_query": {
+            "id": str(tg_id), "chat_instance": "test", "data": "hunt_简单",
+            "from": {"id": tg_id, "is_bot": False, "first_name": f"玩家{tg_id}"},
+            "message": {"message_id": tg_id, "date": 0, "chat": {"id": tg_id, "type": "private"}, "from": BOT_USER},
+        },
+    }
+
+
+def test_sigterm_under_load_keeps_rewards_and_flushes(db, monkeypatch):
+    monkeypatch.setattr(config, "DATABASE_PATH", db.db_path)
+    # 全局生命周期与发送队列在测试后恢复，避免影响其他测试
+    monkeypatch.setattr(send_queue, "_closing", False)
+    monkeypatch.setattr(send_queue, "global_bucket", TokenBucket(25, 1))
+    # register_handlers 用全局生命周期包装处理器
+    lifecycle = lifecycle_module.lifecycle
+    lifecycle.__init__(drain_timeout=30, flush_timeout=30)
+
+    checkpoints = []
+    real_checkpoint = GameDatabase.checkpoint
+    monkeypatch.setattr(GameDatabase, "checkpoint", lambda self: checkpoints.append(real_checkpoint(self)))
+
+    # 每次 API 调用 20ms、全局每秒 25 条：收到信号时点击还在处理，大部分编辑仍在发送队列中
+    api = StubRequest(latency=0.02)
+    polling = PollingStub([hunt_update(tg_id) for tg_id in range(1, PLAYERS + 1)])
+
+    async def post_init(application):
+        await lifecycle.post_init(application)
+
+        async def kill_when_busy():
+            while lifecycle.inflight == 0:
+                await asyncio.sleep(0.001)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        application.create_task(kill_when_busy())
+
+    unsent = []
+
+    async def post_stop(application):
+        unsent.append(len(send_queue))
+        await lifecycle.post_stop(application)
+
+    application = (
+        Application.builder().token("1:test").request(api).get_updates_request(polling)
+        .post_init(post_init).post_stop(post_stop).post_shutdown(lifecycle.post_shutdown)
+        .build()
+    )
+    register_handlers(application)
+    try:
+        application.run_polling(stop_signals=None, close_loop=False)
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_event_loop().remove_signal_handler(sig)
+        lifecycle.__init__(config.SHUTDOWN_DRAIN_TIMEOUT, config.SHUTDOWN_FLUSH_TIMEOUT)
+
+    assert lifecycle.dropped == 0 and lifecycle.inflight == 0
+    # 每名玩家的刷怪奖励都已落库
+    for player in db.get_players(list(range(1, PLAYERS + 1))):
+        assert player.last_hunt, player.tg_id
+        assert player.exp > 0 or player.status.get('injured'), player.tg_id
+    # 停机时尚未发出的编辑全部由 post_stop 刷出，随后做了检查点
+    assert unsent[0] > 0
+    assert api.calls["answerCallbackQuery"] == PLAYERS
+    assert api.calls["editMessageText"] == PLAYERS
+    assert len(send_queue) == 0
+    assert checkpoints == [True]
@@ -0,0 +1,120 @@
+"""别名法掉落表：构建出的分布与品质权重一致，掉落表在重建时预先算好"""
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import config
+from bot.startup import warm_up
+from bot.utils import loot
+from bot.utils.loot import AliasTable, LootTables, quality_weight
+from database.database import GameDatabase
+from database.models import Equipment
+
+DRAWS = 200_000
+
+
+def chi_square_critical(df: int, z: float = 3.09) -> float:
+    """卡方分布上侧分位数的 Wilson–Hilferty 近似，z=3.09 对应显著性 0.001"""
+    return df * (1 - 2 / (9 * df) + z * math.sqrt(2 / (9 * df))) ** 3
+
+
+def implied_probabilities(table: AliasTable):
+    """由 prob/alias 数组精确推出每项被抽中的概率"""
+    n = len(table)
+    probabilities = [p / n for p in table.prob]
+    for i, alias in enumerate(table.alias):
+        probabilities[alias] += (1 - table.prob[i]) / n
+    return probabilities
+
+
+@pytest.fixture
+def db(tmp_path):
+    """装备目录：每种品质一件、任何玩家都能装备的剑"""
+    db = GameDatabase(str(tmp_path / "game.db"))
+    for quality in config.EQUIPMENT_QUALITIES:
+        db.create_equipment(Equipment(name=f"{quality}剑", slot="武器", quality=quality))
+    return db
+
+
+@pytest.mark.parametrize("weights", [[1], [1, 1, 1], [5, 1, 0.5, 3], [0.001, 1000, 1, 0]])
+def test_alias_table_encodes_exact_weights(weights):
+    table = AliasTable([str(i) for i in range(len(weights))], weights)
+    total = sum(weights)
+    assert implied_probabilities(table) == pytest.approx([w / total for w in weights], abs=1e-12)
+
+
+def test_alias_table_rejects_bad_input():
+    with pytest.raises(ValueError):
+        AliasTable([], [])
+    with pytest.raises(ValueError):
+        AliasTable(["a"], [0])
+
+
+@pytest.mark.parametrize("difficulty", list(config.HUNT_DIFFICULTIES))
+def test_drop_rates_follow_quality_weight(db, difficulty):
+    tables = LootTables()
+    tables.rebuild(db)
+
+    weights = {quality: quality_weight(quality, difficulty) for quality in config.EQUIPMENT_QUALITIES}
+    total = sum(weights.values())
+    expected = {f"{quality}剑": DRAWS * weight / total for quality, weight in weights.items()}
+
+    rng = random.Random(20240601)
+    counts = Counter(tables.sample(db, 1, 1, difficulty, rng) for _ in range(DRAWS))
+
+    statistic = sum((counts[name] - e) ** 2 / e for name, e in expected.items())
+    assert statistic < chi_square_critical(len(expected) - 1)
+    assert set(counts) <= set(expected)
+
+    # 品质越高越稀有
+    ordered = [counts[f"{quality}剑"] for quality in config.EQUIPMENT_QUALITIES]
+    assert ordered[0] > ordered[len(ordered) // 2] > ordered[-1]
+
+
+def test_sampling_is_reproducible_with_seed(db):
+    tables = LootTables()
+    rng_a, rng_b = random.Random(99), random.Random(99)
+    draws_a = [tables.sample(db, 1, 1, "困难", rng_a) for _ in range(100)]
+    draws_b = [tables.sample(db, 1, 1, "困难", rng_b) for _ in range(100)]
+    assert draws_a == draws_b
+
+
+def test_tables_are_precomputed_on_rebuild(db):
+    db.create_equipment(Equipment(name="高阶剑", slot="武器", quality="普通", level_requirement=25))
+    db.create_equipment(Equipment(name="异界剑", slot="武器", quality="普通", world_level_requirement=3))
+    tables = LootTables()
+    tables.rebuild(db)
+    # 世界等级 1-3 × 等级分段 0-3 × 难度
+    precomputed = len(tables)
+    assert precomputed == 3 * 4 * len(config.HUNT_DIFFICULTIES)
+
+    # 任意等级与世界等级都命中已算好的表，不再构建
+    for world_level in (1, 2, 5, 99):
+        for level in (1, 9, 10, 30, 500):
+            for difficulty in config.HUNT_DIFFICULTIES:
+                tables.get_table(db, world_level, level, difficulty)
+    assert len(tables) == precomputed
+
+
+def test_table_excludes_equipment_above_band_or_world(db):
+    db.create_equipment(Equipment(name="高阶剑", slot="武器", quality="普通", level_requirement=25))
+    db.create_equipment(Equipment(name="异界剑", slot="武器", quality="普通", world_level_requirement=3))
+    tables = LootTables()
+    tables.rebuild(db)
+
+    low = tables.get_table(db, 1, 1, "简单")
+    assert "高阶剑" not in low.items and "异界剑" not in low.items
+    assert "高阶剑" in tables.get_table(db, 1, 30, "简单").items
+    assert "异界剑" in tables.get_table(db, 3, 1, "简单").items
+    assert "异界剑" in tables.get_table(db, 5, 1000, "简单").items
+
+
+def test_warm_up_builds_tables(db, monkeypatch):
+    monkeypatch.setattr(loot, "loot_tables", LootTables())
+    warm_up(db)
+    built = len(loot.loot_tables)
+    assert built >= len(config.HUNT_DIFFICULTIES)
+    loot.loot_tables.sample(db, 1, 1, "简单")
+    assert len(loot.loot_tables) == built
@@ -0,0 +1,61 @@
+"""比武匹配索引：新玩家入索引，修改装备属性后重建"""
+import asyncio
+import json
+import types
+
+import pytest
+
+import config
+from bot.handlers import admin_commands, user_commands
+from bot.utils import decorators
+from bot.utils.admins import admin_registry
+from bot.utils.matchmaking import matchmaking_index
+from database.database import GameDatabase
+from database.models import Equipment, Player
+
+ADMIN = 1
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "game.db")
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    monkeypatch.setattr(config, "ADMIN_IDS", [ADMIN])
+    replies = []
+
+    async def fake_reply(message, text, **kwargs):
+        replies.append(text)
+
+    for module in (user_commands, admin_commands, decorators):
+        monkeypatch.setattr(module, "reply_text", fake_reply)
+
+    db = GameDatabase(path)
+    db.create_equipment(Equipment(name="青锋剑", slot="武器", attributes={'攻击力': 10}))
+    db.create_player(Player(tg_id=10, name="持剑者", equipment={"武器": "青锋剑"}))
+    db.create_player(Player(tg_id=11, name="空手"))
+    admin_registry.load(db)
+    matchmaking_index.load(db)
+    yield db
+    admin_registry.invalidate()
+    matchmaking_index.__init__()
+
+
+def command(user_id: int, args=()):
+    user = types.SimpleNamespace(id=user_id, username="", first_name=f"玩家{user_id}")
+    update = types.SimpleNamespace(effective_user=user, message=types.SimpleNamespace(chat_id=user_id))
+    return update, types.SimpleNamespace(args=list(args))
+
+
+def test_new_player_enters_index(db):
+    assert matchmaking_index.get_power(20) is None
+    asyncio.run(user_commands.start_command(*command(20)))
+    assert matchmaking_index.get_power(20) == matchmaking_index.get_power(11)
+    assert 20 in [tg_id for tg_id, _ in matchmaking_index.nearest(1, 0, 10)]
+
+
+def test_changing_equipment_stats_rebuilds_index(db):
+    before = matchmaking_index.get_power(10)
+    args = ["青锋剑", "武器", "普通", "1", "1", json.dumps({'攻击力': 1000})]
+    asyncio.run(admin_commands.admin_create_equipment_command(*command(ADMIN, args)))
+    assert matchmaking_index.get_power(10) == before + int(990 * 1.5)
+    assert matchmaking_index.get_power(11) < matchmaking_index.get_power(10)
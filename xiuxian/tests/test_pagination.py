@@ -0,0 +1,63 @@
+"""背包与装备部位翻页：页码超出末页时显示最后一页"""
+import asyncio
+import types
+
+import pytest
+
+import config
+from bot.handlers import callbacks
+from bot.utils.game_logic import GameLogic
+from database.database import GameDatabase
+from database.models import Equipment, Player
+
+SLOT = "武器"
+COUNT = config.PAGE_SIZE + 3
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = GameDatabase(str(tmp_path / "game.db"))
+    for i in range(COUNT):
+        db.create_equipment(Equipment(name=f"翻页剑{i:02d}", slot=SLOT, quality="普通"))
+    db.create_player(Player(tg_id=1, name="测试", inventory={f"翻页剑{i:02d}": 1 for i in range(COUNT)}))
+    return db
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    sent = []
+
+    async def fake_edit(query, text, reply_markup=None, **kwargs):
+        buttons = [[button.text for button in row] for row in reply_markup.inline_keyboard]
+        sent.append((text, buttons))
+        return True
+
+    monkeypatch.setattr(callbacks, "edit_message", fake_edit)
+    return sent
+
+
+def tap(data: str, db: GameDatabase):
+    route = callbacks.router.resolve(data)
+    asyncio.run(route.handler(types.SimpleNamespace(), data, db.get_player(1), db, GameLogic(db)))
+
+
+@pytest.mark.parametrize("data", [
+    f"equipslot_{SLOT}_page_99", "inv_page_99", "inv_equip_page_99",
+])
+def test_out_of_range_page_shows_last_page(db, edits, data):
+    tap(data, db)
+    text, buttons = edits[-1]
+    assert any(row[:2] == ["⬅️", "2/2"] for row in buttons)
+    # 最后一页的内容，而不是空页
+    assert f"翻页剑{COUNT - 1:02d}" in text
+    assert "翻页剑00" not in text
+
+
+def test_equipment_page_clamps_before_offset(db):
+    names = [f"翻页剑{i:02d}" for i in range(COUNT)]
+    first, total, page = db.get_equipment_page(names, SLOT, page=0, page_size=config.PAGE_SIZE)
+    assert (total, page, len(first)) == (COUNT, 1, config.PAGE_SIZE)
+
+    last, total, page = db.get_equipment_page(names, SLOT, page=99, page_size=config.PAGE_SIZE)
+    assert (page, len(last)) == (2, COUNT - config.PAGE_SIZE)
+    assert db.get_equipment_page([], SLOT, page=5) == ([], 0, 1)
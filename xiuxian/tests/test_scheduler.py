@@ -0,0 +1,73 @@
+"""限时状态到期：只删除确实读取并保存了的玩家的到期行，其余留待重试"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from bot.utils import scheduler
+from bot.utils.scheduler import StatusScheduler
+from database.database import GameDatabase
+from database.models import Player
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "game.db")
+    monkeypatch.setattr(config, "DATABASE_PATH", path)
+    db = GameDatabase(path)
+    past = datetime.now() - timedelta(minutes=1)
+    for tg_id in (1, 2):
+        db.create_player(Player(tg_id=tg_id, name=f"玩家{tg_id}",
+                                status={'injured': True, 'injured_until': past.isoformat()}))
+        db.set_timed_status(tg_id, 'injured', past.isoformat())
+    return db
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def fake_send(bot, chat_id, text, **kwargs):
+        messages.append(chat_id)
+
+    monkeypatch.setattr(scheduler, "send_message", fake_send)
+    return messages
+
+
+def expire(status_scheduler: StatusScheduler):
+    asyncio.run(status_scheduler.expire_due(None))
+
+
+def test_unread_players_are_retried(db, sent, monkeypatch):
+    status_scheduler = StatusScheduler()
+    status_scheduler.load(db)
+    real_get_players = GameDatabase.get_players
+
+    # 读取出错时 get_players 返回空列表
+    monkeypatch.setattr(GameDatabase, "get_players", lambda self, ids: [])
+    expire(status_scheduler)
+    assert len(db.get_timed_statuses()) == 2
+    assert len(status_scheduler) == 2 and sent == []
+
+    # 只读到部分玩家
+    monkeypatch.setattr(GameDatabase, "get_players", lambda self, ids: real_get_players(self, [1]))
+    expire(status_scheduler)
+    assert [row[0] for row in db.get_timed_statuses()] == [2]
+    assert not db.get_player(1).status.get('injured') and db.get_player(2).status['injured']
+    assert sent == [1]
+
+    monkeypatch.setattr(GameDatabase, "get_players", real_get_players)
+    expire(status_scheduler)
+    assert db.get_timed_statuses() == [] and len(status_scheduler) == 0
+    assert not db.get_player(2).status.get('injured')
+    assert sent == [1, 2]
+
+
+def test_failed_save_keeps_rows(db, sent, monkeypatch):
+    status_scheduler = StatusScheduler()
+    status_scheduler.load(db)
+    monkeypatch.setattr(GameDatabase, "update_player_statuses", lambda self, players: False)
+    expire(status_scheduler)
+    assert len(db.get_timed_statuses()) == 2
+    assert len(status_scheduler) == 2 and sent == []
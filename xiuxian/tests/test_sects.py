@@ -0,0 +1,147 @@
+"""宗门加入/退出、人数缓存与成员分页"""
+import asyncio
+import types
+
+import pytest
+
+from bot.handlers import callbacks
+from bot.utils.game_logic import GameLogic
+from bot.utils.sects import sect_member_counts
+from database.database import GameDatabase
+from database.models import Player, Sect
+
+
+@pytest.fixture
+def db(tmp_path):
+    sect_member_counts.invalidate()
+    db = GameDatabase(str(tmp_path / "game.db"))
+    db.create_sect(Sect(id=0, name="青云门", max_members=3))
+    yield db
+    sect_member_counts.invalidate()
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    """拦截回调处理器的消息编辑，记录 (文本, 按钮回调数据)"""
+    sent = []
+
+    async def fake_edit(query, text, reply_markup=None, **kwargs):
+        buttons = [[button.callback_data for button in row] for row in reply_markup.inline_keyboard]
+        sent.append((text, buttons))
+        return True
+
+    monkeypatch.setattr(callbacks, "edit_message", fake_edit)
+    return sent
+
+
+def tap(data: str, player: Player, db: GameDatabase):
+    route = callbacks.router.resolve(data)
+    asyncio.run(route.handler(types.SimpleNamespace(), data, player, db, GameLogic(db)))
+
+
+def new_player(db: GameDatabase, tg_id: int) -> Player:
+    db.create_player(Player(tg_id=tg_id, name=f"玩家{tg_id}"))
+    return db.get_player(tg_id)
+
+
+def test_join_respects_cached_member_limit(db):
+    game_logic = GameLogic(db)
+    sect = db.list_sects()[0]
+
+    results = [game_logic.join_sect(new_player(db, tg_id), sect)[0] for tg_id in range(1, 6)]
+    assert results == [True, True, True, False, False]
+    assert sect_member_counts.count(db, sect.id) == 3
+    assert db.get_sect_member_counts() == {sect.id: 3}
+
+    success, _ = game_logic.leave_sect(db.get_player(2))
+    assert success
+    assert db.get_player(2).sect_id is None
+    assert sect_member_counts.count(db, sect.id) == 2
+
+    # 退出后空出名额，缓存与数据库保持一致
+    assert game_logic.join_sect(db.get_player(4), sect)[0]
+    sect_member_counts.invalidate()
+    assert sect_member_counts.count(db, sect.id) == 3
+
+
+def test_join_and_leave_buttons(db, edits):
+    sect = db.list_sects()[0]
+    player = new_player(db, 1)
+
+    tap("sect_apply", player, db)
+    text, buttons = edits[-1]
+    assert "青云门" in text and "(0/3)" in text
+    assert buttons[0] == [f"sect_join_{sect.id}"]
+
+    tap(f"sect_join_{sect.id}", player, db)
+    assert "已加入青云门" in edits[-1][0]
+    assert db.get_player(1).sect_id == sect.id
+    assert sect_member_counts.count(db, sect.id) == 1
+
+    tap("sect_leave", player, db)
+    assert edits[-1][1][0] == ["confirm_sect_leave", "cancel_sect_leave"]
+    tap("confirm_sect_leave", player, db)
+    assert "已退出青云门" in edits[-1][0]
+    assert db.get_player(1).sect_id is None
+    assert sect_member_counts.count(db, sect.id) == 0
+
+
+def test_full_sect_has_no_join_button(db, edits):
+    sect = db.list_sects()[0]
+    game_logic = GameLogic(db)
+    for tg_id in range(1, 4):
+        game_logic.join_sect(new_player(db, tg_id), sect)
+
+    outsider = new_player(db, 10)
+    tap("sect_apply", outsider, db)
+    assert "(3/3)" in edits[-1][0]
+    assert edits[-1][1] == [["panel_sect"]]
+
+    # 直接点击过期的加入按钮同样被拒绝
+    tap(f"sect_join_{sect.id}", outsider, db)
+    assert "人数已满" in edits[-1][0]
+    assert db.get_player(10).sect_id is None
+
+
+def test_member_pages_follow_contribution_order(db):
+    db.create_sect(Sect(id=0, name="天音寺", max_members=100))
+    sect = next(sect for sect in db.list_sects() if sect.name == "天音寺")
+    game_logic = GameLogic(db)
+    for tg_id in range(1, 26):
+        player = new_player(db, tg_id)
+        game_logic.join_sect(player, sect)
+        player.sect_contribution = tg_id % 4
+        db.update_player(player)
+
+    seen, after = [], None
+    while True:
+        page = db.get_sect_members(sect.id, 10, after)
+        if not page:
+            break
+        seen.extend((member.sect_contribution, member.tg_id) for member in page)
+        after = seen[-1]
+
+    assert seen == sorted(seen, key=lambda key: (-key[0], key[1]))
+    assert len(seen) == 25
+
+
+def test_failed_save_restores_sect_fields(db, monkeypatch):
+    game_logic = GameLogic(db)
+    sect = db.list_sects()[0]
+    player = new_player(db, 1)
+    player.sect_position, player.sect_contribution = "散修", 7
+
+    monkeypatch.setattr(db, "update_player", lambda player: False)
+    assert not game_logic.join_sect(player, sect)[0]
+    assert (player.sect_id, player.sect_position, player.sect_contribution) == (None, "散修", 7)
+    assert sect_member_counts.count(db, sect.id) == 0
+
+    monkeypatch.undo()
+    assert game_logic.join_sect(player, sect)[0]
+    player.sect_position, player.sect_contribution = "长老", 42
+    db.update_player(player)
+
+    monkeypatch.setattr(db, "update_player", lambda player: False)
+    assert not game_logic.leave_sect(player)[0]
+    assert (player.sect_id, player.sect_position, player.sect_contribution) == (sect.id, "长老", 42)
+    assert sect_member_counts.count(db, sect.id) == 1
@@ -0,0 +1,147 @@
+"""发送队列：会话与全局限流、交互优先、编辑合并(含 RetryAfter 之后)、关闭时排空"""
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from telegram.error import RetryAfter
+
+import config
+from bot.utils.send_queue import SendQueue, PRIORITY_BROADCAST, PRIORITY_INTERACTIVE
+
+# 计时容差(秒)
+SLACK = 0.03
+
+
+class FakeBot:
+    """记录每次调用的 (标签, 时刻)，可按标签预设抛出的异常"""
+
+    def __init__(self):
+        self.calls = []
+        self.failures = {}
+        self.started = time.monotonic()
+
+    def call(self, label):
+        async def send():
+            self.calls.append((label, time.monotonic() - self.started))
+            error = self.failures.pop(label, None)
+            if error is not None:
+                raise error
+            return label
+        return send
+
+    @property
+    def labels(self):
+        return [label for label, _ in self.calls]
+
+
+@pytest.fixture(autouse=True)
+def single_token_bursts(monkeypatch):
+    monkeypatch.setattr(config, "SEND_PRIVATE_BURST", 1)
+    monkeypatch.setattr(config, "SEND_GROUP_BURST", 1)
+
+
+def run(scenario, **kwargs):
+    async def main():
+        queue = SendQueue(**kwargs)
+        bot = FakeBot()
+        await scenario(queue, bot)
+        await queue.close(timeout=5)
+    asyncio.run(main())
+
+
+def test_per_chat_spacing():
+    async def scenario(queue, bot):
+        futures = [queue.submit(1, bot.call(i)) for i in range(4)]
+        # 其他会话不受该会话限流影响
+        other = queue.submit(2, bot.call("other"))
+        assert await asyncio.gather(*futures) == [0, 1, 2, 3]
+        await other
+
+        times = [t for label, t in bot.calls if label != "other"]
+        assert all(b - a >= 0.1 - SLACK for a, b in zip(times, times[1:]))
+        assert dict(bot.calls)["other"] < 0.1
+    run(scenario, global_rate=100, private_rate=10)
+
+
+def test_global_spacing():
+    async def scenario(queue, bot):
+        await asyncio.gather(*[queue.submit(chat_id, bot.call(chat_id)) for chat_id in range(1, 21)])
+        times = [t for _, t in bot.calls]
+        # 突发 10 条之后按每秒 10 条发送
+        assert times[9] < 0.1
+        assert all(b - a >= 0.1 - SLACK for a, b in zip(times[10:], times[11:]))
+        assert times[-1] >= 1.0 - SLACK
+    run(scenario, global_rate=10, private_rate=100)
+
+
+def test_interactive_before_broadcast():
+    async def scenario(queue, bot):
+        broadcasts = [queue.submit(chat_id, bot.call(f"b{chat_id}"), PRIORITY_BROADCAST) for chat_id in range(1, 9)]
+        await asyncio.sleep(0.05)
+        # 突发额度用完后提交的交互回复排在剩余广播之前
+        reply = queue.submit(100, bot.call("reply"), PRIORITY_INTERACTIVE)
+        await asyncio.gather(reply, *broadcasts)
+        assert bot.labels[:4] == ["b1", "b2", "b3", "b4"]
+        assert bot.labels[4] == "reply"
+    run(scenario, global_rate=4, private_rate=100)
+
+
+def test_pending_edits_are_coalesced():
+    async def scenario(queue, bot):
+        futures = [queue.submit(1, bot.call(f"v{i}"), coalesce_key=("edit", 1)) for i in range(3)]
+        assert await asyncio.gather(*futures) == ["v2", "v2", "v2"]
+        assert bot.labels == ["v2"]
+    run(scenario, global_rate=100, private_rate=100)
+
+
+def test_edit_resubmitted_during_retry_after_is_coalesced():
+    async def scenario(queue, bot):
+        bot.failures["v1"] = RetryAfter(timedelta(milliseconds=200))
+        first = queue.submit(1, bot.call("v1"), coalesce_key=("edit", 1))
+        await asyncio.sleep(0.05)
+        assert bot.labels == ["v1"]
+
+        # 限流等待中的新编辑合并进被退回的任务，不会另发一次
+        second = queue.submit(1, bot.call("v2"), coalesce_key=("edit", 1))
+        # RetryAfter 暂停全局发送，其他会话也要等待
+        other = queue.submit(2, bot.call("other"))
+        assert await asyncio.gather(first, second, other) == ["v2", "v2", "other"]
+        assert sorted(bot.labels) == ["other", "v1", "v2"]
+        assert all(t >= 0.2 - SLACK for label, t in bot.calls if label != "v1")
+    run(scenario, global_rate=100, private_rate=100)
+
+
+def test_edit_superseded_while_in_flight_is_dropped():
+    async def scenario(queue, bot):
+        release = asyncio.Event()
+
+        async def slow_v1():
+            bot.calls.append(("v1", time.monotonic() - bot.started))
+            await release.wait()
+            raise RetryAfter(timedelta(milliseconds=100))
+
+        first = queue.submit(1, slow_v1, coalesce_key=("edit", 1))
+        await asyncio.sleep(0.02)
+        # v1 已发出时提交的新编辑成为独立任务
+        second = queue.submit(1, bot.call("v2"), coalesce_key=("edit", 1))
+        release.set()
+
+        # v1 被限流退回后被 v2 取代，两者得到同一结果
+        assert await asyncio.gather(first, second) == ["v2", "v2"]
+        assert bot.labels == ["v1", "v2"]
+    run(scenario, global_rate=100, private_rate=100)
+
+
+def test_close_drains_queue():
+    async def main():
+        queue = SendQueue(global_rate=100, private_rate=20)
+        bot = FakeBot()
+        futures = [queue.submit(1, bot.call(i)) for i in range(5)]
+        await queue.close(timeout=5)
+        assert bot.labels == [0, 1, 2, 3, 4]
+        assert all(future.done() for future in futures)
+        assert len(queue) == 0
+        with pytest.raises(RuntimeError):
+            queue.submit(1, bot.call("late"))
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""webhook 服务的本地集成测试：真实监听回环端口，用原始 HTTP 请求发送合成更新"""
+import asyncio
+import json
+
+import pytest
+from telegram.ext import Application
+
+import config
+from bot.utils import webhook
+from bot.utils.webhook import WebhookServer
+
+SECRET = "test-secret"
+PATH = "/telegram"
+
+
+def message_update(update_id: int, user_id: int = 42) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": "/start",
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "测试"},
+        },
+    }
+
+
+async def request(port: int, method: str, path: str, body=None, secret: str = None):
+    """发送一个 HTTP/1.1 请求，返回 (状态码, JSON)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+    headers = [f"{method} {path} HTTP/1.1", "Host: localhost", "Connection: close",
+               f"Content-Length: {len(payload)}"]
+    if secret is not None:
+        headers.append(f"X-Telegram-Bot-Api-Secret-Token: {secret}")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+def run_with_server(scenario):
+    """启动监听随机端口的服务，运行 scenario(server, port, application)"""
+    async def main():
+        application = Application.builder().token("1:test").build()
+        server = WebhookServer(application, "127.0.0.1", 0, PATH, SECRET)
+        await server.start()
+        try:
+            await scenario(server, server.sockets[0].getsockname()[1], application)
+        finally:
+            await server.stop()
+    asyncio.run(main())
+
+
+def test_accepts_single_and_batch_updates():
+    async def scenario(server, port, application):
+        status, body = await request(port, "POST", PATH, message_update(1), SECRET)
+        assert (status, body) == (200, {"ok": True, "accepted": 1})
+
+        status, body = await request(port, "POST", PATH, [message_update(2), message_update(3, 7)], SECRET)
+        assert (status, body) == (200, {"ok": True, "accepted": 2})
+
+        queued = [application.update_queue.get_nowait() for _ in range(3)]
+        assert [update.update_id for update in queued] == [1, 2, 3]
+        assert queued[2].effective_user.id == 7
+        assert server.received == 3
+    run_with_server(scenario)
+
+
+@pytest.mark.parametrize("secret", [None, "", "wrong"])
+def test_rejects_missing_or_wrong_secret(secret):
+    async def scenario(server, port, application):
+        # 伪造管理员发出的更新
+        forged = message_update(1, user_id=(config.ADMIN_IDS or [1])[0])
+        status, _ = await request(port, "POST", PATH, forged, secret)
+        assert status == 403
+        assert application.update_queue.empty()
+    run_with_server(scenario)
+
+
+@pytest.mark.parametrize("body", [
+    b"not json", {}, {"update_id": 1, "message": "x"}, [message_update(1), 5], "text", 5,
+])
+def test_rejects_malformed_updates(body):
+    async def scenario(server, port, application):
+        status, response = await request(port, "POST", PATH, body, SECRET)
+        assert status == 400
+        assert "error" in response
+        # 批量中有一条无效时整批拒绝
+        assert application.update_queue.empty()
+
+        # 连接处理未被异常打断，服务仍可用
+        status, _ = await request(port, "POST", PATH, message_update(2), SECRET)
+        assert status == 200
+    run_with_server(scenario)
+
+
+def test_health_check_and_routing():
+    async def scenario(server, port, application):
+        await request(port, "POST", PATH, message_update(1), SECRET)
+        status, body = await request(port, "GET", "/healthz")
+        assert status == 200
+        assert body == {"status": "starting", "received": 1, "queue": 1}
+
+        assert (await request(port, "POST", "/healthz"))[0] == 405
+        assert (await request(port, "GET", PATH, secret=SECRET))[0] == 405
+        assert (await request(port, "POST", "/other", message_update(1), SECRET))[0] == 404
+    run_with_server(scenario)
+
+
+def test_requires_secret(monkeypatch):
+    application = Application.builder().token("1:test").build()
+    with pytest.raises(ValueError):
+        WebhookServer(application, "127.0.0.1", 0, PATH, "")
+
+    monkeypatch.setattr(config, "WEBHOOK_SECRET", "")
+    with pytest.raises(RuntimeError):
+        asyncio.run(webhook.run_webhook(application))
@@ -0,0 +1,278 @@
+"""离线数值平衡模拟器
+
+用向量化的 NumPy 复刻 GameLogic 中的刷怪、闭关、签到与升级公式，
+模拟一批虚拟玩家连续 N 天的成长，输出可 diff 的 JSON 报告。
+
+用法（在 xiuxian 目录下运行）：
+    python -m tools.balance_sim --players 10000 --days 100 --output report.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+
+def required_exp(level: np.ndarray) -> np.ndarray:
+    """升级所需经验 (GameLogic.get_required_exp)"""
+    return level * 100 + (level // 10) * 500
+
+
+def world_level_of(level: np.ndarray) -> np.ndarray:
+    """等级对应的世界等级 (GameLogic.level_up)"""
+    return (level - 1) // 100 + 1
+
+
+def injury_hours(level: np.ndarray) -> np.ndarray:
+    """受伤时长 (GameLogic.calculate_hunt_rewards)"""
+    return np.maximum(1, 6 - level // 20)
+
+
+def signin_stones(level: np.ndarray) -> np.ndarray:
+    """签到奖励 (GameLogic.calculate_signin_rewards)"""
+    return 50 + level * 5
+
+
+def retreat_stones(level: np.ndarray, world_level: np.ndarray, hours: np.ndarray) -> np.ndarray:
+    """闭关奖励 (GameLogic.calculate_retreat_rewards)"""
+    return (level * hours * 2 * (world_level * 1.5)).astype(np.int64)
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    if values.size == 0:
+        return {}
+    result = np.percentile(values, PERCENTILES)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, result)}
+
+
+class BalanceSimulator:
+    """虚拟玩家群体的逐日模拟"""
+
+    def __init__(self, players: int, days: int, hunts_per_day: int = 8,
+                 difficulty_mix: Dict[str, float] = None, retreat_rate: float = 0.2,
+                 seed: int = 0):
+        self.players = players
+        self.days = days
+        self.hunts_per_day = hunts_per_day
+        self.retreat_rate = retreat_rate
+        self.rng = np.random.default_rng(seed)
+
+        mix = difficulty_mix or {name: 1.0 for name in config.HUNT_DIFFICULTIES}
+        self.difficulties: List[str] = [d for d in mix if d in config.HUNT_DIFFICULTIES]
+        weights = np.array([mix[d] for d in self.difficulties], dtype=np.float64)
+        self.difficulty_weights = weights / weights.sum()
+        self.injury_rates = np.array(
+            [config.HUNT_DIFFICULTIES[d]['injury_rate'] for d in self.difficulties], dtype=np.float64
+        )
+        self.multipliers = np.array(
+            [config.HUNT_DIFFICULTIES[d]['reward_multiplier'] for d in self.difficulties], dtype=np.float64
+        )
+        self.retreat_hours = np.array(config.RETREAT_HOURS, dtype=np.int64)
+        self.max_world_level = max(config.WORLD_LEVELS)
+
+    def _apply_level_ups(self, level: np.ndarray, exp: np.ndarray, world_level: np.ndarray):
+        """连续升级，直到没有玩家满足升级条件"""
+        while True:
+            need = required_exp(level)
+            mask = exp >= need
+            if not mask.any():
+                break
+            exp[mask] -= need[mask]
+            level[mask] += 1
+        np.maximum(world_level, world_level_of(level), out=world_level)
+
+    def run(self) -> Dict:
+        n = self.players
+        rng = self.rng
+        level = np.ones(n, dtype=np.int64)
+        exp = np.zeros(n, dtype=np.int64)
+        world_level = np.ones(n, dtype=np.int64)
+        stones = np.full(n, 1000, dtype=np.int64)  # Player 默认下品灵石
+        busy_until = np.zeros(n, dtype=np.float64)  # 受伤或闭关结束的时间(小时)
+        injured_hours = np.zeros(n, dtype=np.float64)
+        injury_count = np.zeros(n, dtype=np.int64)
+        retreat_count = np.zeros(n, dtype=np.int64)
+        tier_reached_day = np.full((self.max_world_level + 1, n), -1, dtype=np.int64)
+        tier_reached_day[1] = 0
+
+        issued = {'hunt': 0, 'retreat': 0, 'signin': 0}
+        issued_by_tier = np.zeros(self.max_world_level + 1, dtype=np.int64)
+        daily = []
+        slot_hours = HOURS_PER_DAY / self.hunts_per_day
+
+        def issue(source: str, mask_or_all, amount: np.ndarray):
+            stones[mask_or_all] += amount
+            issued[source] += int(amount.sum())
+            np.add.at(issued_by_tier, np.minimum(world_level[mask_or_all], self.max_world_level), amount)
+
+        for day in range(self.days):
+            day_start = day * HOURS_PER_DAY
+
+            # 签到：每天一次
+            issue('signin', slice(None), signin_stones(level))
+
+            # 闭关：奖励在开始时发放，期间无法刷怪
+            free = busy_until <= day_start
+            retreating = free & (rng.random(n) < self.retreat_rate)
+            if retreating.any():
+                hours = rng.choice(self.retreat_hours, size=int(retreating.sum()))
+                issue('retreat', retreating,
+                      retreat_stones(level[retreating], world_level[retreating], hours))
+                busy_until[retreating] = day_start + hours
+                retreat_count[retreating] += 1
+
+            # 刷怪
+            for slot in range(self.hunts_per_day):
+                now = day_start + slot * slot_hours
+                active = np.flatnonzero(busy_until <= now)
+                if active.size == 0:
+                    continue
+                choice = rng.choice(len(self.difficulties), size=active.size, p=self.difficulty_weights)
+                injured = rng.random(active.size) * 100 < self.injury_rates[choice]
+
+                hurt = active[injured]
+                if hurt.size:
+                    duration = injury_hours(level[hurt])
+                    busy_until[hurt] = now + duration
+                    injured_hours[hurt] += duration
+                    injury_count[hurt] += 1
+
+                ok = active[~injured]
+                mult = self.multipliers[choice[~injured]]
+                lv = level[ok]
+                exp[ok] += (lv * 10 * mult).astype(np.int64)
+                issue('hunt', ok, (lv * 5 * mult).astype(np.int64))
+                self._apply_level_ups(level, exp, world_level)
+
+            for tier in range(2, self.max_world_level + 1):
+                newly = (tier_reached_day[tier] < 0) & (world_level >= tier)
+                tier_reached_day[tier][newly] = day + 1
+
+            daily.append({
+                'day': day + 1,
+                'mean_level': round(float(level.mean()), 2),
+                'mean_stones': round(float(stones.mean()), 2),
+            })
+
+        return self._report(level, world_level, stones, injured_hours, injury_count,
+                            retreat_count, tier_reached_day, issued, issued_by_tier, daily)
+
+    def _report(self, level, world_level, stones, injured_hours, injury_count,
+                retreat_count, tier_reached_day, issued, issued_by_tier, daily) -> Dict:
+        n = self.players
+        total_hours = self.days * HOURS_PER_DAY
+
+        stones_by_tier = {}
+        for tier in range(1, self.max_world_level + 1):
+            mask = world_level == tier
+            if mask.any():
+                stones_by_tier[str(tier)] = {
+                    'players': int(mask.sum()),
+                    'mean_stones': round(float(stones[mask].mean()), 2),
+                    'stones': _percentiles(stones[mask]),
+                    'issued': int(issued_by_tier[tier]),
+                }
+
+        time_to_tier = {}
+        for tier in range(2, self.max_world_level + 1):
+            reached = tier_reached_day[tier][tier_reached_day[tier] >= 0]
+            time_to_tier[str(tier)] = {
+                'reached_ratio': round(reached.size / n, 4),
+                'days': _percentiles(reached),
+            }
+
+        counts = np.bincount(world_level, minlength=self.max_world_level + 1)
+        return {
+            'params': {
+                'players': n,
+                'days': self.days,
+                'hunts_per_day': self.hunts_per_day,
+                'retreat_rate': self.retreat_rate,
+                'difficulty_mix': dict(zip(self.difficulties, np.round(self.difficulty_weights, 4).tolist())),
+            },
+            'config': {
+                'hunt_difficulties': config.HUNT_DIFFICULTIES,
+                'retreat_hours': config.RETREAT_HOURS,
+            },
+            'levels': {
+                'mean': round(float(level.mean()), 2),
+                'max': int(level.max()),
+                'percentiles': _percentiles(level),
+                'world_tiers': {str(t): int(counts[t]) for t in range(1, self.max_world_level + 1)},
+            },
+            'stones': {
+                'issued': issued,
+                'issued_per_player_day': round(sum(issued.values()) / (n * self.days), 2),
+                'by_tier': stones_by_tier,
+            },
+            'injury': {
+                'mean_injuries': round(float(injury_count.mean()), 2),
+                'downtime_ratio': round(float(injured_hours.sum() / (n * total_hours)), 4),
+                'downtime_hours': _percentiles(injured_hours),
+            },
+            'retreat': {
+                'mean_retreats': round(float(retreat_count.mean()), 2),
+            },
+            'time_to_world_tier': time_to_tier,
+            'daily': daily,
+        }
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """解析 '简单=1,普通=2,困难=1' 形式的难度权重"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in config.HUNT_DIFFICULTIES:
+            raise argparse.ArgumentTypeError(f"未知难度：{name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="修仙Bot数值平衡模拟器")
+    parser.add_argument('--players', type=int, default=10000, help="虚拟玩家数量")
+    parser.add_argument('--days', type=int, default=100, help="模拟天数")
+    parser.add_argument('--hunts-per-day', type=int, default=8, help="每人每天刷怪次数")
+    parser.add_argument('--difficulty-mix', type=parse_mix, default=None,
+                        help="难度权重，如 简单=1,普通=2,困难=1")
+    parser.add_argument('--retreat-rate', type=float, default=0.2, help="每天闭关的玩家比例")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', help="报告输出文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    simulator = BalanceSimulator(
+        players=args.players,
+        days=args.days,
+        hunts_per_day=args.hunts_per_day,
+        difficulty_mix=args.difficulty_mix,
+        retreat_rate=args.retreat_rate,
+        seed=args.seed,
+    )
+    started = time.perf_counter()
+    report = simulator.run()
+    elapsed = time.perf_counter() - started
+    logger.info(f"模拟 {args.players * args.days} 玩家日，用时 {elapsed:.2f}s")
+
+    text = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""数据库与游戏逻辑微基准
+
+在 1k/100k/1M 玩家的种子数据库上测量热点路径的单次耗时，结果写入 JSON 基线；
+对比模式下任一基准比基线慢超过阈值时以非零状态退出，可用于 CI 回归检查。
+种子数据库按规模缓存在 --data-dir 中，重复运行不会重新生成。
+
+用法（在 xiuxian 目录下运行）：
+    python -m tools.bench --sizes 1000,100000,1000000 --output bench.json
+    python -m tools.bench --sizes 1000 --compare bench.json --threshold 20
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+SEED_VERSION = 1
+SECT_SIZE = config.MAX_SECT_MEMBERS
+EQUIPMENT_PER_SLOT = 20
+BENCH_ITEM = "聚气丹"
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+def seed_database(path: str, players: int, seed: int):
+    """生成种子数据库：装备目录、一种消耗品、按宗门分组的玩家"""
+    from database.database import GameDatabase
+    from database.models import Equipment, Item, Player
+
+    rng = random.Random(seed)
+    db = GameDatabase(path)
+
+    names_by_slot = {}
+    for slot in config.ALL_SLOTS:
+        for i in range(EQUIPMENT_PER_SLOT):
+            equipment = Equipment(
+                name=f"{slot}{i}", slot=slot,
+                quality=config.EQUIPMENT_QUALITIES[i % len(config.EQUIPMENT_QUALITIES)],
+                level_requirement=rng.randint(1, 500), world_level_requirement=rng.randint(1, 5),
+                attributes={attr: rng.randint(1, 100) for attr in rng.sample(config.PLAYER_ATTRIBUTES, 3)}
+            )
+            db.create_equipment(equipment)
+            names_by_slot.setdefault(slot, []).append(equipment.name)
+    db.create_item(Item(name=BENCH_ITEM, effects={"经验": 10}))
+
+    template = Player(tg_id=0)
+    attributes = json.dumps(template.attributes)
+    spirit_stones = json.dumps(template.spirit_stones)
+    created_at = datetime.now().isoformat()
+
+    def rows():
+        for tg_id in range(1, players + 1):
+            level = rng.randint(1, 500)
+            equipment = {slot: rng.choice(names) for slot, names in names_by_slot.items() if rng.random() < 0.6}
+            yield (
+                tg_id, f"p{tg_id}", f"玩家{tg_id}", level, rng.randint(0, 1000), "", (level - 1) // 100 + 1,
+                attributes, spirit_stones, json.dumps({BENCH_ITEM: rng.randint(1, 20)}),
+                json.dumps(equipment, ensure_ascii=False), (tg_id - 1) // SECT_SIZE + 1, "弟子",
+                rng.randint(0, 10000), "{}", None, None, created_at
+            )
+
+    with sqlite3.connect(path) as conn:
+        conn.executemany('''
+            INSERT INTO players (
+                tg_id, username, name, level, exp, world, world_level,
+                attributes, spirit_stones, inventory, equipment,
+                sect_id, sect_position, sect_contribution, status,
+                last_signin, last_hunt, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows())
+        conn.commit()
+
+
+def dataset_path(data_dir: str, players: int, seed: int) -> str:
+    """返回(必要时生成)指定规模的种子数据库路径"""
+    path = os.path.join(data_dir, f"bench-v{SEED_VERSION}-{players}-{seed}.db")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        partial = path + ".tmp"
+        if os.path.exists(partial):
+            os.remove(partial)
+        seed_database(partial, players, seed)
+        os.replace(partial, path)
+        logger.info(f"已生成 {players} 名玩家的种子数据库，用时 {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def database_benchmarks(path: str, players: int, rng: random.Random) -> List[Benchmark]:
+    from database.database import GameDatabase
+
+    db = GameDatabase(path)
+    ids = itertools.cycle([rng.randint(1, players) for _ in range(4096)])
+    sects = itertools.cycle([rng.randint(1, max(1, players // SECT_SIZE)) for _ in range(256)])
+    slots = itertools.cycle(list(config.ALL_SLOTS))
+    player = db.get_player(1)
+
+    return [
+        ("db.get_player", lambda: db.get_player(next(ids))),
+        ("db.update_player", lambda: db.update_player(player)),
+        ("db.get_equipment_by_slot", lambda: db.get_equipment_by_slot(next(slots), 250, 3)),
+        ("db.get_players_by_sect", lambda: db.get_players_by_sect(next(sects))),
+        ("db.get_sect_members", lambda: db.get_sect_members(next(sects), config.PAGE_SIZE + 1)),
+        ("db.get_sect_members.after", lambda: db.get_sect_members(next(sects), config.PAGE_SIZE + 1, (5000, 0))),
+    ]
+
+
+def logic_benchmarks(path: str) -> List[Benchmark]:
+    from database.database import GameDatabase
+    from bot.utils.game_logic import GameLogic
+    from bot.utils.item_effects import item_catalog
+
+    db = GameDatabase(path)
+    game_logic = GameLogic(db)
+    item_catalog.invalidate()
+    player = db.get_player(1)
+    player.inventory[BENCH_ITEM] = 10 ** 9
+    attrs = game_logic.calculate_total_attributes(player)
+    leveling = db.get_player(2)
+
+    def level_up():
+        leveling.level, leveling.exp = 1, 10 ** 6
+        game_logic.level_up(leveling)
+
+    return [
+        ("logic.calculate_total_attributes", lambda: game_logic.calculate_total_attributes(player)),
+        # 挑战、匹配等调用方不传 attrs，真实路径包含装备与宗门查询
+        ("logic.calculate_combat_power", lambda: game_logic.calculate_combat_power(player)),
+        ("logic.calculate_combat_power.precomputed", lambda: game_logic.calculate_combat_power(player, attrs)),
+        ("logic.level_up", level_up),
+        ("logic.use_item", lambda: game_logic.use_item(player, BENCH_ITEM, 1)),
+    ]
+
+
+def keyboard_benchmarks() -> List[Benchmark]:
+    from bot.keyboards import panels
+
+    # 构建器都有 lru_cache，循环参数很快全部命中缓存；
+    # kb.* 经 __wrapped__ 测量实际构建，kb.*.cached 测量缓存命中
+    panels.clear_keyboard_cache()
+    slots = itertools.cycle(list(config.ALL_SLOTS))
+    pages = itertools.cycle(range(1, 6))
+    calls = [
+        ("main_panel_keyboard", panels.main_panel_keyboard, lambda: (False,)),
+        ("hunt_difficulty_keyboard", panels.hunt_difficulty_keyboard, lambda: ()),
+        ("sect_panel_keyboard", panels.sect_panel_keyboard, lambda: (True, False)),
+        ("inventory_keyboard", panels.inventory_keyboard, lambda: ("all", next(pages), 5)),
+        ("equipment_slot_keyboard", panels.equipment_slot_keyboard, lambda: (next(slots), next(pages), 5)),
+    ]
+    benchmarks = []
+    for name, builder, args in calls:
+        benchmarks.append((f"kb.{name}", lambda builder=builder, args=args: builder.__wrapped__(*args())))
+        benchmarks.append((f"kb.{name}.cached", lambda builder=builder, args=args: builder(*args())))
+    return benchmarks
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """返回单次调用耗时(微秒)的中位数与最小值"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "loops": number}
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {}
+
+    def record(name: str, func: Callable[[], object]):
+        results[name] = measure(func, args.repeat, args.min_time)
+        print(f"  {name:<44} {results[name]['median_us']:>12.2f}µs", flush=True)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    for size in sizes:
+        path = dataset_path(args.data_dir, size, args.seed)
+        print(f"{size} 名玩家：")
+        for name, func in database_benchmarks(path, size, rng):
+            if args.filter in name:
+                record(f"{name}@{size}", func)
+
+    print("游戏逻辑与键盘：")
+    path = dataset_path(args.data_dir, sizes[0], args.seed)
+    for name, func in logic_benchmarks(path) + keyboard_benchmarks():
+        if args.filter in name:
+            record(name, func)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """返回超过阈值的回归项"""
+    regressions = []
+    print(f"\n与基线对比(阈值 +{threshold:.0f}%)：")
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        # 以最小值对比：最小值受系统噪声影响最小
+        change = (current["min_us"] / previous["min_us"] - 1) * 100
+        flag = "  回归" if change > threshold else ""
+        print(f"  {name:<44} {previous['min_us']:>10.2f} → {current['min_us']:>10.2f}µs {change:>+7.1f}%{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="数据库与游戏逻辑微基准")
+    parser.add_argument('--sizes', default="1000,100000,1000000", help="玩家规模，逗号分隔")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), "xiuxian-bench"),
+                        help="种子数据库缓存目录")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数")
+    parser.add_argument('--min-time', type=float, default=0.2, help="每次重复的最短运行时间(秒)")
+    parser.add_argument('--filter', default="", help="只运行名称包含该字符串的基准")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', help="结果写入的 JSON 基线路径")
+    parser.add_argument('--compare', help="对比的基线 JSON 路径")
+    parser.add_argument('--threshold', type=float, default=15.0, help="判定回归的变慢百分比")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger("database").setLevel(logging.WARNING)
+    logging.getLogger("bot").setLevel(logging.WARNING)
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项基准回归：{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""面板渲染基准测试
+
+生成一批穿戴全套装备的虚拟玩家，测量人物属性面板的渲染耗时。
+
+用法（在 xiuxian 目录下运行）：
+    python -m tools.bench_render --players 10000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from database.models import Player, Equipment
+from bot.utils.game_logic import GameLogic
+from bot.utils.render import render_player_panel, invalidate_equipment
+import config
+
+
+def build_catalog(per_slot: int, rng: random.Random) -> List[Equipment]:
+    catalog = []
+    for slot in config.ALL_SLOTS:
+        for i in range(per_slot):
+            attrs = {attr: rng.randint(1, 100) for attr in rng.sample(config.PLAYER_ATTRIBUTES, 3)}
+            catalog.append(Equipment(
+                name=f"{slot}{i}",
+                slot=slot,
+                quality=rng.choice(config.EQUIPMENT_QUALITIES),
+                attributes=attrs
+            ))
+    return catalog
+
+
+def build_players(count: int, catalog: List[Equipment], rng: random.Random) -> List[Player]:
+    by_slot = {}
+    for equipment in catalog:
+        by_slot.setdefault(equipment.slot, []).append(equipment.name)
+
+    players = []
+    for i in range(count):
+        player = Player(tg_id=i + 1, name=f"玩家{i + 1}", level=rng.randint(1, 500))
+        player.world_level = (player.level - 1) // 100 + 1
+        player.equipment = {slot: rng.choice(names) for slot, names in by_slot.items()}
+        players.append(player)
+    return players
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="面板渲染基准测试")
+    parser.add_argument('--players', type=int, default=10000, help="渲染的面板数量")
+    parser.add_argument('--per-slot', type=int, default=20, help="每个部位的装备数量")
+    parser.add_argument('--rounds', type=int, default=5, help="重复轮数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    catalog = build_catalog(args.per_slot, rng)
+    equipments = {equipment.name: equipment for equipment in catalog}
+    players = build_players(args.players, catalog, rng)
+    game_logic = GameLogic(None)
+
+    timings = []
+    for round_index in range(args.rounds):
+        if round_index == 0:
+            invalidate_equipment()  # 首轮包含装备描述片段的冷启动
+        started = time.perf_counter()
+        for player in players:
+            total_attrs = game_logic.calculate_total_attributes(player, equipments)
+            combat_power = game_logic.calculate_combat_power(player, total_attrs)
+            render_player_panel(
+                player, total_attrs, combat_power, game_logic.get_required_exp(player.level), None, equipments
+            )
+        timings.append(time.perf_counter() - started)
+
+    per_panel = [t / args.players * 1e6 for t in timings]
+    print(f"渲染 {args.players} 个人物面板 x {args.rounds} 轮")
+    print(f"  首轮(冷缓存)：{timings[0]:.3f}s ({per_panel[0]:.1f}µs/面板)")
+    if len(timings) > 1:
+        warm = per_panel[1:]
+        print(f"  热缓存中位数：{statistics.median(warm):.1f}µs/面板，最快：{min(warm):.1f}µs/面板")
+
+
+if __name__ == '__main__':
+    main()
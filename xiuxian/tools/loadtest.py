@@ -0,0 +1,319 @@
+"""离线压测工具
+
+在临时数据库上创建一批虚拟玩家，用真实的 Update/CallbackQuery 对象经 Application
+驱动真实的命令与回调处理器(开始、面板、刷怪、签到、使用物品、装备、闭关)。
+Bot 的网络层替换为记录出站调用的桩，不访问网络。
+
+输出吞吐量、更新延迟 p50/p99、各动作延迟、数据库耗时与锁错误、出站 API 调用统计。
+单进程中 SQLite 调用都在事件循环线程上同步执行，不存在进程内的锁等待，
+数据库耗时即事件循环被阻塞的时间；锁错误只在另有进程同时写库时出现。
+
+用法（在 xiuxian 目录下运行）：
+    python -m tools.loadtest --players 2000 --steps 12
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from telegram import CallbackQuery, Chat, Message, MessageEntity, Update, User
+from telegram.request import BaseRequest, RequestData
+
+import config
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "xiuxian", "username": "xiuxian_bot"}
+PERCENTILES = [50, 90, 99]
+
+# 种子数据：压测玩家开局获得的物品与可穿戴装备
+SEED_ITEMS = {"聚气丹": {"经验": 50}, "淬体丹": {"攻击力": 1}}
+SEED_EQUIPMENT = [("青锋剑", "武器", {"攻击力": 20}), ("玄铁甲", "服饰", {"防御力": 15})]
+
+
+class StubRequest(BaseRequest):
+    """替代 HTTP 层：记录每次 Bot API 调用并返回合成结果"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.answers: Counter = Counter()
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint in ("sendMessage", "editMessageText"):
+            self._message_id += 1
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        elif endpoint == "answerCallbackQuery":
+            self.answers[params.get("text") or ""] += 1
+            result = True
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode('utf-8')
+
+
+class UpdateFactory:
+    """构造带 bot 引用的真实 Update 对象"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._update_id = 0
+        self._message_id = 0
+
+    def _next_ids(self) -> Tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    def command(self, user: User, text: str) -> Update:
+        update_id, message_id = self._next_ids()
+        command_length = len(text.split(' ', 1)[0])
+        message = Message(
+            message_id, datetime.now(), Chat(user.id, Chat.PRIVATE), from_user=user, text=text,
+            entities=[MessageEntity(MessageEntity.BOT_COMMAND, 0, command_length)]
+        )
+        message.set_bot(self.bot)
+        return Update(update_id, message=message)
+
+    def callback(self, user: User, data: str) -> Update:
+        update_id, message_id = self._next_ids()
+        message = Message(message_id, datetime.now(), Chat(user.id, Chat.PRIVATE), from_user=User(**BOT_USER))
+        query = CallbackQuery(str(update_id), user, "loadtest", message=message, data=data)
+        message.set_bot(self.bot)
+        query.set_bot(self.bot)
+        return Update(update_id, callback_query=query)
+
+
+def player_flow(rng: random.Random, steps: int) -> List[Tuple[str, str]]:
+    """一名虚拟玩家的操作序列 [(类型, 内容)]，闭关放在最后"""
+    flow = [("command", "/start"), ("command", "/panel")]
+    actions = [
+        ("callback", "panel_player"),
+        ("callback", "panel_inventory"),
+        ("callback", "panel_hunt"),
+        ("callback", "hunt_" + rng.choice(list(config.HUNT_DIFFICULTIES))),
+        ("callback", "back_to_main"),
+        ("callback", "panel_signin"),
+        ("command", "/use " + rng.choice(list(SEED_ITEMS))),
+        ("command", "/equip " + rng.choice(SEED_EQUIPMENT)[0]),
+        ("callback", "panel_equipment"),
+    ]
+    weights = [3, 2, 2, 4, 2, 1, 2, 1, 1]
+    while len(flow) < steps - 2:
+        flow.append(rng.choices(actions, weights)[0])
+    flow += [("callback", "panel_retreat"), ("callback", f"retreat_{rng.choice(config.RETREAT_HOURS)}")]
+    return flow
+
+
+def action_name(kind: str, content: str) -> str:
+    if kind == "command":
+        return content.split(' ', 1)[0]
+    for prefix in ("hunt_", "retreat_"):
+        if content.startswith(prefix):
+            return prefix + "*"
+    return content
+
+
+def seed_catalog(db):
+    from database.models import Item, Equipment
+    for name, effects in SEED_ITEMS.items():
+        db.create_item(Item(name=name, effects=effects))
+    for name, slot, attributes in SEED_EQUIPMENT:
+        # 部位无效的装备无法穿戴，装备路径就测不到
+        assert slot in config.ALL_SLOTS, f"种子装备 {name} 的部位无效：{slot}"
+        db.create_equipment(Equipment(name=name, slot=slot, attributes=attributes))
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {f"p{p}": 0.0 for p in PERCENTILES}
+    ordered = sorted(values)
+    return {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in PERCENTILES}
+
+
+class LockErrorCounter(logging.Handler):
+    """统计数据库方法记录的 "database is locked" 错误"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        if "locked" in record.getMessage():
+            self.count += 1
+
+
+async def run(args) -> dict:
+    from telegram.ext import Application
+    from database.database import GameDatabase
+    from database.profiler import query_profiler
+    from bot.startup import register_handlers, warm_up
+    from bot.utils.send_queue import send_queue, TokenBucket
+    from bot.utils.debounce import tap_debouncer
+
+    # 统计每个更新的数据库耗时；阈值与预算放宽，避免压测时刷屏
+    query_profiler.enabled = True
+    query_profiler.slow_seconds = float('inf')
+    query_profiler.budget = 10 ** 9
+    db_times: List[float] = []
+    db_queries: List[int] = []
+    query_profiler.add_listener(lambda stats: (db_times.append(stats.total_time), db_queries.append(stats.count)))
+
+    if not args.telegram_limits:
+        # 默认测量进程本身的处理能力，不受 Telegram 出站限流约束
+        send_queue.global_bucket = TokenBucket(1e9, 1e9)
+        send_queue.private_rate = 1e9
+        config.SEND_PRIVATE_BURST = 1e9
+    tap_debouncer.window = args.debounce
+
+    lock_errors = LockErrorCounter()
+    logging.getLogger("database").addHandler(lock_errors)
+
+    db = GameDatabase(config.DATABASE_PATH)
+    seed_catalog(db)
+
+    stub = StubRequest(args.api_latency)
+    application = Application.builder().token("1:loadtest").request(stub).get_updates_request(StubRequest()).build()
+    register_handlers(application)
+    handler_errors = Counter()
+
+    async def on_error(update, context):
+        handler_errors[type(context.error).__name__] += 1
+        logger.debug("处理器异常", exc_info=context.error)
+
+    application.add_error_handler(on_error)
+    warm_up(db)
+    await application.initialize()
+
+    factory = UpdateFactory(application.bot)
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+
+    async def virtual_player(index: int):
+        user = User(100000 + index, f"玩家{index}", False, username=f"p{index}")
+        flow = player_flow(random.Random(rng.random()), args.steps)
+        for step, (kind, content) in enumerate(flow):
+            update = factory.command(user, content) if kind == "command" else factory.callback(user, content)
+            async with semaphore:
+                started = time.perf_counter()
+                await application.process_update(update)
+                latencies[action_name(kind, content)].append(time.perf_counter() - started)
+            if step == 0:
+                # 开局赠送种子物品，使 /use 与 /equip 走成功路径
+                player = db.get_player(user.id)
+                for name in list(SEED_ITEMS) + [name for name, _, _ in SEED_EQUIPMENT]:
+                    player.inventory[name] = player.inventory.get(name, 0) + 3
+                db.update_player(player)
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_player(i) for i in range(args.players)))
+    elapsed = time.perf_counter() - started
+    # 编辑不等待发出，吞吐只计更新处理；出站限流下队列的排空时间单独报告
+    drain_started = time.perf_counter()
+    await send_queue.close(timeout=3600)
+    drain = time.perf_counter() - drain_started
+    await application.shutdown()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "players": args.players,
+        "updates": len(all_latencies),
+        "seconds": elapsed,
+        "drain_seconds": drain,
+        "throughput": len(all_latencies) / elapsed,
+        "latency": percentiles(all_latencies),
+        "actions": {
+            name: {"count": len(values), **percentiles(values)}
+            for name, values in sorted(latencies.items())
+        },
+        "db": {
+            "seconds": sum(db_times),
+            "share": sum(db_times) / elapsed,
+            "time_per_update": percentiles(db_times),
+            "queries_per_update": statistics.mean(db_queries) if db_queries else 0,
+            "lock_errors": lock_errors.count,
+        },
+        "api_calls": dict(stub.calls),
+        "debounced": stub.answers.get("处理中…", 0),
+        "errors": dict(handler_errors),
+    }
+
+
+def print_report(report: dict):
+    ms = lambda seconds: f"{seconds * 1000:.2f}ms"
+    print(f"{report['players']} 名虚拟玩家，{report['updates']} 个更新，用时 {report['seconds']:.2f}s")
+    print(f"  吞吐量：{report['throughput']:.1f} 更新/秒，发送队列排空 {report['drain_seconds']:.2f}s")
+    print("  延迟：" + "，".join(f"{key} {ms(value)}" for key, value in report['latency'].items()))
+    print("  各动作：")
+    for name, stats in report['actions'].items():
+        print(f"    {name:<16} x{stats['count']:<6} p50 {ms(stats['p50'])}  p99 {ms(stats['p99'])}")
+    db = report['db']
+    print(f"  数据库：共 {db['seconds']:.2f}s(占 {db['share']:.0%})，每更新 {db['queries_per_update']:.1f} 条查询，"
+          f"p50 {ms(db['time_per_update']['p50'])}，p99 {ms(db['time_per_update']['p99'])}，锁错误 {db['lock_errors']}")
+    print("  出站调用：" + "，".join(f"{name} {count}" for name, count in sorted(report['api_calls'].items())))
+    print(f"  去重丢弃：{report['debounced']}，处理器异常：{report['errors'] or 0}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="离线压测工具")
+    parser.add_argument('--players', type=int, default=1000, help="虚拟玩家数量")
+    parser.add_argument('--steps', type=int, default=12, help="每名玩家的操作数")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="同时处理的更新数上限，默认与 Application 的顺序处理一致")
+    parser.add_argument('--think', type=float, default=0.0, help="玩家两次操作间的平均间隔(秒)")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="模拟的 Bot API 往返时间(秒)")
+    parser.add_argument('--debounce', type=float, default=0.0, help="回调去重窗口(秒)，默认关闭")
+    parser.add_argument('--telegram-limits', action='store_true', help="保留 Telegram 出站限流")
+    parser.add_argument('--database', help="数据库路径，默认使用临时文件")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', help="JSON 报告输出路径")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s %(message)s')
+    config.DATABASE_PATH = args.database or os.path.join(tempfile.mkdtemp(prefix="xiuxian-load-"), "load.db")
+    random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""内存统计
+
+加载与 Bot 启动预热相同的缓存(限时状态、物品目录、掉落表、管理员列表)，
+可选再构建比武匹配索引并渲染一批面板，然后输出与 /admin_mem 相同的报告：
+RSS、按类型的对象数量，以及 tracemalloc 相对加载前的增长位置。
+
+用法（在 xiuxian 目录下运行）：
+    python -m tools.memreport --database game.db --matchmaking --panels 1000
+"""
+import argparse
+import logging
+from typing import List
+
+import config
+from bot.utils.memory import MemoryTracker, memory_report
+
+
+def render_panels(db, count: int):
+    """为前 count 名玩家渲染人物面板，填充渲染与装备缓存"""
+    from bot.utils.game_logic import GameLogic
+    from bot.utils.render import render_player_panel
+
+    game_logic = GameLogic(db)
+    for player in db.list_players()[:count]:
+        equipments = db.get_equipments(list(player.equipment.values()))
+        total_attrs = game_logic.calculate_total_attributes(player, equipments)
+        render_player_panel(
+            player, total_attrs, game_logic.calculate_combat_power(player, total_attrs),
+            game_logic.get_required_exp(player.level), None, equipments
+        )
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="内存统计")
+    parser.add_argument('--database', default=config.DATABASE_PATH, help="数据库路径")
+    parser.add_argument('--frames', type=int, default=10, help="tracemalloc 记录的栈帧数")
+    parser.add_argument('--limit', type=int, default=15, help="每项列出的条数")
+    parser.add_argument('--matchmaking', action='store_true', help="同时构建比武匹配索引")
+    parser.add_argument('--panels', type=int, default=0, help="渲染的人物面板数量")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s %(message)s')
+    config.DATABASE_PATH = args.database
+
+    from database.database import GameDatabase
+    from bot.startup import warm_up
+    from bot.utils.matchmaking import matchmaking_index
+
+    tracker = MemoryTracker(args.frames)
+    tracker.start()
+
+    db = GameDatabase(args.database)
+    warm_up(db)
+    if args.matchmaking:
+        matchmaking_index.load(db)
+    if args.panels:
+        render_panels(db, args.panels)
+
+    print(memory_report(tracker, args.limit))
+
+
+if __name__ == '__main__':
+    main()